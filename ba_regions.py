@@ -0,0 +1,174 @@
+"""
+Balancing-authority data for build_explorer.py --ba
+
+The region registry (src/ba_registry.json) lists the interconnections, the
+13 EIA-930 regions (in tile order) and the balancing authorities (BAs) that
+belong to each region. Per-BA data is read from one JSON file per BA,
+<ba-dir>/<KEY>.json, shaped like one region's entries in the source pages:
+
+  {"monthly": {year: {month: {...}}},     # as INLINE_DATA.monthly[rk]
+   "annual":  {year: {...}},              # as INLINE_DATA.annual[rk]
+   "hourly":  {"year", "gen", "load", "rate"}}   # as RDATA[rk]; optional
+
+build_chunks() streams the BAs one at a time, hands each one to an emit
+callback (the build writes it as its own chunk) and sums it into its region,
+so each region view is the sum of its member BAs:
+
+  - *_gwh and demand_avg_mw are summed (averages over the same period add);
+  - peak_demand_mw is the coincident peak (max of the summed hourly load) for
+    the year the hourly data covers, and the sum of member peaks (an upper
+    bound) for other years;
+  - hourly gen and load are summed hour by hour; the rate is the
+    generation-weighted mean of the member rates, and stats are recomputed
+    from the summed series. Members without hourly data do not contribute.
+
+Only one BA's data plus the 13 running region sums are held at a time.
+"""
+import json, os
+
+FOSSIL = ["coal", "gas", "oil"]
+
+
+def load_registry(path):
+    """Registry with keys checked: every BA maps to a known region, every
+    region to a known interconnection, and no key is used twice."""
+    with open(path, "r", encoding="utf-8") as f:
+        reg = json.load(f)
+    ics = {ic["key"] for ic in reg["interconnections"]}
+    regions = {r["key"]: r for r in reg["regions"]}
+    seen = set()
+    for item in reg["regions"] + reg["bas"]:
+        if item["key"] in seen:
+            raise ValueError(f"{path}: key {item['key']!r} is listed twice")
+        seen.add(item["key"])
+    for r in reg["regions"]:
+        if r["interconnection"] not in ics:
+            raise ValueError(f"{path}: region {r['key']} has unknown interconnection {r['interconnection']!r}")
+    for ba in reg["bas"]:
+        if ba["region"] not in regions:
+            raise ValueError(f"{path}: BA {ba['key']} has unknown region {ba['region']!r}")
+    return reg
+
+
+def members(reg):
+    """region key → [BA keys] in registry order."""
+    out = {r["key"]: [] for r in reg["regions"]}
+    for ba in reg["bas"]:
+        out[ba["region"]].append(ba["key"])
+    return out
+
+
+def read_ba(ba_dir, key):
+    path = os.path.join(ba_dir, key + ".json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ── Summing ───────────────────────────────────────────────────────────────────
+def _add_fields(acc, rec):
+    for f, v in rec.items():
+        if f != "peak_demand_mw" and isinstance(v, (int, float)):
+            acc[f] = acc.get(f, 0) + v
+    if "peak_demand_mw" in rec:
+        acc["peak_demand_mw"] = acc.get("peak_demand_mw", 0) + rec["peak_demand_mw"]
+
+
+def _round_fields(rec):
+    return {f: round(v, 1) for f, v in rec.items()}
+
+
+def hourly_stats(gen, load, rate):
+    """RDATA[k].stats for an hourly series (see buildStory())."""
+    n = len(load)
+    years = max(1, round(n / 8760))
+    zeros = [0] * n
+    fossil_gen = [sum(v) for v in zip(*(gen.get(f, zeros) for f in FOSSIL))]
+    fossil = [g / l * 100 if l else 0 for g, l in zip(fossil_gen, load)]
+    srt = sorted(rate)
+    return {
+        "totalTWh": round(sum(load) / 1e6 / years, 1), "nHours": n,
+        "avgGen": round(sum(load) / n),
+        "avgCF": round((sum(gen.get("nuclear", zeros)) + sum(gen.get("hydro", zeros))) / n),
+        "rateP5": srt[int(0.05 * n)], "rateP95": srt[int(0.95 * n)],
+        "avgFossil": round(sum(fossil) / n, 1), "highFossilHours": sum(1 for v in fossil if v > 60),
+    }
+
+
+class RegionSum:
+    """Running sum of one region's member BAs."""
+
+    def __init__(self, key):
+        self.key = key
+        self.monthly, self.annual = {}, {}
+        self.hourly = None        # {"year", "gen", "load", "weighted_rate", "gen_total"}
+        self.hourly_skipped = []  # members whose hourly data could not be aligned
+
+    def add(self, ba_key, d):
+        for y, months in d.get("monthly", {}).items():
+            for m, rec in months.items():
+                _add_fields(self.monthly.setdefault(y, {}).setdefault(m, {}), rec)
+        for y, rec in d.get("annual", {}).items():
+            _add_fields(self.annual.setdefault(y, {}), rec)
+        h = d.get("hourly")
+        if not h:
+            return
+        n = len(h["load"])
+        tot = [sum(v) for v in zip(*h["gen"].values())]
+        if self.hourly is None:
+            self.hourly = {"year": h["year"], "gen": {f: list(v) for f, v in h["gen"].items()},
+                           "load": list(h["load"]), "gen_total": tot,
+                           "weighted_rate": [r * t for r, t in zip(h["rate"], tot)]}
+            return
+        acc = self.hourly
+        if h["year"] != acc["year"] or n != len(acc["load"]):
+            self.hourly_skipped.append(ba_key)
+            return
+        for f, series in h["gen"].items():
+            dst = acc["gen"].get(f)
+            acc["gen"][f] = list(series) if dst is None else [a + b for a, b in zip(dst, series)]
+        acc["load"] = [a + b for a, b in zip(acc["load"], h["load"])]
+        acc["gen_total"] = [a + b for a, b in zip(acc["gen_total"], tot)]
+        acc["weighted_rate"] = [w + r * t for w, r, t in zip(acc["weighted_rate"], h["rate"], tot)]
+
+    def result(self):
+        out = {"monthly": {y: {m: _round_fields(r) for m, r in ms.items()} for y, ms in self.monthly.items()},
+               "annual": {y: _round_fields(r) for y, r in self.annual.items()}}
+        if self.hourly:
+            h = self.hourly
+            rate = [round(w / t) if t else 0 for w, t in zip(h["weighted_rate"], h["gen_total"])]
+            hourly = {"year": h["year"], "gen": h["gen"], "load": h["load"], "rate": rate,
+                      "stats": hourly_stats(h["gen"], h["load"], rate)}
+            out["hourly"] = hourly
+            year = str(h["year"])
+            if year in out["annual"] and len(h["load"]) <= 8784:
+                out["annual"][year]["peak_demand_mw"] = round(max(h["load"]), 1)
+        return out
+
+
+def build_chunks(reg, ba_dir, emit):
+    """Stream every BA in ba_dir through emit(key, data, kind) and then each
+    region sum (kind "ba" / "region"). Returns a report dict."""
+    report = {"bas": 0, "missing": [], "regions": 0, "hourly_skipped": {}}
+    for rk, bas in members(reg).items():
+        acc = RegionSum(rk)
+        found = 0
+        for key in bas:
+            d = read_ba(ba_dir, key)
+            if d is None:
+                report["missing"].append(key)
+                continue
+            if d.get("hourly") and "stats" not in d["hourly"]:
+                h = d["hourly"]
+                h["stats"] = hourly_stats(h["gen"], h["load"], h["rate"])
+            emit(key, d, "ba")
+            acc.add(key, d)
+            found += 1
+        report["bas"] += found
+        if found:
+            emit(rk, acc.result(), "region")
+            report["regions"] += 1
+        if acc.hourly_skipped:
+            report["hourly_skipped"][rk] = acc.hourly_skipped
+    return report
@@ -0,0 +1,211 @@
+"""
+Load test for grid_api.py
+
+Starts grid_api.py on a free port (or targets --url), opens --concurrency
+keep-alive connections and has each of them issue requests back to back for
+--duration seconds, drawn from a fixed mix (MIX):
+
+  day        one day of raw hourly data, random region and date
+  week       one week of raw hourly data
+  daily      a region's year resampled to days
+  year       a region's full raw hourly year (streamed on a cache miss)
+  monthly    monthly records, random resample
+  annual     annual records
+  revalidate a URL this connection has already fetched, with If-None-Match
+
+Latency is measured from writing the request to reading the last body byte.
+Reports throughput (requests/s, MB/s), p50 / p95 / p99 / max latency per
+kind and overall, status counts, and the server's cache counters.
+
+Usage:
+  python bench_api.py --page index.html
+  python bench_api.py --page index.html --concurrency 64 --duration 30
+  python bench_api.py --url http://127.0.0.1:8765    # an already running server
+"""
+import argparse, asyncio, collections, datetime, json, os, random, subprocess, sys, time
+from urllib.parse import urlsplit
+
+import build_explorer
+
+BASE = os.path.dirname(os.path.abspath(__file__))
+# kind → weight
+MIX = {"day": 30, "week": 15, "daily": 10, "year": 5, "monthly": 15, "annual": 10, "revalidate": 15}
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(p / 100 * len(sorted_values)))]
+
+
+class Client:
+    """One keep-alive HTTP/1.1 connection."""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def get(self, path, headers=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        lines = [f"GET {path} HTTP/1.1", f"Host: {self.host}:{self.port}"]
+        lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        await self.writer.drain()
+        head = (await self.reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        status = int(head[0].split(" ")[1])
+        resp = {}
+        for line in head[1:]:
+            if ":" in line:
+                k, v = line.split(":", 1)
+                resp[k.strip().lower()] = v.strip()
+        size = 0
+        if resp.get("transfer-encoding") == "chunked":
+            while True:
+                n = int((await self.reader.readline()).strip(), 16)
+                await self.reader.readexactly(n + 2)
+                size += n
+                if n == 0:
+                    break
+        elif "content-length" in resp:
+            size = int(resp["content-length"])
+            await self.reader.readexactly(size)
+        if resp.get("connection") == "close":
+            self.close()
+        return status, resp, size
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+def make_request(kind, regions, rng, seen):
+    """(kind, path, headers) for one draw from MIX."""
+    if kind == "revalidate" and seen:
+        path, etag = rng.choice(seen)
+        return kind, path, {"If-None-Match": etag}
+    if kind == "revalidate":
+        kind = "day"
+    hourly = [k for k, r in regions.items() if "hourly" in r]
+    if kind in ("monthly", "annual") or not hourly:
+        k = rng.choice(list(regions))
+        if kind == "monthly":
+            return kind, f"/region/{k}/monthly?resample={rng.choice(['month', 'quarter', 'year'])}", {}
+        return "annual", f"/region/{k}/annual", {}
+    k = rng.choice(hourly)
+    first = datetime.datetime.fromisoformat(regions[k]["hourly"]["from"]).date()
+    if kind == "year":
+        return kind, f"/region/{k}/hourly", {}
+    if kind == "daily":
+        return kind, f"/region/{k}/hourly?resample=day", {}
+    days = 1 if kind == "day" else 7
+    d0 = first + datetime.timedelta(days=rng.randrange(365 - days))
+    d1 = d0 + datetime.timedelta(days=days - 1)
+    return kind, f"/region/{k}/hourly?from={d0}&to={d1}", {}
+
+
+async def worker(host, port, regions, deadline, seed, results):
+    rng = random.Random(seed)
+    client, seen = Client(host, port), []
+    kinds, weights = list(MIX), list(MIX.values())
+    try:
+        while time.perf_counter() < deadline:
+            kind, path, headers = make_request(rng.choices(kinds, weights)[0], regions, rng, seen)
+            t0 = time.perf_counter()
+            status, resp, size = await client.get(path, headers)
+            results.append((kind, status, (time.perf_counter() - t0) * 1000, size, resp.get("x-cache", "")))
+            if status == 200 and "etag" in resp and len(seen) < 200:
+                seen.append((path, resp["etag"]))
+    finally:
+        client.close()
+
+
+async def run(url, concurrency, duration, seed):
+    u = urlsplit(url)
+    host, port = u.hostname, u.port or 80
+    probe = Client(host, port)
+    results = []
+    try:
+        regions = json.loads(await _body(probe, "/regions"))
+        deadline = time.perf_counter() + duration
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker(host, port, regions, deadline, seed + i, results) for i in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+        stats = json.loads(await _body(probe, "/stats"))
+    finally:
+        probe.close()
+    return results, elapsed, stats
+
+
+async def _body(client, path):
+    if client.writer is None:
+        client.reader, client.writer = await asyncio.open_connection(client.host, client.port)
+    client.writer.write(f"GET {path} HTTP/1.1\r\nHost: {client.host}\r\nConnection: close\r\n\r\n".encode("latin-1"))
+    await client.writer.drain()
+    data = await client.reader.read()
+    client.close()
+    return data.split(b"\r\n\r\n", 1)[1]
+
+
+def report(results, elapsed, stats, concurrency):
+    lines = [f"  {len(results):,} requests in {elapsed:.1f} s over {concurrency} connections: "
+             f"{len(results) / elapsed:,.0f} req/s, {sum(r[3] for r in results) / elapsed / 1e6:.1f} MB/s",
+             f"  {'kind':<11}{'n':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'avg KB':>10}"]
+    by_kind = collections.defaultdict(list)
+    for r in results:
+        by_kind[r[0]].append(r)
+    for kind in list(MIX) + ["all"]:
+        rows = results if kind == "all" else by_kind.get(kind, [])
+        if not rows:
+            continue
+        lat = sorted(r[2] for r in rows)
+        lines.append(f"  {kind:<11}{len(rows):>8,}{percentile(lat, 50):>10.2f}{percentile(lat, 95):>10.2f}"
+                     f"{percentile(lat, 99):>10.2f}{lat[-1]:>10.2f}{sum(r[3] for r in rows) / len(rows) / 1024:>10.1f}")
+    statuses = collections.Counter(r[1] for r in results)
+    lines.append("  status " + ", ".join(f"{s}: {n:,}" for s, n in sorted(statuses.items())))
+    looked_up = stats.get("hits", 0) + stats.get("misses", 0)
+    if looked_up:
+        lines.append(f"  server cache: {stats.get('hits', 0) / looked_up:.0%} hits, {stats.get('not_modified', 0):,} "
+                     f"not modified, {stats.get('streamed', 0):,} streamed, {stats.get('cache_entries', 0):,} entries "
+                     f"/ {stats.get('cache_bytes', 0) / 1e6:.1f} MB")
+    return "\n".join(lines)
+
+
+def start_server(page, cache_mb):
+    """grid_api.py on a free port; returns (process, url)."""
+    proc = subprocess.Popen([sys.executable, os.path.join(BASE, "grid_api.py"), "--page", page, "--port", "0",
+                             "--cache-mb", str(cache_mb)], stdout=subprocess.PIPE, text=True)
+    for line in proc.stdout:
+        if "Serving " in line:
+            return proc, line.split("Serving ")[1].split("/regions")[0]
+    proc.wait()
+    raise SystemExit("grid_api.py did not start")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test for grid_api.py.")
+    parser.add_argument("--page", default=os.path.join(build_explorer.BASE, "index.html"),
+                        help="built page to serve (default: index.html)")
+    parser.add_argument("--url", help="test a running server instead of starting one")
+    parser.add_argument("--concurrency", type=int, default=16, help="keep-alive connections (default: 16)")
+    parser.add_argument("--duration", type=float, default=10, help="seconds (default: 10)")
+    parser.add_argument("--cache-mb", type=int, default=64, help="server cache size when starting one (default: 64)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    proc = None
+    url = args.url
+    if not url:
+        proc, url = start_server(args.page, args.cache_mb)
+    try:
+        results, elapsed, stats = asyncio.run(run(url, args.concurrency, args.duration, args.seed))
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+    print(report(results, elapsed, stats, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+"""
+Scale benchmark for build_explorer.py
+
+Generates synthetic source pages at several multiples of today's data volume
+and times each build stage on its own:
+
+  read     read both source pages
+  extract  data blobs, vendor scripts, tile paths
+  rename   historic viz capture + gs* renames
+  skip     hourly viz capture with function skipping
+  render   page templating
+  write    writing index.html
+
+Scaling model (1x = 13 regions, 7 years of monthly/annual data, one year of
+hourly data per region):
+  - regions grow by round(sqrt(scale)), years by ceil(scale / that), so 10x
+    is 39 regions x 4 years (annual data for 28 years, hourly data for 4
+    years per region; 12x the data, since the factors are rounded up) and
+    100x is 130 regions x 10 years (annual data for 70 years, hourly data for
+    10 years per region);
+  - the hourly viz section grows with the number of regions (one extra
+    panel function per added region block); the vendor bundle stays fixed.
+
+Each (scale, stage) runs in a fresh process so the peak RSS it reports is
+that stage's own high-water mark on top of its prerequisites; wall time is
+the minimum over --repeat runs. Results go to bench_output.txt as
+tab-separated rows with no timestamps, so two runs can be diffed directly.
+
+Usage:
+  python bench_build.py                      # 1x, 10x, 100x
+  python bench_build.py --scales 1,10 --repeat 5
+"""
+import argparse, glob, json, math, multiprocessing, os, platform, random, re, resource, sys, time, tracemalloc
+
+import ba_regions
+import build_explorer
+
+BASE = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE, "bench_data")
+OUT_PATH = os.path.join(BASE, "bench_output.txt")
+
+STAGES = ["read", "extract", "rename", "skip", "render", "write"]
+FUELS = ["coal", "gas", "oil", "other", "nuclear", "hydro", "geo", "wind", "solar", "storage"]
+# kg CO2 per MWh used to give the synthetic hourly rate a realistic spread
+EMISSION_FACTORS = {"coal": 1000, "gas": 410, "oil": 800, "other": 300}
+HOURS_PER_YEAR = 8760
+FIRST_YEAR = 2019
+
+
+def scale_factors(scale):
+    """(region multiplier, year multiplier) for a data-volume multiple."""
+    r_mult = max(1, round(math.sqrt(scale)))
+    return r_mult, max(1, math.ceil(scale / r_mult))
+
+
+def region_keys(base_keys, r_mult):
+    keys = list(base_keys)
+    for i in range(1, r_mult):
+        keys += [f"{k}{i}" for k in base_keys]
+    return keys
+
+
+# ── Synthetic EIA Grid Story source ───────────────────────────────────────────
+def make_story_source(template_path, out_path, r_mult, y_mult):
+    """grid-story.html with INLINE_DATA and the tile map widened to
+    r_mult x regions and y_mult x years. Region/year slices are copies of the
+    real ones with a small deterministic jitter."""
+    with open(template_path, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+    rng = random.Random(r_mult * 1000 + y_mult)
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        if stripped.startswith("const INLINE_DATA"):
+            data = json.loads(stripped[stripped.index("{"):].rstrip(";"))
+            base_keys = list(data["annual"].keys())
+            base_years = sorted(data["annual"][base_keys[0]].keys())
+            out = {"monthly": {}, "annual": {}}
+            for rk in region_keys(base_keys, r_mult):
+                src = rk.rstrip("0123456789") if rk not in data["annual"] else rk
+                out["annual"][rk], out["monthly"][rk] = {}, {}
+                for block in range(y_mult):
+                    for yr in base_years:
+                        y = str(int(base_years[0]) - block * len(base_years) + (int(yr) - int(base_years[0])))
+                        j = 1 + rng.uniform(-0.05, 0.05)
+                        out["annual"][rk][y] = {f: round(v * j, 1) for f, v in data["annual"][src][yr].items()}
+                        out["monthly"][rk][y] = {m: {f: round(v * j, 1) for f, v in mv.items()}
+                                                 for m, mv in data["monthly"][src][yr].items()}
+            lines[i] = "const INLINE_DATA = " + json.dumps(out, separators=(",", ":")) + ";\n"
+        elif "const T={" in stripped and r_mult > 1:
+            start = line.index("const T={") + len("const T=")
+            end = line.index("};", start) + 1
+            body = line[start + 1:end - 1]
+            # tile entries are 'KEY':{d:'...',vb:'...'}; suffix every key per copy
+            copies = [re.sub(r"'(\w+)':\{", lambda m, n=n: f"'{m.group(1)}{n}':{{", body) for n in range(1, r_mult)]
+            lines[i] = line[:start] + "{" + ",".join([body] + copies) + "}" + line[end:]
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+
+
+# ── Synthetic 3D Grid Viz source ──────────────────────────────────────────────
+VENDOR_HEADER = "/*\n Highcharts JS v11.4.0 (2024-03-04)\n (c) 2009-2024 Torstein Honsi\n License: www.highcharts.com/license\n*/\n"
+SANKEY_HEADER = "/*\n Highcharts JS v11.4.0 (2024-03-04)\n Sankey diagram module\n (c) 2010-2024 Torstein Honsi\n*/\n"
+
+HOURLY_VIZ_JS = """function rateColor(r){return r<200?COL.clean:r<400?COL.mid:COL.dirty;}
+function setupCanvas(id){const c=document.getElementById(id);if(!c)return null;const r=c.parentElement.getBoundingClientRect();const dpr=window.devicePixelRatio||1;c.width=r.width*dpr;c.height=r.height*dpr;const ctx=c.getContext('2d');ctx.scale(dpr,dpr);return{ctx,w:r.width,h:r.height};}
+function drawAct1(k){const s=setupCanvas('cvs1');if(!s)return;const D=RDATA[k];let i=0;function frame(){for(let j=0;j<200&&i<D.rate.length;j++,i++){s.ctx.fillStyle=rateColor(D.rate[i]);s.ctx.fillRect((i%120)*s.w/120,((i/120)|0)*s.h/74,2,2);}if(i<D.rate.length)animFrames.a1=requestAnimationFrame(frame);}frame();}
+function drawAct2(k){const s=setupCanvas('cvs2');if(!s)return;const D=RDATA[k];s.ctx.fillStyle=COL.clean;D.gen.nuclear.forEach((v,i)=>s.ctx.fillRect(i*s.w/D.load.length,s.h-(v+D.gen.hydro[i])/D.stats.avgGen*s.h/2,1,1));}
+function drawAct3(k){const s=setupCanvas('cvs3');if(!s)return;}
+function drawAct4(k){const s=setupCanvas('cvs4');if(!s)return;}
+function drawAct5(k){const s=setupCanvas('cvs5');if(!s)return;}
+function drawAct6(k){const s=setupCanvas('cvs6');if(!s)return;}
+function buildSankey(k){
+  const D=RDATA[k],data=[];
+  FUELS.forEach(f=>{const v=D.gen[f].reduce((a,b)=>a+b,0)/1e6;if(v>0)data.push([SRC[f].n,FOSSIL.includes(f)?'Fossil':'Clean',v]);});
+  ['Clean','Fossil'].forEach(c=>data.push([c,'Grid Load',data.filter(d=>d[1]===c).reduce((s,d)=>s+d[2],0)]));
+  Highcharts.chart('act7-chart',{chart:{backgroundColor:'transparent'},title:{text:null},credits:{enabled:false},
+    series:[{type:'sankey',keys:['from','to','weight'],data:data,nodes:FUELS.map(f=>({id:SRC[f].n,color:SRC[f].c}))}]});
+}
+"""
+
+HOURLY_EXTRA_PANEL_JS = """function drawPanel{n}(k){{const s=setupCanvas('cvsx{n}');if(!s)return;const D=RDATA[k];const w=s.w/24;for(let h=0;h<24;h++){{let t=0,c=0;for(let i=h;i<D.load.length;i+=24){{t+=D.load[i];c++;}}s.ctx.fillStyle=rateColor(D.rate[h]);s.ctx.fillRect(h*w,s.h-t/c/D.stats.avgGen*s.h/2,w-1,t/c/D.stats.avgGen*s.h/2);}}}}
+"""
+
+HOURLY_SKIPPED_JS = """function buildMap(){
+  const c=document.getElementById('map');
+  ACTIVE.forEach(k=>{const b=document.createElement('button');b.textContent=REGIONS[k].n;b.onclick=()=>selectRegion(k);c.appendChild(b);});
+}
+function selectRegion(k){
+  selReg=k;buildStory(k);
+}
+function buildStory(k){
+  if(!RDATA[k])return;
+  drawAct1(k);drawAct2(k);drawAct3(k);drawAct4(k);drawAct5(k);drawAct6(k);buildSankey(k);
+}
+function setupObs(){
+  const o=new IntersectionObserver(es=>es.forEach(e=>{if(e.isIntersecting)goToStep(+e.target.dataset.step);}));
+  document.querySelectorAll('.step').forEach(s=>o.observe(s));
+}
+function goToStep(s){
+  curStep=s;
+}
+function isMobile(){ return window.innerWidth<=1024; }
+function setupMobileLayout(){
+  if(!isMobile())return;
+}
+"""
+
+
+def _write_rdata(f, keys, years, rng):
+    """Stream `const RDATA = {...};` region by region so generation stays
+    bounded in memory even at 100x."""
+    n = HOURS_PER_YEAR * years
+    f.write("const RDATA = {")
+    for ri, rk in enumerate(keys):
+        base = rng.uniform(5000, 40000)
+        share = {fu: rng.random() for fu in FUELS}
+        tot_share = sum(share.values())
+        gen = {}
+        for fu in FUELS:
+            s = share[fu] / tot_share * base
+            if fu == "solar":
+                gen[fu] = [max(0, int(s * 2 * math.sin(math.pi * ((h % 24) - 6) / 12))) for h in range(n)]
+            else:
+                gen[fu] = [max(0, int(s * (1 + 0.25 * math.sin(2 * math.pi * h / 24)) * rng.uniform(0.9, 1.1))) for h in range(n)]
+        load = [sum(gen[fu][h] for fu in FUELS) for h in range(n)]
+        rate = [round(sum(gen[fu][h] * EMISSION_FACTORS.get(fu, 0) for fu in FUELS) / load[h]) if load[h] else 0
+                for h in range(n)]
+        srt = sorted(rate)
+        fossil = [sum(gen[fu][h] for fu in ("coal", "gas", "oil")) / load[h] * 100 if load[h] else 0 for h in range(n)]
+        stats = {
+            "totalTWh": round(sum(load) / 1e6 / years, 1), "nHours": n,
+            "avgGen": round(sum(load) / n), "avgCF": round(sum(gen["nuclear"][h] + gen["hydro"][h] for h in range(n)) / n),
+            "rateP5": srt[int(0.05 * n)], "rateP95": srt[int(0.95 * n)],
+            "avgFossil": round(sum(fossil) / n, 1), "highFossilHours": sum(1 for v in fossil if v > 60),
+        }
+        entry = {"year": FIRST_YEAR + 5, "gen": gen, "load": load, "rate": rate, "stats": stats}
+        f.write(("," if ri else "") + json.dumps(rk) + ":" + json.dumps(entry, separators=(",", ":")))
+    f.write("};\n")
+
+
+def make_hourly_source(out_path, base_keys, r_mult, y_mult):
+    """A stand-in for 3D Grid Viz's grid_story.html with the same structure
+    build_explorer.py parses: vendor <script>s in <head>, RDATA ahead of
+    `const COL`, the viz functions, the functions the build skips, and the
+    trailing scroll/DOMContentLoaded listeners."""
+    rng = random.Random(r_mult * 7919 + y_mult)
+    keys = region_keys(base_keys, r_mult)
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write("<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n<meta charset=\"UTF-8\">\n")
+        f.write("<script>" + VENDOR_HEADER + "(function(){window.Highcharts={chart:function(){return{};},setOptions:function(){}};})();\n"
+                + "/*" + "h" * 280000 + "*/\n</script>\n")
+        f.write("<script>" + SANKEY_HEADER + "/*" + "s" * 20000 + "*/\n</script>\n")
+        f.write("<style>body{margin:0}</style>\n</head>\n<body>\n<div id=\"map\"></div>\n<script>\n")
+        _write_rdata(f, keys, y_mult, rng)
+        f.write("const COL = {clean:'#2372B9',mid:'#FBB254',dirty:'#C0392B'};\n")
+        f.write("const REGIONS = {" + ",".join(f"{k}:{{n:'{k}',d:'{k}'}}" for k in keys) + "};\n")
+        f.write("const RCOL = {" + ",".join(f"{k}:'#2372B9'" for k in keys) + "};\n")
+        f.write("const ACTIVE = " + json.dumps(keys) + ";\n")
+        f.write("let selReg=null, curStep=0, animFrames={};\n")
+        f.write(HOURLY_VIZ_JS)
+        for n in range(1, r_mult):
+            f.write(HOURLY_EXTRA_PANEL_JS.format(n=n))
+        f.write(HOURLY_SKIPPED_JS)
+        f.write("window.addEventListener('scroll',()=>{},{passive:true});\n")
+        f.write("document.addEventListener('DOMContentLoaded',()=>buildMap());\n</script>\n</body>\n</html>\n")
+
+
+def ensure_sources(scale):
+    """Generate (or reuse) the synthetic source pair for one scale."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    gs_path = os.path.join(DATA_DIR, f"grid-story.{scale}x.html")
+    gv_path = os.path.join(DATA_DIR, f"grid_story.{scale}x.html")
+    r_mult, y_mult = scale_factors(scale)
+    template = os.path.join(BASE, "src", "grid-story.html")
+    if not os.path.exists(gs_path):
+        make_story_source(template, gs_path, r_mult, y_mult)
+    if not os.path.exists(gv_path):
+        with open(template, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip().startswith("const INLINE_DATA"):
+                    base_keys = list(json.loads(line.strip()[line.strip().index("{"):].rstrip(";"))["annual"].keys())
+                    break
+        make_hourly_source(gv_path, base_keys, r_mult, y_mult)
+    return gs_path, gv_path
+
+
+# ── Synthetic balancing-authority data (--ba) ─────────────────────────────────
+def _split(value, weights, digits):
+    """Split value by weights; the last share takes the rounding remainder so
+    the parts sum back to value."""
+    parts = [round(value * w, digits) for w in weights[:-1]]
+    return parts + [round(value - sum(parts), digits)]
+
+
+def make_ba_data(gs_path, gv_path, ba_dir, registry, rng):
+    """One <BA>.json per registry BA, made by splitting each region's source
+    data among its members with random weights (hourly rates are shared), so
+    summing the BAs back must reproduce the source regions."""
+    os.makedirs(ba_dir, exist_ok=True)
+    gs_lines, gv_lines = build_explorer.read_sources(gs_path, gv_path)
+    gs_line, gv_line = build_explorer.extract_data_lines(gs_lines, gv_lines)
+    inline = build_explorer.parse_data_line(gs_line)[1]
+    rdata = build_explorer.parse_data_line(gv_line)[1]
+    for rk, bas in ba_regions.members(registry).items():
+        if rk not in inline.get("annual", {}):
+            continue
+        w = [rng.uniform(0.2, 1) for _ in bas]
+        w = [x / sum(w) for x in w]
+        out = {b: {"monthly": {}, "annual": {}} for b in bas}
+        for y, months in inline["monthly"][rk].items():
+            for m, rec in months.items():
+                for f, v in rec.items():
+                    for b, part in zip(bas, _split(v, w, 1)):
+                        out[b]["monthly"].setdefault(y, {}).setdefault(m, {})[f] = part
+        for y, rec in inline["annual"][rk].items():
+            for f, v in rec.items():
+                for b, part in zip(bas, _split(v, w, 1)):
+                    out[b]["annual"].setdefault(y, {})[f] = part
+        if rk in rdata:
+            h = rdata[rk]
+            gen = {f: [_split(v, w, 0) for v in series] for f, series in h["gen"].items()}
+            load = [_split(v, w, 0) for v in h["load"]]
+            for i, b in enumerate(bas):
+                out[b]["hourly"] = {"year": h["year"], "gen": {f: [int(p[i]) for p in parts] for f, parts in gen.items()},
+                                    "load": [int(p[i]) for p in load], "rate": h["rate"]}
+        for b, d in out.items():
+            with open(os.path.join(ba_dir, b + ".json"), "w", encoding="utf-8") as f:
+                json.dump(d, f, separators=(",", ":"))
+    return inline, rdata
+
+
+def bench_ba(scale=1):
+    """Build the BA page from synthetic per-BA files; check the summed region
+    totals against the source regions and compare first-paint bytes with the
+    13-region all.html."""
+    gs_path, gv_path = ensure_sources(scale)
+    registry = ba_regions.load_registry(build_explorer.BA_REGISTRY)
+    ba_dir = os.path.join(DATA_DIR, f"ba.{scale}x")
+    inline, rdata = make_ba_data(gs_path, gv_path, ba_dir, registry, random.Random(scale))
+    ba_out, regions_out = os.path.join(DATA_DIR, f"dist-ba.{scale}x"), os.path.join(DATA_DIR, f"dist.{scale}x")
+    t0 = time.perf_counter()
+    build_explorer.build_ba(gs_path, gv_path, ba_out, ba_dir)
+    ba_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    build_explorer.build_targets(gs_path, gv_path, regions_out, ["all"])
+    regions_s = time.perf_counter() - t0
+
+    worst = 0.0
+    for path in glob.glob(os.path.join(ba_out, "assets", "ba", "*.js")):
+        key = os.path.basename(path).split(".")[0]
+        if key not in inline["annual"]:
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        d = json.loads(text[text.index(",") + 1:text.rindex(")")])
+        for y, rec in inline["annual"][key].items():
+            for fld, v in rec.items():
+                if fld != "peak_demand_mw":
+                    worst = max(worst, abs(d["annual"][y][fld] - v))
+        if key in rdata:
+            worst = max(worst, max(abs(a - b) for a, b in zip(d["hourly"]["load"], rdata[key]["load"])),
+                        max(abs(a - b) for a, b in zip(d["hourly"]["rate"], rdata[key]["rate"])))
+
+    def first_paint(out_dir, page):
+        html = os.path.join(out_dir, page)
+        with open(html, "r", encoding="utf-8") as f:
+            refs = re.findall(r'(?<![-\w])(?:href|src)="(assets/[^"]+)"', f.read())
+        return os.path.getsize(html) + sum(os.path.getsize(os.path.join(out_dir, r)) for r in refs)
+
+    print(f"\n  BA build {ba_s:.2f}s, 13-region build {regions_s:.2f}s")
+    print(f"  First paint: ba.html {first_paint(ba_out, 'ba.html') / 1024:.0f} KB, "
+          f"all.html {first_paint(regions_out, 'all.html') / 1024:.0f} KB")
+    print(f"  Region totals vs source: max abs difference {worst:.2f}")
+
+
+# ── Stage runner (executes in a child process) ────────────────────────────────
+def _run_stage(stage, gs_path, gv_path, out_path, trace, queue):
+    """Run the prerequisites of `stage`, then `stage` itself, and report its
+    wall time and memory."""
+    def rss_kb():
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    steps = STAGES[:STAGES.index(stage) + 1]
+    state = {}
+
+    def run(step):
+        if step == "read":
+            state["gs_lines"], state["gv_lines"] = build_explorer.read_sources(gs_path, gv_path)
+        elif step == "extract":
+            state["parts"] = build_explorer.extract(state["gs_lines"], state["gv_lines"])
+        elif step == "rename":
+            state["gs_viz"] = build_explorer.rename_historic(state["gs_lines"])
+        elif step == "skip":
+            state["gv_viz"] = build_explorer.skip_hourly(state["gv_lines"])
+        elif step == "render":
+            state["html"] = build_explorer.render(state["parts"], state["gs_viz"], state["gv_viz"])
+        elif step == "write":
+            build_explorer.write_output(state["html"], out_path)
+
+    for step in steps[:-1]:
+        run(step)
+    rss_before = rss_kb()
+    if trace:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    run(stage)
+    wall = time.perf_counter() - t0
+    py_peak = tracemalloc.get_traced_memory()[1] // 1024 if trace else 0
+    if trace:
+        tracemalloc.stop()
+    queue.put({"wall_s": wall, "rss_before_kb": rss_before, "peak_rss_kb": rss_kb(), "py_peak_kb": py_peak})
+
+
+def measure(stage, gs_path, gv_path, out_path, trace=False):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run_stage, args=(stage, gs_path, gv_path, out_path, trace, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark build_explorer.py stages on synthetic sources.")
+    parser.add_argument("--scales", default="1,10,100", help="comma-separated data-volume multiples (default: 1,10,100)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage; the minimum is reported")
+    parser.add_argument("--out", default=OUT_PATH, help="results file (default: bench_output.txt)")
+    parser.add_argument("--ba", action="store_true",
+                        help="instead: split the sources into the registry's BAs, build ba.html and compare it "
+                             "with the 13-region page")
+    args = parser.parse_args(argv)
+    if args.ba:
+        bench_ba()
+        return
+
+    scales = [int(s) for s in args.scales.split(",") if s.strip()]
+    rows = []
+    for scale in scales:
+        gs_path, gv_path = ensure_sources(scale)
+        input_bytes = os.path.getsize(gs_path) + os.path.getsize(gv_path)
+        out_path = os.path.join(DATA_DIR, f"index.{scale}x.html")
+        print(f"  {scale}x: {input_bytes / 1e6:.1f} MB of sources")
+        for stage in STAGES:
+            runs = [measure(stage, gs_path, gv_path, out_path) for _ in range(args.repeat)]
+            walls = sorted(r["wall_s"] for r in runs)
+            traced = measure(stage, gs_path, gv_path, out_path, trace=True)
+            row = {
+                "scale": f"{scale}x", "stage": stage, "input_bytes": input_bytes,
+                "wall_ms_min": f"{walls[0] * 1000:.2f}", "wall_ms_median": f"{walls[len(walls) // 2] * 1000:.2f}",
+                "rss_before_kb": max(r["rss_before_kb"] for r in runs),
+                "peak_rss_kb": max(r["peak_rss_kb"] for r in runs),
+                "py_peak_kb": traced["py_peak_kb"],
+            }
+            rows.append(row)
+            print(f"    {stage:<8} {row['wall_ms_min']:>10} ms  peak RSS {row['peak_rss_kb'] / 1024:.0f} MB")
+
+    cols = ["scale", "stage", "input_bytes", "wall_ms_min", "wall_ms_median", "rss_before_kb", "peak_rss_kb", "py_peak_kb"]
+    with open(args.out, "w", encoding="utf-8") as f:
+        f.write(f"# bench_build v1\tpython={platform.python_version()}\tplatform={sys.platform}\trepeat={args.repeat}\n")
+        f.write("\t".join(cols) + "\n")
+        for row in rows:
+            f.write("\t".join(str(row[c]) for c in cols) + "\n")
+    print(f"\nWrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,107 +9,258 @@ Strategy:
     avoiding all namespace collisions. Only hvInit() is exposed globally.
   - The shared REGIONS object uses .name/.desc (from EIA Grid Story).
     The hourly IIFE receives REGIONS and maps .n/.d aliases so existing code works.
+  - Highcharts + Sankey (only used by the hourly Sankey panel) are kept off the
+    critical path: by default they ship as an inert text/plain block that is
+    parsed when Act VII is about to be shown (--sankey=deferred). With
+    --sankey=canvas the vendor bundle is dropped and a small built-in canvas
+    renderer draws the fuel -> category -> load flow instead.
+  - --perf injects an opt-in telemetry layer (active only with ?perf=1 in the
+    URL): performance marks/measures around the init and draw functions, long
+    tasks, per-loop rAF FPS, an overlay and a JSON trace download. Without
+    --perf none of it is emitted.
+  - The historic story cards of every region the page carries are rendered
+    at build time (narrative.py) into a block shown only without scripting;
+    gsInit clones a region's cards from it instead of building the template
+    (kept as gsStoryHtml() for --ba pages, whose data arrives on demand).
+  - The Compare mode reads RANK_INDEX, every region ranked per metric and
+    year at build time (see rankings.py).
+  - The hourly mode's what-if control recomputes the hourly emission rates
+    and their stats from RDATA's per-fuel generation for any factor vector
+    (SCENARIO; scenario.py is the NumPy twin with a parity check). When
+    NumPy is installed, every build warns if SCENARIO's factors do not
+    reproduce the rates and stats baked into RDATA.
+  - --simplify-tiles rewrites the tile-map outlines for their rendered size
+    (see tile_geometry.py).
+  - --sketches writes mergeable emission-rate quantile sketches next to the
+    page for percentiles at any month / season / hour-of-day granularity
+    (see rate_sketch.py); --export-data writes the datasets as memory-mapped
+    .npy files for analysis (see grid_data.py). Both need NumPy.
+  - --export-parquet writes the same figures as partitioned Parquet for
+    dashboards (see parquet_export.py; needs pyarrow).
+  - --ba DIR builds a balancing-authority page from the region registry
+    (src/ba_registry.json) and one data file per BA: tiles grouped by
+    interconnection, each BA and each region total (summed from its BAs, see
+    ba_regions.py) in its own chunk loaded on first hover/selection.
+  - --store DIR assembles INLINE_DATA from a month-partitioned store whose
+    aggregates are updated incrementally as months arrive (see month_store.py).
+  - --fonts DIR inlines the web fonts, subset to the page's characters, in
+    place of the Google Fonts stylesheet (see font_subset.py; needs fontTools).
+  - --service-worker adds sw.js and a content-hashed precache manifest so the
+    page works offline once visited over http(s).
+  - --watch serves index.html locally, rebuilds only the stages whose input
+    slice changed on every source edit and live-reloads open tabs in place
+    (see watch_build.py).
+  - --targets / --ba / --split write their shared files as content-hashed
+    assets with Subresource Integrity tags and an assets/manifest.json; the
+    output is byte-identical for identical inputs (stable ordering, no
+    timestamps). --split also moves the data into hashed assets.
+  - grid_api.py serves a built page's datasets over a local read-only HTTP
+    API (range / resample queries, ETags, LRU cache; bench_api.py load-tests it).
+  - The build runs as a chain of stages (read, extract, rename, skip, render,
+    write) so each can be timed on its own; see bench_build.py.
 """
-import re, os
+import argparse, base64, hashlib, json, re, os
+
+import ba_regions
+import narrative
+import rankings
+import tile_geometry
 
 BASE = os.path.dirname(os.path.abspath(__file__))
 PARENT = os.path.dirname(BASE)
+BA_REGISTRY = os.path.join(BASE, "src", "ba_registry.json")
+
+
+def find_sources(base=BASE):
+    """Locate the two source pages: sibling project directories first
+    (original layout), then src/ (repo layout)."""
+    parent = os.path.dirname(base)
+    grid_story_path = os.path.join(parent, "EIA Grid Story", "grid-story.html")
+    if not os.path.exists(grid_story_path):
+        grid_story_path = os.path.join(base, "src", "grid-story.html")
+    grid_viz_path = os.path.join(parent, "3D Grid Viz", "grid_story.html")
+    if not os.path.exists(grid_viz_path):
+        grid_viz_path = os.path.join(base, "src", "grid_story.html")
+    return grid_story_path, grid_viz_path
+
 
 # ── Read source files ─────────────────────────────────────────────────────────
-# Try sibling directories first (original layout), fall back to src/ (repo layout)
-grid_story_path = os.path.join(PARENT, "EIA Grid Story", "grid-story.html")
-if not os.path.exists(grid_story_path):
-    grid_story_path = os.path.join(BASE, "src", "grid-story.html")
-
-grid_viz_path = os.path.join(PARENT, "3D Grid Viz", "grid_story.html")
-if not os.path.exists(grid_viz_path):
-    grid_viz_path = os.path.join(BASE, "src", "grid_story.html")
-
-with open(grid_story_path, "r", encoding="utf-8") as f:
-    gs_lines = f.readlines()
-
-with open(grid_viz_path, "r", encoding="utf-8") as f:
-    gv_lines = f.readlines()
-
-gs_text = "".join(gs_lines)
-gv_text = "".join(gv_lines)
-
-# ── Extract data blobs ────────────────────────────────────────────────────────
-gs_data_line = ""
-for line in gs_lines:
-    if line.strip().startswith("const INLINE_DATA"):
-        gs_data_line = line.strip()
-        break
-
-gv_data_line = ""
-for line in gv_lines:
-    if line.strip().startswith("const RDATA"):
-        gv_data_line = line.strip()
-        break
-
-print(f"  INLINE_DATA: {len(gs_data_line)} chars")
-print(f"  RDATA: {len(gv_data_line)} chars")
-
-# ── Extract Highcharts + Sankey from 3D Grid Viz head ─────────────────────────
-head_section = gv_text.split("<style>")[0]
-script_blocks = re.findall(r'<script>(.*?)</script>', head_section, re.DOTALL)
-
-highcharts_js = ""
-sankey_js = ""
-for block in script_blocks:
-    block_stripped = block.strip()
-    if "Highcharts" in block_stripped[:200] and "sankey" not in block_stripped[:200].lower():
-        highcharts_js = block_stripped
-    elif "Sankey" in block_stripped[:300] or "sankey" in block_stripped[:300]:
-        sankey_js = block_stripped
-
-print(f"  Highcharts JS: {len(highcharts_js)} chars")
-print(f"  Sankey JS: {len(sankey_js)} chars")
-
-# ── Extract tile map SVG paths from EIA Grid Story ────────────────────────────
-tile_paths_match = re.search(r"const T=(\{[^;]+\});", gs_text)
-tile_paths = tile_paths_match.group(1) if tile_paths_match else "{}"
-print(f"  Tile paths: {len(tile_paths)} chars")
+def read_sources(grid_story_path, grid_viz_path):
+    with open(grid_story_path, "r", encoding="utf-8") as f:
+        gs_lines = f.readlines()
+    with open(grid_viz_path, "r", encoding="utf-8") as f:
+        gv_lines = f.readlines()
+    return gs_lines, gv_lines
+
+
+# ── Extract data blobs, vendor scripts and tile paths ─────────────────────────
+def extract_data_lines(gs_lines, gv_lines):
+    gs_data_line = ""
+    for line in gs_lines:
+        if line.strip().startswith("const INLINE_DATA"):
+            gs_data_line = line.strip()
+            break
 
-# ── Extract historic mode viz functions (viz2 through viz7) ───────────────────
-# These are lines 309-528 in the EIA Grid Story source
-# Stop before sliderStep (line 532) since we provide our own gsSliderStep
-gs_viz_lines = []
-capture = False
-for i, line in enumerate(gs_lines):
-    ln = i + 1
-    stripped = line.strip()
-    # Start at viz2 definition
-    if stripped.startswith("function viz2("):
-        capture = True
-    if capture:
-        # Stop before sliderStep and any functions after viz7
-        if stripped.startswith("function sliderStep(") or stripped.startswith("function setupScrollObserver(") or stripped.startswith("function goToStep("):
+    gv_data_line = ""
+    for line in gv_lines:
+        if line.strip().startswith("const RDATA"):
+            gv_data_line = line.strip()
             break
-        gs_viz_lines.append(line)
-
-gs_viz_code = "".join(gs_viz_lines)
-
-# Rename viz functions with gs prefix using word-boundary-safe replacements
-gs_viz_code = re.sub(r'\bviz2\b', 'gsViz2', gs_viz_code)
-gs_viz_code = re.sub(r'\bviz3\b', 'gsViz3', gs_viz_code)
-gs_viz_code = re.sub(r'\bviz4\b', 'gsViz4', gs_viz_code)
-gs_viz_code = re.sub(r'\bviz5\b', 'gsViz5', gs_viz_code)
-gs_viz_code = re.sub(r'\bviz6\b', 'gsViz6', gs_viz_code)
-gs_viz_code = re.sub(r'\bviz7\b', 'gsViz7', gs_viz_code)
-# setupCanvas → gsSetupCanvas (only in historic viz code)
-gs_viz_code = re.sub(r'\bsetupCanvas\b', 'gsSetupCanvas', gs_viz_code)
-# DATA.annual / DATA.monthly → GS_DATA.annual / GS_DATA.monthly
-gs_viz_code = gs_viz_code.replace("DATA.annual", "GS_DATA.annual")
-gs_viz_code = gs_viz_code.replace("DATA.monthly", "GS_DATA.monthly")
-# animFrames → gsAnimFrames (only in viz code)
-gs_viz_code = re.sub(r'\banimFrames\b', 'gsAnimFrames', gs_viz_code)
-# window.onSlider → window.gsOnSlider
-gs_viz_code = gs_viz_code.replace("window.onSlider2", "window.gsOnSlider2")
-gs_viz_code = gs_viz_code.replace("window.onSlider4", "window.gsOnSlider4")
-gs_viz_code = gs_viz_code.replace("window.onSlider6", "window.gsOnSlider6")
-
-print(f"  Historic viz code: {len(gs_viz_code)} chars")
+    return gs_data_line, gv_data_line
+
+
+def extract_vendor(gv_text):
+    """Highcharts + Sankey module from the 3D Grid Viz <head>."""
+    head_section = gv_text.split("<style>")[0]
+    script_blocks = re.findall(r'<script>(.*?)</script>', head_section, re.DOTALL)
+
+    highcharts_js = ""
+    sankey_js = ""
+    for block in script_blocks:
+        block_stripped = block.strip()
+        if "Highcharts" in block_stripped[:200] and "sankey" not in block_stripped[:200].lower():
+            highcharts_js = block_stripped
+        elif "Sankey" in block_stripped[:300] or "sankey" in block_stripped[:300]:
+            sankey_js = block_stripped
+    return highcharts_js, sankey_js
+
+
+def extract_tile_paths(gs_text):
+    """The `const T={...}` SVG path object from EIA Grid Story's buildMap()."""
+    tile_paths_match = re.search(r"const T=(\{[^;]+\});", gs_text)
+    return tile_paths_match.group(1) if tile_paths_match else "{}"
+
+
+TILE_RE = re.compile(r"'(\w+)':\{d:'([^']*)',vb:'([^']*)'\}")
+
+
+def parse_tile_paths(tile_paths):
+    """{'NW':{d:'M..Z',vb:'x y w h'},...} → {"NW": {"d": ..., "vb": ...}}"""
+    return {k: {"d": d, "vb": vb} for k, d, vb in TILE_RE.findall(tile_paths)}
+
+
+def tile_paths_js(tiles):
+    return "{" + ",".join(f"'{k}':{{d:'{t['d']}',vb:'{t['vb']}'}}" for k, t in tiles.items()) + "}"
+
+
+def extract(gs_lines, gv_lines):
+    gs_text = "".join(gs_lines)
+    gv_text = "".join(gv_lines)
+    gs_data_line, gv_data_line = extract_data_lines(gs_lines, gv_lines)
+    highcharts_js, sankey_js = extract_vendor(gv_text)
+    return {
+        "gs_data_line": gs_data_line,
+        "gv_data_line": gv_data_line,
+        "highcharts_js": highcharts_js,
+        "sankey_js": sankey_js,
+        "tiles": parse_tile_paths(extract_tile_paths(gs_text)),
+    }
+
+
+# ── Regions ───────────────────────────────────────────────────────────────────
+# Shared REGIONS (uses .name/.desc from EIA Grid Story format)
+REGIONS = {
+    "CAL": ("California", "CAISO / Western"),
+    "CAR": ("Carolinas", "Duke Energy / Southeast"),
+    "CENT": ("Central", "SPP / Central"),
+    "FLA": ("Florida", "FRCC / Southeast"),
+    "MIDA": ("Mid-Atlantic", "PJM Interconnection"),
+    "MIDW": ("Midwest", "MISO / Eastern"),
+    "NE": ("New England", "ISO-NE / Northeast"),
+    "NW": ("Northwest", "BPA / Western"),
+    "NY": ("New York", "NYISO / Northeast"),
+    "SE": ("Southeast", "Southern Co / Southeast"),
+    "SW": ("Southwest", "Western Interconnection"),
+    "TEN": ("Tennessee", "TVA / Southeast"),
+    "TEX": ("Texas", "ERCOT Interconnection"),
+}
+
+TILE_ORDER = ["NW", "CAL", "SW", "CENT", "TEX", "MIDW", "MIDA", "NY", "NE", "TEN", "SE", "CAR", "FLA"]
+
+
+def js_str(value):
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+# ── Data blob slicing (multi-target builds) ───────────────────────────────────
+def parse_data_line(line):
+    """`const NAME = {...};` → ("const NAME = ", {...})"""
+    if not line:
+        return "", {}
+    start = line.index("{")
+    return line[:start], json.loads(line[start:].rstrip().rstrip(";"))
+
+
+def iter_data_line(line):
+    """(key, value) for each top-level entry of `const NAME = {...};`, decoded
+    one at a time so only one region's data is materialized at once."""
+    if not line:
+        return
+    dec = json.JSONDecoder()
+    ws = re.compile(r"[\s,]*")
+    i = ws.match(line, line.index("{") + 1).end()
+    while line[i] != "}":
+        key, i = dec.raw_decode(line, i)
+        i = ws.match(line, line.index(":", i) + 1).end()
+        value, i = dec.raw_decode(line, i)
+        yield key, value
+        i = ws.match(line, i).end()
+
+
+def data_line(prefix, data):
+    return prefix + json.dumps(data, separators=(",", ":"), ensure_ascii=False) + ";"
+
+
+def slice_inline_data(data, keys):
+    """INLINE_DATA is {"monthly": {rk: ...}, "annual": {rk: ...}}."""
+    return {section: {k: by_region[k] for k in keys if k in by_region} for section, by_region in data.items()}
+
+
+def slice_rdata(data, keys):
+    return {k: data[k] for k in keys if k in data}
+
+
+# ── Extract historic mode viz functions (viz2 through viz7) ───────────────────
+def rename_historic(gs_lines):
+    """viz2..viz7 from EIA Grid Story, renamed into the gs* namespace.
+
+    Stops before sliderStep since we provide our own gsSliderStep.
+    """
+    gs_viz_lines = []
+    capture = False
+    for line in gs_lines:
+        stripped = line.strip()
+        # Start at viz2 definition
+        if stripped.startswith("function viz2("):
+            capture = True
+        if capture:
+            # Stop before sliderStep and any functions after viz7
+            if stripped.startswith("function sliderStep(") or stripped.startswith("function setupScrollObserver(") or stripped.startswith("function goToStep("):
+                break
+            gs_viz_lines.append(line)
+
+    gs_viz_code = "".join(gs_viz_lines)
+
+    # Rename viz functions with gs prefix using word-boundary-safe replacements
+    gs_viz_code = re.sub(r'\bviz2\b', 'gsViz2', gs_viz_code)
+    gs_viz_code = re.sub(r'\bviz3\b', 'gsViz3', gs_viz_code)
+    gs_viz_code = re.sub(r'\bviz4\b', 'gsViz4', gs_viz_code)
+    gs_viz_code = re.sub(r'\bviz5\b', 'gsViz5', gs_viz_code)
+    gs_viz_code = re.sub(r'\bviz6\b', 'gsViz6', gs_viz_code)
+    gs_viz_code = re.sub(r'\bviz7\b', 'gsViz7', gs_viz_code)
+    # setupCanvas → gsSetupCanvas (only in historic viz code)
+    gs_viz_code = re.sub(r'\bsetupCanvas\b', 'gsSetupCanvas', gs_viz_code)
+    # DATA.annual / DATA.monthly → GS_DATA.annual / GS_DATA.monthly
+    gs_viz_code = gs_viz_code.replace("DATA.annual", "GS_DATA.annual")
+    gs_viz_code = gs_viz_code.replace("DATA.monthly", "GS_DATA.monthly")
+    # animFrames → gsAnimFrames (only in viz code)
+    gs_viz_code = re.sub(r'\banimFrames\b', 'gsAnimFrames', gs_viz_code)
+    # window.onSlider → window.gsOnSlider
+    gs_viz_code = gs_viz_code.replace("window.onSlider2", "window.gsOnSlider2")
+    gs_viz_code = gs_viz_code.replace("window.onSlider4", "window.gsOnSlider4")
+    gs_viz_code = gs_viz_code.replace("window.onSlider6", "window.gsOnSlider6")
+    return gs_viz_code
+
 
 # ── Extract hourly mode viz functions (rateColor through buildSankey) ─────────
 # We capture from COL definition through end of buildSankey, but EXCLUDE:
@@ -121,77 +272,346 @@ print(f"  Historic viz code: {len(gs_viz_code)} chars")
 # Functions to skip entirely (we provide our own implementations)
 SKIP_FUNCS = ["buildMap()", "selectRegion(", "buildStory(", "setupObs()", "goToStep(", "isMobile()", "setupMobileLayout()"]
 
-gv_viz_lines = []
-capture = False
-skip_func = False
-brace_depth = 0
-for i, line in enumerate(gv_lines):
-    ln = i + 1
-    stripped = line.strip()
-
-    # Start capture at COL definition (line 312)
-    if stripped.startswith("const COL = {") or stripped.startswith("const COL={"):
-        capture = True
-
-    if not capture:
-        continue
-
-    # Stop BEFORE window.addEventListener (scroll progress) — we provide our own
-    if "window.addEventListener('scroll'" in stripped or "window.addEventListener(\"scroll\"" in stripped:
-        break
-    # Also stop at DOMContentLoaded
-    if "DOMContentLoaded" in stripped:
-        break
-
-    # Skip single-line declarations we don't need
-    if stripped.startswith("const REGIONS =") or stripped.startswith("const REGIONS="):
-        continue
-    if stripped.startswith("const RCOL =") or stripped.startswith("const RCOL="):
-        continue
-    if stripped.startswith("const ACTIVE =") or stripped.startswith("const ACTIVE="):
-        continue
-    if stripped.startswith("let selReg="):
-        continue
-
-    # Check if this line starts a function we want to skip
-    if not skip_func:
-        for func_sig in SKIP_FUNCS:
-            if f"function {func_sig}" in stripped:
-                skip_func = True
-                brace_depth = 0
-                break
 
-    if skip_func:
-        brace_depth += line.count("{") - line.count("}")
-        if brace_depth <= 0 and brace_depth + line.count("}") > 0:
-            # We've closed all braces — function is complete
-            skip_func = False
-        continue
+def skip_hourly(gv_lines):
+    gv_viz_lines = []
+    capture = False
+    skip_func = False
+    brace_depth = 0
+    for i, line in enumerate(gv_lines):
+        ln = i + 1
+        stripped = line.strip()
+
+        # Start capture at COL definition (line 312)
+        if stripped.startswith("const COL = {") or stripped.startswith("const COL={"):
+            capture = True
+
+        if not capture:
+            continue
+
+        # Stop BEFORE window.addEventListener (scroll progress) — we provide our own
+        if "window.addEventListener('scroll'" in stripped or "window.addEventListener(\"scroll\"" in stripped:
+            break
+        # Also stop at DOMContentLoaded
+        if "DOMContentLoaded" in stripped:
+            break
+
+        # Skip single-line declarations we don't need
+        if stripped.startswith("const REGIONS =") or stripped.startswith("const REGIONS="):
+            continue
+        if stripped.startswith("const RCOL =") or stripped.startswith("const RCOL="):
+            continue
+        if stripped.startswith("const ACTIVE =") or stripped.startswith("const ACTIVE="):
+            continue
+        if stripped.startswith("let selReg="):
+            continue
+
+        # Check if this line starts a function we want to skip
+        if not skip_func:
+            for func_sig in SKIP_FUNCS:
+                if f"function {func_sig}" in stripped:
+                    skip_func = True
+                    brace_depth = 0
+                    break
+
+        if skip_func:
+            brace_depth += line.count("{") - line.count("}")
+            if brace_depth <= 0 and brace_depth + line.count("}") > 0:
+                # We've closed all braces — function is complete
+                skip_func = False
+            continue
+
+        gv_viz_lines.append(line)
+
+    return "".join(gv_viz_lines)
+
+
+# ── Optional performance telemetry (--perf) ───────────────────────────────────
+# Everything below is only emitted with --perf, and at runtime only switches on
+# with ?perf=1, so a normal build carries no instrumentation at all.
+PERF_RUNTIME_JS = """<script>
+// ═══════════════════════════════════════════════════════════════════════════
+// PERF TELEMETRY (?perf=1)
+// ═══════════════════════════════════════════════════════════════════════════
+var __perf = null;
+(function() {
+  if (!/[?&]perf=1(&|$)/.test(location.search)) return;
+  const P = __perf = { ctx: null, measures: [], longtasks: [], fps: [], loops: {}, paints: {} };
+  const now = () => performance.now();
+
+  P.mark = name => performance.mark(name);
+  P.measure = (name, start, end) => { try { performance.measure(name, start, end); } catch (e) {} };
+  P.wrap = (name, fn) => {
+    if (typeof fn !== 'function') return fn;
+    return function() {
+      const prev = P.ctx; P.ctx = name;
+      performance.mark(name + ':start');
+      try { return fn.apply(this, arguments); }
+      finally {
+        performance.mark(name + ':end');
+        P.measure(name, name + ':start', name + ':end');
+        P.ctx = prev;
+      }
+    };
+  };
+
+  // Per-loop FPS: a rAF callback inherits the label of whichever instrumented
+  // function requested it, so self-scheduling animation loops keep their name.
+  const raf = window.requestAnimationFrame.bind(window);
+  window.requestAnimationFrame = cb => {
+    const loop = P.ctx || 'anonymous';
+    return raf(ts => {
+      const l = P.loops[loop] || (P.loops[loop] = { start: ts, frames: 0, last: ts, fps: 0 });
+      l.frames++; l.last = ts;
+      if (ts - l.start >= 1000) {
+        l.fps = l.frames * 1000 / (ts - l.start);
+        P.fps.push({ loop, t: +ts.toFixed(1), fps: +l.fps.toFixed(1) });
+        l.start = ts; l.frames = 0;
+      }
+      const prev = P.ctx; P.ctx = loop;
+      try { cb(ts); } finally { P.ctx = prev; }
+    });
+  };
+
+  try {
+    new PerformanceObserver(list => list.getEntries().forEach(e => P.measures.push(
+      { name: e.name, start: +e.startTime.toFixed(2), duration: +e.duration.toFixed(2) })))
+      .observe({ type: 'measure', buffered: true });
+    new PerformanceObserver(list => list.getEntries().forEach(e => P.longtasks.push(
+      { start: +e.startTime.toFixed(2), duration: +e.duration.toFixed(2), name: e.name, during: P.ctx })))
+      .observe({ type: 'longtask', buffered: true });
+    // first-paint / first-contentful-paint, to compare font loading (--fonts)
+    new PerformanceObserver(list => list.getEntries().forEach(e => { P.paints[e.name] = +e.startTime.toFixed(1); }))
+      .observe({ type: 'paint', buffered: true });
+  } catch (e) {}
+
+  P.trace = () => ({
+    url: location.href, userAgent: navigator.userAgent, recordedAt: now(),
+    navigation: (performance.getEntriesByType('navigation')[0] || {}).toJSON ? performance.getEntriesByType('navigation')[0].toJSON() : null,
+    marks: performance.getEntriesByType('mark').map(e => ({ name: e.name, t: +e.startTime.toFixed(2) })),
+    paints: P.paints, measures: P.measures, longtasks: P.longtasks, fps: P.fps
+  });
+  P.download = () => {
+    const a = document.createElement('a');
+    a.href = URL.createObjectURL(new Blob([JSON.stringify(P.trace(), null, 1)], { type: 'application/json' }));
+    a.download = 'grid-explorer-trace.json';
+    document.body.appendChild(a); a.click(); a.remove();
+    setTimeout(() => URL.revokeObjectURL(a.href), 1000);
+  };
+
+  function render(box) {
+    const agg = {};
+    P.measures.forEach(m => { const a = agg[m.name] || (agg[m.name] = { n: 0, total: 0, last: 0 }); a.n++; a.total += m.duration; a.last = m.duration; });
+    const t = now(), rows = Object.entries(agg).sort((a, b) => b[1].total - a[1].total).slice(0, 12)
+      .map(([k, a]) => `<tr><td>${k}</td><td>${a.last.toFixed(1)}</td><td>${a.n}</td><td>${a.total.toFixed(1)}</td></tr>`).join('');
+    const loops = Object.entries(P.loops).filter(([, l]) => t - l.last < 1500)
+      .map(([k, l]) => `${k} ${l.fps.toFixed(0)} fps`).join('<br>') || '&ndash;';
+    const lt = P.longtasks.reduce((s, e) => s + e.duration, 0);
+    const fcp = P.paints['first-contentful-paint'];
+    box.querySelector('.perf-body').innerHTML =
+      `<table><tr><th>measure</th><th>last ms</th><th>n</th><th>total</th></tr>${rows}</table>` +
+      `<div>FCP: ${fcp != null ? fcp + ' ms' : '&ndash;'} &middot; long tasks: ${P.longtasks.length} (${lt.toFixed(0)} ms)</div><div>${loops}</div>`;
+  }
+  document.addEventListener('DOMContentLoaded', () => {
+    const box = document.createElement('div');
+    box.id = 'perfOverlay';
+    box.style.cssText = 'position:fixed;right:8px;bottom:12px;z-index:2000;max-width:340px;padding:8px 10px;' +
+      'background:rgba(6,27,46,0.9);color:#E2E8F0;font:11px/1.35 ui-monospace,monospace;border-radius:8px;';
+    box.innerHTML = '<div style="display:flex;justify-content:space-between;gap:8px;margin-bottom:4px">' +
+      '<b>perf</b><button type="button" style="font:inherit;cursor:pointer">Download trace</button></div>' +
+      '<div class="perf-body"></div>';
+    box.querySelector('button').addEventListener('click', P.download);
+    document.body.appendChild(box);
+    setInterval(() => render(box), 500);
+  });
+  performance.mark('script:app:requested');
+})();
+</script>
+"""
+
+# Wrap the named entry points once every function exists. Declarations are
+# plain bindings, so reassigning them routes all existing call sites through
+# the wrapper.
+PERF_WRAP_HOURLY_JS = """
+  if (__perf) {
+    drawAct1 = __perf.wrap('drawAct1', drawAct1); drawAct2 = __perf.wrap('drawAct2', drawAct2);
+    drawAct3 = __perf.wrap('drawAct3', drawAct3); drawAct4 = __perf.wrap('drawAct4', drawAct4);
+    drawAct5 = __perf.wrap('drawAct5', drawAct5); drawAct6 = __perf.wrap('drawAct6', drawAct6);
+    buildSankey = __perf.wrap('buildSankey', buildSankey);
+    scnCompute = __perf.wrap('scnCompute', scnCompute); scnUpdate = __perf.wrap('scnUpdate', scnUpdate);
+    if (typeof buildSankeyNow === 'function') buildSankeyNow = __perf.wrap('buildSankeyNow', buildSankeyNow);
+    if (typeof hvLoadSankeyVendor === 'function') hvLoadSankeyVendor = __perf.wrap('hvLoadSankeyVendor', hvLoadSankeyVendor);
+  }
+"""
+
+PERF_WRAP_GLOBAL_JS = """
+if (__perf) {
+  buildMap = __perf.wrap('buildMap', buildMap);
+  selectRegion = __perf.wrap('selectRegion', selectRegion);
+  gsInit = __perf.wrap('gsInit', gsInit);
+  hvInit = __perf.wrap('hvInit', hvInit);
+  gsViz2 = __perf.wrap('gsViz2', gsViz2); gsViz3 = __perf.wrap('gsViz3', gsViz3);
+  gsViz4 = __perf.wrap('gsViz4', gsViz4); gsViz5 = __perf.wrap('gsViz5', gsViz5);
+  gsViz6 = __perf.wrap('gsViz6', gsViz6); gsViz7 = __perf.wrap('gsViz7', gsViz7);
+}
+"""
+
+
+# ── Sankey panel support (see --sankey) ──────────────────────────────────────
+# deferred: buildSankey() only records the region; the vendor block is parsed
+#           and the chart drawn once Act VII is about to be shown.
+# canvas:   a local Highcharts.chart() stand-in draws the sankey series itself.
+SANKEY_DEFERRED_JS = """
+  // Deferred Highcharts + Sankey: parsed on first approach to Act VII
+  // The block either carries the bundle inline (single-file build) or points
+  // at the shared vendor asset through data-src (--targets build).
+  var hvSankeyReady = typeof Highcharts !== 'undefined', hvSankeyLoading = false, hvSankeyPending = null, hvSankeyObs = null;
+  function hvLoadSankeyVendor(done) {
+    if (hvSankeyReady) { if (done) done(); return; }
+    const src = document.getElementById('hvSankeyVendor');
+    if (!src || hvSankeyLoading) return;
+    const t0 = performance.now();
+    const s = document.createElement('script');
+    const finish = () => {
+      hvSankeyReady = true;
+      console.info('[sankey] vendor bundle ' + (src.dataset.src ? 'loaded' : 'parsed') + ' + evaluated in ' + (performance.now() - t0).toFixed(1) + ' ms');
+      if (done) done();
+    };
+    if (src.dataset.src) {
+      hvSankeyLoading = true;
+      s.onload = finish;
+      s.onerror = () => { hvSankeyLoading = false; s.remove(); console.warn('[sankey] could not load ' + src.dataset.src); };
+      if (src.dataset.integrity) { s.integrity = src.dataset.integrity; s.crossOrigin = 'anonymous'; }
+      s.src = src.dataset.src;
+      document.head.appendChild(s);
+    } else {
+      s.textContent = src.textContent;
+      document.head.appendChild(s);
+      src.remove();
+      finish();
+    }
+  }
+  function hvShowSankey() {
+    hvLoadSankeyVendor(() => {
+      if (hvSankeyPending) { const k = hvSankeyPending; hvSankeyPending = null; buildSankeyNow(k); }
+    });
+  }
+  function buildSankey(k) {
+    if (hvSankeyReady) { buildSankeyNow(k); return; }
+    hvSankeyPending = k;
+    if (isMobile() && !hvSankeyObs) {
+      const panel = document.getElementById('hvPanel7');
+      if (!panel) return;
+      hvSankeyObs = new IntersectionObserver(entries => {
+        if (entries.some(e => e.isIntersecting)) { hvSankeyObs.disconnect(); hvShowSankey(); }
+      }, {rootMargin: '800px 0px'});
+      hvSankeyObs.observe(panel);
+    }
+  }
+
+"""
 
-    gv_viz_lines.append(line)
+SANKEY_CANVAS_JS = """
+  // Built-in canvas Sankey: stands in for Highcharts.chart() for the sankey series
+  function hvCanvasSankey(el, opts) {
+    const host = typeof el === 'string' ? document.getElementById(el) : el;
+    if (!host) return null;
+    const t0 = performance.now();
+    const ser = ((opts && opts.series) || [])[0] || {}, keys = ser.keys || ['from', 'to', 'weight'];
+    const links = (ser.data || []).map(d => Array.isArray(d) ? Object.fromEntries(keys.map((kk, i) => [kk, d[i]])) : d)
+      .filter(l => l && l.weight > 0);
+    const nodes = {}, order = [];
+    const node = id => nodes[id] || (order.push(id), nodes[id] = { id, name: id, inV: 0, outV: 0, col: 0, color: null });
+    (ser.nodes || []).forEach(n => { const o = node(n.id); if (n.color) o.color = n.color; if (n.name) o.name = n.name; });
+    links.forEach(l => { node(l.from).outV += l.weight; node(l.to).inV += l.weight; });
+    // Column = longest path from a source node (fuel -> category -> load)
+    for (let pass = 0; pass < order.length; pass++) {
+      links.forEach(l => { nodes[l.to].col = Math.max(nodes[l.to].col, nodes[l.from].col + 1); });
+    }
+    const cols = [];
+    order.forEach(id => {
+      const n = nodes[id];
+      if (!(n.inV || n.outV)) return;
+      n.v = Math.max(n.inV, n.outV);
+      (cols[n.col] = cols[n.col] || []).push(n);
+    });
+    const palette = Object.values(COL);
+    let pi = 0;
+    order.forEach(id => { if (!nodes[id].color) nodes[id].color = palette[pi++ % palette.length] || '#94A3B8'; });
+
+    host.innerHTML = '';
+    const c = document.createElement('canvas');
+    host.appendChild(c);
+    const dpr = window.devicePixelRatio || 1, w = host.clientWidth || 600, h = host.clientHeight || 380;
+    c.width = w * dpr; c.height = h * dpr; c.style.width = w + 'px'; c.style.height = h + 'px';
+    const ctx = c.getContext('2d'); ctx.scale(dpr, dpr);
+    const padX = 8, padY = 12, nodeW = 14, gap = 10, nc = Math.max(1, cols.length - 1);
+    const k = Math.min(...cols.filter(Boolean).map(cl =>
+      (h - 2 * padY - gap * (cl.length - 1)) / cl.reduce((s, n) => s + n.v, 0)));
+    cols.forEach((cl, ci) => {
+      if (!cl) return;
+      const x = padX + ci * (w - 2 * padX - nodeW) / nc;
+      let y = padY + (h - 2 * padY - (cl.reduce((s, n) => s + n.v, 0) * k + gap * (cl.length - 1))) / 2;
+      cl.forEach(n => { n.x = x; n.y = y; n.hh = n.v * k; n.oy = y; n.iy = y; y += n.hh + gap; });
+    });
+    ctx.globalAlpha = 0.45;
+    links.forEach(l => {
+      const s = nodes[l.from], t = nodes[l.to], th = l.weight * k;
+      const x0 = s.x + nodeW, x1 = t.x, xm = (x0 + x1) / 2, y0 = s.oy, y1 = t.iy;
+      s.oy += th; t.iy += th;
+      ctx.fillStyle = s.color;
+      ctx.beginPath();
+      ctx.moveTo(x0, y0); ctx.bezierCurveTo(xm, y0, xm, y1, x1, y1);
+      ctx.lineTo(x1, y1 + th); ctx.bezierCurveTo(xm, y1 + th, xm, y0 + th, x0, y0 + th);
+      ctx.closePath(); ctx.fill();
+    });
+    ctx.globalAlpha = 1;
+    ctx.font = '600 11px ' + getComputedStyle(document.body).fontFamily;
+    ctx.textBaseline = 'middle';
+    cols.forEach((cl, ci) => {
+      if (!cl) return;
+      const last = ci === cols.length - 1;
+      cl.forEach(n => {
+        ctx.fillStyle = n.color; ctx.fillRect(n.x, n.y, nodeW, Math.max(1, n.hh));
+        if (n.hh < 6) return;
+        ctx.fillStyle = '#1E293B'; ctx.textAlign = last ? 'right' : 'left';
+        ctx.fillText(n.name + ' ' + fmt(n.v, n.v < 10 ? 1 : 0), last ? n.x - 6 : n.x + nodeW + 6, n.y + n.hh / 2);
+      });
+    });
+    console.info('[sankey] canvas render ' + (performance.now() - t0).toFixed(1) + ' ms');
+    return { container: host, destroy() { host.innerHTML = ''; } };
+  }
+  const Highcharts = { chart: hvCanvasSankey, setOptions() {} };
+
+"""
 
-gv_viz_code = "".join(gv_viz_lines)
-print(f"  Hourly viz code: {len(gv_viz_code)} chars")
 
-# ── Build the combined HTML ────────────────────────────────────────────────────
-html = f'''<!DOCTYPE html>
+# ── Page template ─────────────────────────────────────────────────────────────
+# The page is assembled from plain strings: head, stylesheet, body markup, a
+# per-target config/data script and the shared app script (historic viz code,
+# hourly IIFE and init appended to APP_JS). The single-file build inlines all
+# of them; --targets writes the stylesheet and app script once as hashed
+# assets and gives each target page only its own config/data.
+PAGE_HEAD_HTML = '''<!DOCTYPE html>
 <html lang="en">
 <head>
 <meta charset="UTF-8">
 <meta name="viewport" content="width=device-width, initial-scale=1.0">
 <title>EIA Grid Explorer: Regional Grid Data &amp; Hourly Analysis</title>
-<link rel="preconnect" href="https://fonts.googleapis.com">
+'''
+
+# Replaced by inlined @font-face rules with --fonts (see font_subset.py)
+GOOGLE_FONTS_HTML = '''<link rel="preconnect" href="https://fonts.googleapis.com">
 <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
 <link href="https://fonts.googleapis.com/css2?family=Lexend:wght@400;500;600;700&family=Plus+Jakarta+Sans:ital,wght@0,400;0,500;0,600;0,700;1,400;1,500&family=Rajdhani:wght@400;500;600;700&family=Barlow+Semi+Condensed:wght@400;500;600;700;800&display=swap" rel="stylesheet">
-<script>{highcharts_js}</script>
-<script>{sankey_js}</script>
-<style>
-@font-face {{
+'''
+
+PAGE_CSS = '''@font-face {
   font-family:'Franklin Gothic Demi';
   src:local('Franklin Gothic Demi'),local('Franklin Gothic Medium'),local('ITC Franklin Gothic Demi'),local('Franklin Gothic Demi Cond');
   font-weight:600;font-style:normal;font-display:swap;
-}}
-:root {{
+}
+:root {
   /* Chart palette (unchanged — drives all visualizations) */
   --c-navy:#0A2540; --c-navy-dark:#061B2E; --c-navy-mid:#0F3460;
   --c-blue:#2372B9; --c-blue-light:#60A5FA; --c-blue-pale:#DBEAFE;
@@ -218,96 +638,130 @@ html = f'''<!DOCTYPE html>
   --shadow-lg:0 10px 15px -3px rgba(0,0,0,0.08),0 4px 6px -4px rgba(0,0,0,0.04);
   --shadow-xl:0 8px 24px rgba(26,39,68,0.3);
   --glass-bg:rgba(255,255,255,0.92); --glass-border:rgba(126,128,131,0.18);
-}}
-@keyframes fadeInUp {{
-  from {{ opacity:0;transform:translateY(20px); }}
-  to   {{ opacity:1;transform:translateY(0); }}
-}}
-@keyframes fadeIn {{ from {{ opacity:0; }} to {{ opacity:1; }} }}
-*,*::before,*::after{{box-sizing:border-box;margin:0;padding:0}}
-html{{font-size:17px;-webkit-font-smoothing:antialiased;-moz-osx-font-smoothing:grayscale;scroll-behavior:smooth}}
-body{{font-family:var(--font);color:var(--text-secondary);background:#0F1A2E;background-image:radial-gradient(ellipse at 20% 0%,rgba(14,165,233,0.06) 0%,transparent 50%),radial-gradient(ellipse at 80% 100%,rgba(245,158,11,0.04) 0%,transparent 50%);background-attachment:fixed;line-height:1.55;-webkit-font-smoothing:antialiased;overflow-x:hidden;}}
+}
+@keyframes fadeInUp {
+  from { opacity:0;transform:translateY(20px); }
+  to   { opacity:1;transform:translateY(0); }
+}
+@keyframes fadeIn { from { opacity:0; } to { opacity:1; } }
+*,*::before,*::after{box-sizing:border-box;margin:0;padding:0}
+html{font-size:17px;-webkit-font-smoothing:antialiased;-moz-osx-font-smoothing:grayscale;scroll-behavior:smooth}
+body{font-family:var(--font);color:var(--text-secondary);background:#0F1A2E;background-image:radial-gradient(ellipse at 20% 0%,rgba(14,165,233,0.06) 0%,transparent 50%),radial-gradient(ellipse at 80% 100%,rgba(245,158,11,0.04) 0%,transparent 50%);background-attachment:fixed;line-height:1.55;-webkit-font-smoothing:antialiased;overflow-x:hidden;}
 
 /* ═══ HEADER ═══ */
-.header{{background:linear-gradient(135deg,#0F1A2E 0%,#122952 30%,#1565C0 70%,#0D47A1 100%);color:#fff;padding:90px 24px 80px;text-align:center;position:relative;overflow:hidden;}}
-.header::before{{content:'';position:absolute;inset:0;z-index:1;pointer-events:none;background:radial-gradient(ellipse 55% 70% at 12% 75%,rgba(14,165,233,0.4) 0%,transparent 65%),radial-gradient(ellipse 45% 60% at 38% 85%,rgba(34,197,94,0.35) 0%,transparent 60%),radial-gradient(ellipse 50% 65% at 62% 80%,rgba(245,158,11,0.35) 0%,transparent 60%),radial-gradient(ellipse 40% 55% at 88% 70%,rgba(239,68,68,0.3) 0%,transparent 55%),url("data:image/svg+xml,%3Csvg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 1200 240' preserveAspectRatio='none'%3E%3Cdefs%3E%3ClinearGradient id='a1' x1='0' y1='0' x2='0' y2='1'%3E%3Cstop offset='0' stop-color='rgba(255,255,255,0.15)'/%3E%3Cstop offset='1' stop-color='rgba(255,255,255,0.01)'/%3E%3C/linearGradient%3E%3ClinearGradient id='a2' x1='0' y1='0' x2='0' y2='1'%3E%3Cstop offset='0' stop-color='rgba(34,197,94,0.35)'/%3E%3Cstop offset='1' stop-color='rgba(34,197,94,0.03)'/%3E%3C/linearGradient%3E%3ClinearGradient id='a3' x1='0' y1='0' x2='0' y2='1'%3E%3Cstop offset='0' stop-color='rgba(245,158,11,0.35)'/%3E%3Cstop offset='1' stop-color='rgba(245,158,11,0.03)'/%3E%3C/linearGradient%3E%3C/defs%3E%3Cpath d='M0,240 L0,130 C200,100 400,70 600,80 C800,90 1000,120 1200,100 L1200,240 Z' fill='url(%23a1)'/%3E%3Cpath d='M0,240 L0,160 C200,140 400,115 600,125 C800,135 1000,155 1200,140 L1200,240 Z' fill='url(%23a2)'/%3E%3Cpath d='M0,240 L0,190 C200,180 400,165 600,170 C800,175 1000,188 1200,180 L1200,240 Z' fill='url(%23a3)'/%3E%3Cpath d='M0,130 C200,100 400,70 600,80 C800,90 1000,120 1200,100' fill='none' stroke='rgba(255,255,255,0.45)' stroke-width='2'/%3E%3Cpath d='M0,160 C200,140 400,115 600,125 C800,135 1000,155 1200,140' fill='none' stroke='%2322C55E' stroke-width='2' stroke-opacity='0.6'/%3E%3Cpath d='M0,190 C200,180 400,165 600,170 C800,175 1000,188 1200,180' fill='none' stroke='%23F59E0B' stroke-width='2' stroke-opacity='0.6'/%3E%3C/svg%3E") no-repeat bottom center;background-size:100% 100%,100% 100%,100% 100%,100% 100%,100% 100%;}}
-.header::after{{content:'';position:absolute;inset:0;z-index:1;pointer-events:none;background:radial-gradient(ellipse 70% 45% at 50% 45%,rgba(5,15,35,0.55) 0%,transparent 100%),url("data:image/svg+xml,%3Csvg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 1200 80' preserveAspectRatio='none'%3E%3Cpath d='M0,50 L250,50 L270,18 L288,68 L306,22 L324,60 L342,50 L1200,50' fill='none' stroke='rgba(14,165,233,0.5)' stroke-width='2'/%3E%3Cpath d='M0,35 L600,35 L618,10 L636,60 L654,14 L672,55 L690,35 L1200,35' fill='none' stroke='rgba(245,158,11,0.4)' stroke-width='2'/%3E%3C/svg%3E") no-repeat top center;background-size:100% 100%,100% 80px;}}
-.header-accent{{position:absolute;bottom:0;left:0;right:0;height:4px;background:linear-gradient(90deg,#1A2744 0%,#0EA5E9 25%,#22C55E 50%,#F59E0B 75%,#EF4444 100%);z-index:2;}}
-.header h1{{font-family:var(--font-display);font-size:3.2rem;font-weight:700;letter-spacing:0.5px;margin-bottom:14px;position:relative;z-index:3;text-shadow:0 2px 20px rgba(0,0,0,0.5),0 1px 3px rgba(0,0,0,0.3);line-height:1.15;}}
-.header .subtitle{{font-family:var(--font);font-size:1.15rem;font-weight:400;opacity:0.92;max-width:660px;margin:0 auto;letter-spacing:0.2px;position:relative;z-index:3;text-shadow:0 2px 12px rgba(0,0,0,0.4),0 1px 2px rgba(0,0,0,0.2);line-height:1.55;}}
+.header{background:linear-gradient(135deg,#0F1A2E 0%,#122952 30%,#1565C0 70%,#0D47A1 100%);color:#fff;padding:90px 24px 80px;text-align:center;position:relative;overflow:hidden;}
+.header::before{content:'';position:absolute;inset:0;z-index:1;pointer-events:none;background:radial-gradient(ellipse 55% 70% at 12% 75%,rgba(14,165,233,0.4) 0%,transparent 65%),radial-gradient(ellipse 45% 60% at 38% 85%,rgba(34,197,94,0.35) 0%,transparent 60%),radial-gradient(ellipse 50% 65% at 62% 80%,rgba(245,158,11,0.35) 0%,transparent 60%),radial-gradient(ellipse 40% 55% at 88% 70%,rgba(239,68,68,0.3) 0%,transparent 55%),url("data:image/svg+xml,%3Csvg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 1200 240' preserveAspectRatio='none'%3E%3Cdefs%3E%3ClinearGradient id='a1' x1='0' y1='0' x2='0' y2='1'%3E%3Cstop offset='0' stop-color='rgba(255,255,255,0.15)'/%3E%3Cstop offset='1' stop-color='rgba(255,255,255,0.01)'/%3E%3C/linearGradient%3E%3ClinearGradient id='a2' x1='0' y1='0' x2='0' y2='1'%3E%3Cstop offset='0' stop-color='rgba(34,197,94,0.35)'/%3E%3Cstop offset='1' stop-color='rgba(34,197,94,0.03)'/%3E%3C/linearGradient%3E%3ClinearGradient id='a3' x1='0' y1='0' x2='0' y2='1'%3E%3Cstop offset='0' stop-color='rgba(245,158,11,0.35)'/%3E%3Cstop offset='1' stop-color='rgba(245,158,11,0.03)'/%3E%3C/linearGradient%3E%3C/defs%3E%3Cpath d='M0,240 L0,130 C200,100 400,70 600,80 C800,90 1000,120 1200,100 L1200,240 Z' fill='url(%23a1)'/%3E%3Cpath d='M0,240 L0,160 C200,140 400,115 600,125 C800,135 1000,155 1200,140 L1200,240 Z' fill='url(%23a2)'/%3E%3Cpath d='M0,240 L0,190 C200,180 400,165 600,170 C800,175 1000,188 1200,180 L1200,240 Z' fill='url(%23a3)'/%3E%3Cpath d='M0,130 C200,100 400,70 600,80 C800,90 1000,120 1200,100' fill='none' stroke='rgba(255,255,255,0.45)' stroke-width='2'/%3E%3Cpath d='M0,160 C200,140 400,115 600,125 C800,135 1000,155 1200,140' fill='none' stroke='%2322C55E' stroke-width='2' stroke-opacity='0.6'/%3E%3Cpath d='M0,190 C200,180 400,165 600,170 C800,175 1000,188 1200,180' fill='none' stroke='%23F59E0B' stroke-width='2' stroke-opacity='0.6'/%3E%3C/svg%3E") no-repeat bottom center;background-size:100% 100%,100% 100%,100% 100%,100% 100%,100% 100%;}
+.header::after{content:'';position:absolute;inset:0;z-index:1;pointer-events:none;background:radial-gradient(ellipse 70% 45% at 50% 45%,rgba(5,15,35,0.55) 0%,transparent 100%),url("data:image/svg+xml,%3Csvg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 1200 80' preserveAspectRatio='none'%3E%3Cpath d='M0,50 L250,50 L270,18 L288,68 L306,22 L324,60 L342,50 L1200,50' fill='none' stroke='rgba(14,165,233,0.5)' stroke-width='2'/%3E%3Cpath d='M0,35 L600,35 L618,10 L636,60 L654,14 L672,55 L690,35 L1200,35' fill='none' stroke='rgba(245,158,11,0.4)' stroke-width='2'/%3E%3C/svg%3E") no-repeat top center;background-size:100% 100%,100% 80px;}
+.header-accent{position:absolute;bottom:0;left:0;right:0;height:4px;background:linear-gradient(90deg,#1A2744 0%,#0EA5E9 25%,#22C55E 50%,#F59E0B 75%,#EF4444 100%);z-index:2;}
+.header h1{font-family:var(--font-display);font-size:3.2rem;font-weight:700;letter-spacing:0.5px;margin-bottom:14px;position:relative;z-index:3;text-shadow:0 2px 20px rgba(0,0,0,0.5),0 1px 3px rgba(0,0,0,0.3);line-height:1.15;}
+.header .subtitle{font-family:var(--font);font-size:1.15rem;font-weight:400;opacity:0.92;max-width:660px;margin:0 auto;letter-spacing:0.2px;position:relative;z-index:3;text-shadow:0 2px 12px rgba(0,0,0,0.4),0 1px 2px rgba(0,0,0,0.2);line-height:1.55;}
 
 /* ═══ MAP SECTION ═══ */
-.map-section{{max-width:1100px;margin:40px auto 0;padding:0 24px;text-align:center;}}
-.map-section h2{{font-family:var(--font-heading);font-size:1.8rem;font-weight:800;color:var(--c-navy);letter-spacing:-0.5px;margin-bottom:8px;}}
-.map-section .map-sub{{color:var(--c-gray-500);font-size:0.95rem;margin-bottom:24px;}}
-.map-card{{background:var(--glass-bg);backdrop-filter:blur(12px);border:1px solid var(--glass-border);border-radius:var(--radius-lg);padding:32px;box-shadow:var(--shadow-lg);}}
-#map-container{{max-width:920px;margin:0 auto;display:grid;grid-template-columns:repeat(auto-fill,minmax(130px,1fr));gap:12px;padding:0 8px;}}
-.region-tile{{position:relative;border-radius:var(--radius-md);background:var(--glass-bg);backdrop-filter:blur(8px);border:2px solid var(--c-gray-200);cursor:pointer;padding:12px 8px 10px;display:flex;flex-direction:column;align-items:center;gap:4px;transition:all 0.25s ease;overflow:hidden;}}
-.region-tile:hover{{border-color:var(--c-blue);background:rgba(35,114,185,0.06);transform:translateY(-2px);box-shadow:0 4px 12px rgba(35,114,185,0.15);}}
-.region-tile.active{{border-color:var(--c-gold);background:rgba(251,178,84,0.08);box-shadow:0 4px 16px rgba(251,178,84,0.2);}}
-.region-tile svg{{width:100%;height:70px;display:block;}}
-.region-tile svg path{{fill:var(--c-blue);opacity:0.25;transition:opacity 0.25s ease,fill 0.25s ease;}}
-.region-tile:hover svg path{{opacity:0.4;}}
-.region-tile.active svg path{{fill:var(--c-gold);opacity:0.5;}}
-.region-tile .tile-name{{font:700 0.82rem var(--font-heading);color:var(--c-navy);text-align:center;line-height:1.2;letter-spacing:-0.2px;}}
-.region-tile .tile-code{{font:600 0.65rem var(--font);color:var(--c-gray-400);text-transform:uppercase;letter-spacing:1px;}}
-.region-tile:hover .tile-name{{color:var(--c-blue);}}
-.region-tile.active .tile-name{{color:var(--c-navy);}}
+.map-section{max-width:1100px;margin:40px auto 0;padding:0 24px;text-align:center;}
+.map-section h2{font-family:var(--font-heading);font-size:1.8rem;font-weight:800;color:var(--c-navy);letter-spacing:-0.5px;margin-bottom:8px;}
+.map-section .map-sub{color:var(--c-gray-500);font-size:0.95rem;margin-bottom:24px;}
+.map-card{background:var(--glass-bg);backdrop-filter:blur(12px);border:1px solid var(--glass-border);border-radius:var(--radius-lg);padding:32px;box-shadow:var(--shadow-lg);}
+#map-container{max-width:920px;margin:0 auto;display:grid;grid-template-columns:repeat(auto-fill,minmax(130px,1fr));gap:12px;padding:0 8px;}
+.region-tile{position:relative;border-radius:var(--radius-md);background:var(--glass-bg);backdrop-filter:blur(8px);border:2px solid var(--c-gray-200);cursor:pointer;padding:12px 8px 10px;display:flex;flex-direction:column;align-items:center;gap:4px;transition:all 0.25s ease;overflow:hidden;}
+.region-tile:hover{border-color:var(--c-blue);background:rgba(35,114,185,0.06);transform:translateY(-2px);box-shadow:0 4px 12px rgba(35,114,185,0.15);}
+.region-tile.active{border-color:var(--c-gold);background:rgba(251,178,84,0.08);box-shadow:0 4px 16px rgba(251,178,84,0.2);}
+.region-tile svg{width:100%;height:70px;display:block;}
+.region-tile svg path{fill:var(--c-blue);opacity:0.25;transition:opacity 0.25s ease,fill 0.25s ease;}
+.region-tile:hover svg path{opacity:0.4;}
+.region-tile.active svg path{fill:var(--c-gold);opacity:0.5;}
+.region-tile .tile-name{font:700 0.82rem var(--font-heading);color:var(--c-navy);text-align:center;line-height:1.2;letter-spacing:-0.2px;}
+.region-tile .tile-code{font:600 0.65rem var(--font);color:var(--c-gray-400);text-transform:uppercase;letter-spacing:1px;}
+.region-tile:hover .tile-name{color:var(--c-blue);}
+.region-tile.active .tile-name{color:var(--c-navy);}
 
 /* ═══ REGION BANNER ═══ */
-.region-banner{{text-align:center;padding:20px;margin:24px auto 0;max-width:1100px;border-radius:var(--radius-md);background:linear-gradient(135deg,rgba(35,114,185,0.06) 0%,rgba(107,165,67,0.04) 100%);border:1px solid rgba(35,114,185,0.12);display:none;}}
-.region-banner h2{{font-family:var(--font-heading);font-size:1.8rem;font-weight:800;color:var(--c-navy);letter-spacing:-0.5px;}}
-.region-banner p{{color:var(--c-gray-500);font-size:0.9rem;margin-top:4px;}}
+.region-banner{text-align:center;padding:20px;margin:24px auto 0;max-width:1100px;border-radius:var(--radius-md);background:linear-gradient(135deg,rgba(35,114,185,0.06) 0%,rgba(107,165,67,0.04) 100%);border:1px solid rgba(35,114,185,0.12);display:none;}
+.region-banner h2{font-family:var(--font-heading);font-size:1.8rem;font-weight:800;color:var(--c-navy);letter-spacing:-0.5px;}
+.region-banner p{color:var(--c-gray-500);font-size:0.9rem;margin-top:4px;}
 
 /* ═══ MODE TOGGLE ═══ */
-.mode-toggle-section{{max-width:1100px;margin:24px auto 0;padding:0 24px;text-align:center;display:none;}}
-.mode-toggle-section.visible{{display:block;}}
-.mode-toggle{{display:inline-flex;background:var(--glass-bg);backdrop-filter:blur(12px);border:1px solid var(--glass-border);border-radius:var(--radius-pill);padding:4px;box-shadow:var(--shadow-md);}}
-.mode-btn{{padding:12px 28px;border-radius:var(--radius-pill);border:none;background:transparent;font-family:var(--font);font-size:0.92rem;font-weight:600;color:var(--c-gray-500);cursor:pointer;transition:all 0.3s ease;white-space:nowrap;}}
-.mode-btn:hover{{color:var(--c-navy);}}
-.mode-btn.active{{background:var(--c-navy);color:var(--c-white);box-shadow:0 2px 8px rgba(10,37,64,0.25);}}
-.mode-desc{{margin-top:12px;font-size:0.88rem;color:var(--c-gray-500);}}
+.mode-toggle-section{max-width:1100px;margin:24px auto 0;padding:0 24px;text-align:center;display:none;}
+.mode-toggle-section.visible{display:block;}
+.mode-toggle{display:inline-flex;background:var(--glass-bg);backdrop-filter:blur(12px);border:1px solid var(--glass-border);border-radius:var(--radius-pill);padding:4px;box-shadow:var(--shadow-md);}
+.mode-btn{padding:12px 28px;border-radius:var(--radius-pill);border:none;background:transparent;font-family:var(--font);font-size:0.92rem;font-weight:600;color:var(--c-gray-500);cursor:pointer;transition:all 0.3s ease;white-space:nowrap;}
+.mode-btn:hover{color:var(--c-navy);}
+.mode-btn.active{background:var(--c-navy);color:var(--c-white);box-shadow:0 2px 8px rgba(10,37,64,0.25);}
+.mode-desc{margin-top:12px;font-size:0.88rem;color:var(--c-gray-500);}
+
+/* ═══ COMPARE MODE ═══ */
+.compare-section{display:none;max-width:1100px;margin:24px auto 0;padding:0 24px;}
+.compare-section.visible{display:block;}
+.compare-card{background:var(--c-white);border:1px solid var(--c-gray-200);border-radius:var(--radius-lg);box-shadow:var(--shadow-md);padding:24px;}
+.compare-controls{display:flex;flex-wrap:wrap;gap:8px;align-items:center;justify-content:space-between;margin-bottom:16px;}
+.compare-metrics{display:flex;flex-wrap:wrap;gap:6px;}
+.compare-metric{padding:6px 14px;border-radius:var(--radius-pill);border:1px solid var(--c-gray-200);background:var(--c-gray-50);font:600 0.8rem var(--font);color:var(--c-gray-600);cursor:pointer;}
+.compare-metric:hover{color:var(--c-navy);}
+.compare-metric.active{background:var(--c-navy);border-color:var(--c-navy);color:var(--c-white);}
+.compare-year{padding:6px 10px;border-radius:var(--radius-sm);border:1px solid var(--c-gray-300);font:600 0.85rem var(--font);color:var(--c-navy);background:var(--c-white);}
+.compare-title{font:700 1.1rem var(--font-heading);color:var(--c-navy);margin-bottom:12px;}
+.compare-list{list-style:none;}
+.compare-row{display:grid;grid-template-columns:28px 150px 1fr 70px;align-items:center;gap:10px;padding:6px 4px;border-radius:var(--radius-sm);cursor:pointer;}
+.compare-row:hover{background:var(--c-gray-100);}
+.compare-row.active{background:rgba(251,178,84,0.15);}
+.compare-rank{font:700 0.8rem var(--font);color:var(--c-gray-400);text-align:right;}
+.compare-name{font:600 0.88rem var(--font);color:var(--c-navy);}
+.compare-bar{height:14px;background:var(--c-gray-100);border-radius:var(--radius-pill);overflow:hidden;}
+.compare-fill{display:block;height:100%;background:var(--c-blue);border-radius:var(--radius-pill);}
+.compare-fill.neg{background:var(--c-orange);}
+.compare-value{font:700 0.88rem var(--font);color:var(--c-navy);text-align:right;font-variant-numeric:tabular-nums;}
+
+/* ═══ WHAT-IF EMISSION FACTORS (hourly mode) ═══ */
+.scn-panel{position:fixed;left:16px;bottom:16px;z-index:900;width:300px;background:rgba(255,255,255,0.96);backdrop-filter:blur(12px);border:1px solid var(--c-gray-200);border-radius:var(--radius-md);box-shadow:var(--shadow-lg);font-size:0.8rem;color:var(--c-gray-700);}
+.scn-panel summary{padding:10px 14px;font:700 0.85rem var(--font);color:var(--c-navy);cursor:pointer;}
+.scn-panel[open] summary{border-bottom:1px solid var(--c-gray-200);}
+.scn-presets{display:flex;flex-wrap:wrap;gap:4px;padding:10px 14px 4px;}
+.scn-preset{padding:3px 10px;border-radius:var(--radius-pill);border:1px solid var(--c-gray-200);background:var(--c-gray-50);font:600 0.72rem var(--font);color:var(--c-gray-600);cursor:pointer;}
+.scn-preset.active{background:var(--c-navy);border-color:var(--c-navy);color:var(--c-white);}
+.scn-row{display:grid;grid-template-columns:48px 1fr 44px;align-items:center;gap:8px;padding:4px 14px;}
+.scn-row input[type=range]{width:100%;accent-color:var(--c-blue);}
+.scn-row b{text-align:right;color:var(--c-navy);font-variant-numeric:tabular-nums;}
+.scn-summary{padding:6px 14px 12px;color:var(--c-gray-500);line-height:1.5;}
 
 /* ═══ SHARED STORY STYLES ═══ */
-.story-container{{position:relative;display:none;max-width:1400px;margin:0 auto;}}
-.story-container.visible{{display:flex;}}
-.viz-sticky{{position:sticky;top:0;width:55%;height:100vh;display:flex;align-items:center;justify-content:center;background:var(--c-gray-50);z-index:1;overflow:hidden;}}
-.viz-panel{{position:absolute;inset:0;display:flex;flex-direction:column;align-items:center;justify-content:center;padding:24px;opacity:0;transform:scale(0.96) translateY(12px);transition:opacity 0.8s cubic-bezier(0.4,0,0.2,1),transform 0.8s cubic-bezier(0.4,0,0.2,1);pointer-events:none;}}
-.viz-panel.active{{opacity:1;transform:scale(1) translateY(0);pointer-events:auto;}}
-.viz-panel canvas{{width:100%;height:100%;border-radius:var(--radius-md);}}
-.viz-caption{{position:absolute;bottom:24px;left:24px;background:rgba(255,255,255,0.92);backdrop-filter:blur(12px);border:1px solid var(--glass-border);border-radius:var(--radius-md);padding:14px 20px;max-width:360px;font-size:0.82rem;color:var(--c-gray-600);line-height:1.6;box-shadow:var(--shadow-lg);z-index:10;opacity:0;transition:opacity 0.6s ease;}}
-.viz-caption.visible{{opacity:1;}}
-.viz-controls{{position:absolute;top:20px;left:50%;transform:translateX(-50%);z-index:20;display:flex;align-items:center;gap:12px;background:rgba(255,255,255,0.92);backdrop-filter:blur(12px);border:1px solid var(--glass-border);border-radius:var(--radius-pill);padding:8px 20px;box-shadow:var(--shadow-md);}}
-.viz-controls .yr-label{{font:700 15px var(--font);color:var(--c-navy);min-width:42px;text-align:center;}}
-.viz-controls input[type=range]{{-webkit-appearance:none;appearance:none;width:180px;height:6px;border-radius:3px;background:var(--c-gray-200);outline:none;cursor:pointer;}}
-.viz-controls input[type=range]::-webkit-slider-thumb{{-webkit-appearance:none;appearance:none;width:20px;height:20px;border-radius:50%;background:var(--c-blue);border:3px solid #fff;box-shadow:0 1px 4px rgba(0,0,0,0.2);cursor:pointer;transition:transform 0.15s ease;}}
-.viz-controls input[type=range]::-webkit-slider-thumb:hover{{transform:scale(1.2);}}
-.viz-controls input[type=range]::-moz-range-thumb{{width:20px;height:20px;border-radius:50%;background:var(--c-blue);border:3px solid #fff;box-shadow:0 1px 4px rgba(0,0,0,0.2);cursor:pointer;}}
-.viz-controls .yr-btn{{background:none;border:2px solid var(--c-gray-300);border-radius:50%;width:28px;height:28px;display:flex;align-items:center;justify-content:center;cursor:pointer;font:700 14px var(--font);color:var(--c-gray-600);transition:all 0.2s ease;}}
-.viz-controls .yr-btn:hover{{border-color:var(--c-blue);color:var(--c-blue);}}
-.viz-caption .cap-label{{font-weight:700;font-size:0.72rem;text-transform:uppercase;letter-spacing:0.8px;color:var(--c-blue);margin-bottom:4px;}}
+.story-container{position:relative;display:none;max-width:1400px;margin:0 auto;}
+.story-container.visible{display:flex;}
+.viz-sticky{position:sticky;top:0;width:55%;height:100vh;display:flex;align-items:center;justify-content:center;background:var(--c-gray-50);z-index:1;overflow:hidden;}
+.viz-panel{position:absolute;inset:0;display:flex;flex-direction:column;align-items:center;justify-content:center;padding:24px;opacity:0;transform:scale(0.96) translateY(12px);transition:opacity 0.8s cubic-bezier(0.4,0,0.2,1),transform 0.8s cubic-bezier(0.4,0,0.2,1);pointer-events:none;}
+.viz-panel.active{opacity:1;transform:scale(1) translateY(0);pointer-events:auto;}
+.viz-panel canvas{width:100%;height:100%;border-radius:var(--radius-md);}
+.viz-caption{position:absolute;bottom:24px;left:24px;background:rgba(255,255,255,0.92);backdrop-filter:blur(12px);border:1px solid var(--glass-border);border-radius:var(--radius-md);padding:14px 20px;max-width:360px;font-size:0.82rem;color:var(--c-gray-600);line-height:1.6;box-shadow:var(--shadow-lg);z-index:10;opacity:0;transition:opacity 0.6s ease;}
+.viz-caption.visible{opacity:1;}
+.viz-controls{position:absolute;top:20px;left:50%;transform:translateX(-50%);z-index:20;display:flex;align-items:center;gap:12px;background:rgba(255,255,255,0.92);backdrop-filter:blur(12px);border:1px solid var(--glass-border);border-radius:var(--radius-pill);padding:8px 20px;box-shadow:var(--shadow-md);}
+.viz-controls .yr-label{font:700 15px var(--font);color:var(--c-navy);min-width:42px;text-align:center;}
+.viz-controls input[type=range]{-webkit-appearance:none;appearance:none;width:180px;height:6px;border-radius:3px;background:var(--c-gray-200);outline:none;cursor:pointer;}
+.viz-controls input[type=range]::-webkit-slider-thumb{-webkit-appearance:none;appearance:none;width:20px;height:20px;border-radius:50%;background:var(--c-blue);border:3px solid #fff;box-shadow:0 1px 4px rgba(0,0,0,0.2);cursor:pointer;transition:transform 0.15s ease;}
+.viz-controls input[type=range]::-webkit-slider-thumb:hover{transform:scale(1.2);}
+.viz-controls input[type=range]::-moz-range-thumb{width:20px;height:20px;border-radius:50%;background:var(--c-blue);border:3px solid #fff;box-shadow:0 1px 4px rgba(0,0,0,0.2);cursor:pointer;}
+.viz-controls .yr-btn{background:none;border:2px solid var(--c-gray-300);border-radius:50%;width:28px;height:28px;display:flex;align-items:center;justify-content:center;cursor:pointer;font:700 14px var(--font);color:var(--c-gray-600);transition:all 0.2s ease;}
+.viz-controls .yr-btn:hover{border-color:var(--c-blue);color:var(--c-blue);}
+.viz-caption .cap-label{font-weight:700;font-size:0.72rem;text-transform:uppercase;letter-spacing:0.8px;color:var(--c-blue);margin-bottom:4px;}
 
 /* ═══ SLIDER SWEEP ANIMATION ═══ */
-@keyframes sliderGlow {{
-  0%,100% {{ box-shadow:0 0 0 0 rgba(35,114,185,0); }}
-  50% {{ box-shadow:0 0 16px 4px rgba(35,114,185,0.35); }}
-}}
-@keyframes sliderHintFade {{
-  0% {{ opacity:0; transform:translateX(-50%) translateY(6px); }}
-  15% {{ opacity:1; transform:translateX(-50%) translateY(0); }}
-  85% {{ opacity:1; transform:translateX(-50%) translateY(0); }}
-  100% {{ opacity:0; transform:translateX(-50%) translateY(-4px); }}
-}}
-.viz-controls.sweeping {{
+@keyframes sliderGlow {
+  0%,100% { box-shadow:0 0 0 0 rgba(35,114,185,0); }
+  50% { box-shadow:0 0 16px 4px rgba(35,114,185,0.35); }
+}
+@keyframes sliderHintFade {
+  0% { opacity:0; transform:translateX(-50%) translateY(6px); }
+  15% { opacity:1; transform:translateX(-50%) translateY(0); }
+  85% { opacity:1; transform:translateX(-50%) translateY(0); }
+  100% { opacity:0; transform:translateX(-50%) translateY(-4px); }
+}
+.viz-controls.sweeping {
   animation:sliderGlow 0.6s ease-in-out 3;
   border-color:var(--c-blue);
-}}
-.viz-controls.sweeping input[type=range]::-webkit-slider-thumb {{
+}
+.viz-controls.sweeping input[type=range]::-webkit-slider-thumb {
   background:var(--c-gold);
   transform:scale(1.3);
   box-shadow:0 2px 8px rgba(251,178,84,0.4);
-}}
-.slider-hint {{
+}
+.slider-hint {
   position:absolute;top:100%;left:50%;transform:translateX(-50%);
   margin-top:10px;white-space:nowrap;
   font:600 0.72rem var(--font);color:var(--c-blue);
@@ -317,119 +771,138 @@ body{{font-family:var(--font);color:var(--text-secondary);background:#0F1A2E;bac
   opacity:0;pointer-events:none;
   animation:sliderHintFade 4s ease forwards;
   animation-delay:2.2s;
-}}
-.narrative-column{{width:45%;position:relative;z-index:2;padding:0;}}
-.story-step{{min-height:100vh;display:flex;align-items:center;padding:80px 48px 80px 56px;}}
-.step-inner{{max-width:440px;opacity:0;transform:translateY(40px);transition:opacity 0.8s cubic-bezier(0.4,0,0.2,1),transform 0.8s cubic-bezier(0.4,0,0.2,1);}}
-.story-step.active .step-inner{{opacity:1;transform:translateY(0);}}
-.step-badge{{display:inline-block;padding:4px 14px;border-radius:var(--radius-pill);font-size:0.68rem;font-weight:700;letter-spacing:1px;text-transform:uppercase;margin-bottom:16px;}}
-.step-badge.blue{{background:rgba(35,114,185,0.12);color:var(--c-blue);}}
-.step-badge.orange{{background:rgba(244,123,39,0.12);color:#D4820C;}}
-.step-badge.green{{background:rgba(107,165,67,0.12);color:#6BA543;}}
-.step-badge.gold{{background:rgba(251,178,84,0.12);color:#B8860B;}}
-.step-badge.navy{{background:rgba(10,37,64,0.12);color:var(--c-navy);}}
-.step-badge.red{{background:rgba(192,57,43,0.12);color:#C0392B;}}
-.step-inner h2{{font-size:1.8rem;font-weight:800;color:var(--c-navy);letter-spacing:-0.8px;line-height:1.15;margin-bottom:16px;}}
-.step-inner p{{font-size:1.02rem;color:var(--c-gray-600);line-height:1.75;margin-bottom:16px;}}
-.step-inner p:last-child{{margin-bottom:0;}}
-.step-inner .hl{{font-weight:700;}}
-.step-inner .hl.blue{{color:var(--c-blue);}}
-.step-inner .hl.orange{{color:#D4820C;}}
-.step-inner .hl.green{{color:#6BA543;}}
-.step-inner .hl.gold{{color:#B8860B;}}
-.step-inner .hl.red{{color:#C0392B;}}
-.stat-row{{display:flex;gap:20px;margin:20px 0;flex-wrap:wrap;}}
-.stat-box{{flex:1;min-width:100px;background:var(--glass-bg);border:1px solid var(--glass-border);border-radius:var(--radius-md);padding:16px;text-align:center;backdrop-filter:blur(8px);}}
-.stat-box .sv{{font-size:1.6rem;font-weight:800;letter-spacing:-0.5px;font-variant-numeric:tabular-nums;color:var(--c-navy);line-height:1.1;}}
-.stat-box .sl{{font-size:0.72rem;color:var(--c-gray-500);margin-top:4px;font-weight:500;}}
-.inline-gradient{{height:10px;border-radius:5px;margin:12px 0;background:linear-gradient(90deg,#2372B9 0%,#6BA543 25%,#CADB2E 40%,#FBB254 55%,#D4820C 70%,#F47B27 82%,#C0392B 100%);border:1px solid rgba(0,0,0,0.08);}}
-.gradient-labels{{display:flex;justify-content:space-between;font-size:0.68rem;color:var(--c-gray-400);font-weight:600;}}
+}
+.narrative-column{width:45%;position:relative;z-index:2;padding:0;}
+.prerendered{display:none;}
+.story-step{min-height:100vh;display:flex;align-items:center;padding:80px 48px 80px 56px;}
+.step-inner{max-width:440px;opacity:0;transform:translateY(40px);transition:opacity 0.8s cubic-bezier(0.4,0,0.2,1),transform 0.8s cubic-bezier(0.4,0,0.2,1);}
+.story-step.active .step-inner{opacity:1;transform:translateY(0);}
+.step-badge{display:inline-block;padding:4px 14px;border-radius:var(--radius-pill);font-size:0.68rem;font-weight:700;letter-spacing:1px;text-transform:uppercase;margin-bottom:16px;}
+.step-badge.blue{background:rgba(35,114,185,0.12);color:var(--c-blue);}
+.step-badge.orange{background:rgba(244,123,39,0.12);color:#D4820C;}
+.step-badge.green{background:rgba(107,165,67,0.12);color:#6BA543;}
+.step-badge.gold{background:rgba(251,178,84,0.12);color:#B8860B;}
+.step-badge.navy{background:rgba(10,37,64,0.12);color:var(--c-navy);}
+.step-badge.red{background:rgba(192,57,43,0.12);color:#C0392B;}
+.step-inner h2{font-size:1.8rem;font-weight:800;color:var(--c-navy);letter-spacing:-0.8px;line-height:1.15;margin-bottom:16px;}
+.step-inner p{font-size:1.02rem;color:var(--c-gray-600);line-height:1.75;margin-bottom:16px;}
+.step-inner p:last-child{margin-bottom:0;}
+.step-inner .hl{font-weight:700;}
+.step-inner .hl.blue{color:var(--c-blue);}
+.step-inner .hl.orange{color:#D4820C;}
+.step-inner .hl.green{color:#6BA543;}
+.step-inner .hl.gold{color:#B8860B;}
+.step-inner .hl.red{color:#C0392B;}
+.stat-row{display:flex;gap:20px;margin:20px 0;flex-wrap:wrap;}
+.stat-box{flex:1;min-width:100px;background:var(--glass-bg);border:1px solid var(--glass-border);border-radius:var(--radius-md);padding:16px;text-align:center;backdrop-filter:blur(8px);}
+.stat-box .sv{font-size:1.6rem;font-weight:800;letter-spacing:-0.5px;font-variant-numeric:tabular-nums;color:var(--c-navy);line-height:1.1;}
+.stat-box .sl{font-size:0.72rem;color:var(--c-gray-500);margin-top:4px;font-weight:500;}
+.inline-gradient{height:10px;border-radius:5px;margin:12px 0;background:linear-gradient(90deg,#2372B9 0%,#6BA543 25%,#CADB2E 40%,#FBB254 55%,#D4820C 70%,#F47B27 82%,#C0392B 100%);border:1px solid rgba(0,0,0,0.08);}
+.gradient-labels{display:flex;justify-content:space-between;font-size:0.68rem;color:var(--c-gray-400);font-weight:600;}
 
 /* ═══ VIZ LABELS (Hourly mode) ═══ */
-.viz-label{{font-size:0.82rem;font-weight:700;color:var(--c-navy);letter-spacing:0.5px;text-transform:uppercase;margin-bottom:12px;text-align:center;}}
-.viz-sublabel{{font-size:0.78rem;color:var(--c-gray-500);margin-top:8px;text-align:center;max-width:400px;line-height:1.5;}}
+.viz-label{font-size:0.82rem;font-weight:700;color:var(--c-navy);letter-spacing:0.5px;text-transform:uppercase;margin-bottom:12px;text-align:center;}
+.viz-sublabel{font-size:0.78rem;color:var(--c-gray-500);margin-top:8px;text-align:center;max-width:400px;line-height:1.5;}
 
 /* ═══ CTA / FOOTER ═══ */
-.cta-section{{background:var(--c-navy);color:var(--c-white);padding:100px 48px;text-align:center;position:relative;overflow:hidden;display:none;}}
-.cta-section.visible{{display:block;}}
-.cta-section::before{{content:'';position:absolute;inset:0;background:linear-gradient(135deg,#0A2540 0%,#1a5a9e 40%,#2372B9 100%);opacity:0.95;}}
-.cta-content{{position:relative;z-index:2;max-width:680px;margin:0 auto;}}
-.cta-content h2{{font-size:2.4rem;font-weight:800;letter-spacing:-1px;margin-bottom:20px;line-height:1.1;}}
-.cta-content p{{font-size:1.05rem;opacity:0.8;line-height:1.7;margin-bottom:32px;}}
-.footer-attr{{text-align:center;padding:20px 24px 40px;font-size:0.78rem;color:var(--c-gray-400);background:var(--c-gray-50);max-width:1100px;margin:0 auto;line-height:1.6;display:none;}}
-.footer-attr.visible{{display:block;}}
-.scroll-progress{{position:fixed;top:0;left:0;height:3px;z-index:1001;background:linear-gradient(90deg,var(--c-blue),#F47B27,var(--c-green));width:0%;transition:width 0.1s;}}
-.bottom-bar{{position:fixed;bottom:0;left:0;right:0;height:4px;z-index:1000;background:linear-gradient(90deg,#2372B9 0%,#2372B9 33%,#F47B27 33%,#F47B27 66%,#6BA543 66%,#6BA543 100%);}}
-
-@media(max-width:1024px){{
-  .story-container.visible{{display:block;}}
-  .viz-sticky{{display:none;}}
-  .narrative-column{{width:100%;padding:0 0 32px;}}
-  .story-step{{min-height:auto;padding:24px 20px 32px;}}
-  .story-step .step-inner{{opacity:1;transform:none;transition:none;max-width:100%;}}
-  .mobile-act-panel{{margin:0 12px 40px;background:var(--c-white);border-radius:var(--radius-lg);box-shadow:var(--shadow-md);overflow:hidden;}}
-  .mobile-act-panel .viz-panel{{position:relative;inset:auto;opacity:1;transform:none;pointer-events:auto;transition:none;width:100%;min-height:370px;padding:56px 16px 16px;background:var(--c-gray-50);border-bottom:1px solid var(--glass-border);}}
-  .mobile-act-panel .viz-panel canvas{{width:100%;height:280px;display:block;}}
-  .mobile-act-panel .viz-panel .viz-label{{margin-bottom:12px;font-size:0.76rem;}}
-  .mobile-act-panel .viz-panel .viz-sublabel{{margin-top:12px;max-width:100%;font-size:0.72rem;}}
-  .mobile-act-panel .viz-panel #act7-chart{{height:300px !important;}}
-  .mobile-act-panel .viz-controls{{top:14px;padding:8px 16px;}}
-  .mobile-act-panel .viz-controls input[type=range]{{width:120px;}}
-  .mobile-act-panel .story-step{{padding:24px 24px 28px;}}
-  .mobile-act-panel .step-inner h2{{font-size:1.4rem;}}
-}}
-@media(max-width:768px){{
-  .header{{padding:40px 16px 36px;}}
-  .header h1{{font-size:1.8rem;letter-spacing:-0.5px;}}
-  .header .subtitle{{font-size:0.88rem;}}
-  .map-section{{padding:0 12px;margin-top:24px;}}
-  .map-section h2{{font-size:1.4rem;}}
-  .map-card{{padding:16px;}}
-  #map-container{{grid-template-columns:repeat(auto-fill,minmax(90px,1fr));gap:8px;padding:0;}}
-  .region-tile{{padding:8px 4px 6px;}}
-  .region-tile svg{{height:48px;}}
-  .region-tile .tile-name{{font-size:0.7rem;}}
-  .region-tile .tile-code{{font-size:0.58rem;}}
-  .region-banner{{margin:16px 12px 0;padding:14px;}}
-  .region-banner h2{{font-size:1.3rem;}}
-  .mode-toggle-section{{padding:0 12px;margin-top:16px;}}
-  .mode-toggle{{flex-direction:column;gap:4px;border-radius:var(--radius-md);}}
-  .mode-btn{{padding:10px 20px;font-size:0.82rem;border-radius:var(--radius-md);}}
-  .viz-controls{{padding:6px 12px;gap:8px;}}
-  .viz-controls input[type=range]{{width:120px;}}
-  .viz-controls .yr-label{{font-size:13px;min-width:36px;}}
-  .viz-controls .yr-btn{{width:24px;height:24px;font-size:12px;}}
-  .step-inner h2{{font-size:1.35rem;}}
-  .step-inner p{{font-size:0.92rem;}}
-  .stat-row{{gap:10px;}}
-  .stat-box{{min-width:70px;padding:10px;}}
-  .stat-box .sv{{font-size:1.25rem;}}
-  .stat-box .sl{{font-size:0.65rem;}}
-  .viz-label{{font-size:0.72rem;}}
-  .viz-sublabel{{font-size:0.68rem;max-width:300px;}}
-  .cta-section{{padding:60px 20px;}}
-  .cta-content h2{{font-size:1.6rem;}}
-  .cta-content p{{font-size:0.9rem;}}
-  .slider-hint{{font-size:0.65rem;padding:4px 10px;}}
-}}
-@media(max-width:480px){{
-  .header{{padding:28px 12px 24px;}}
-  .header h1{{font-size:1.5rem;}}
-  .header .subtitle{{font-size:0.8rem;line-height:1.45;}}
-  #map-container{{grid-template-columns:repeat(auto-fill,minmax(75px,1fr));gap:6px;}}
-  .region-tile svg{{height:36px;}}
-  .mobile-act-panel{{margin:0 8px 32px;}}
-  .mobile-act-panel .viz-panel{{min-height:300px;padding:50px 12px 12px;}}
-  .mobile-act-panel .viz-panel canvas{{height:230px;}}
-  .story-step{{padding:32px 16px;}}
-  .step-inner h2{{font-size:1.15rem;}}
-  .step-inner p{{font-size:0.85rem;line-height:1.6;}}
-  .viz-controls{{flex-wrap:wrap;justify-content:center;}}
-  .mode-desc{{font-size:0.78rem;}}
-}}
-</style>
-</head>
-<body>
+.cta-section{background:var(--c-navy);color:var(--c-white);padding:100px 48px;text-align:center;position:relative;overflow:hidden;display:none;}
+.cta-section.visible{display:block;}
+.cta-section::before{content:'';position:absolute;inset:0;background:linear-gradient(135deg,#0A2540 0%,#1a5a9e 40%,#2372B9 100%);opacity:0.95;}
+.cta-content{position:relative;z-index:2;max-width:680px;margin:0 auto;}
+.cta-content h2{font-size:2.4rem;font-weight:800;letter-spacing:-1px;margin-bottom:20px;line-height:1.1;}
+.cta-content p{font-size:1.05rem;opacity:0.8;line-height:1.7;margin-bottom:32px;}
+.footer-attr{text-align:center;padding:20px 24px 40px;font-size:0.78rem;color:var(--c-gray-400);background:var(--c-gray-50);max-width:1100px;margin:0 auto;line-height:1.6;display:none;}
+.footer-attr.visible{display:block;}
+.scroll-progress{position:fixed;top:0;left:0;height:3px;z-index:1001;background:linear-gradient(90deg,var(--c-blue),#F47B27,var(--c-green));width:0%;transition:width 0.1s;}
+.bottom-bar{position:fixed;bottom:0;left:0;right:0;height:4px;z-index:1000;background:linear-gradient(90deg,#2372B9 0%,#2372B9 33%,#F47B27 33%,#F47B27 66%,#6BA543 66%,#6BA543 100%);}
+
+@media(max-width:1024px){
+  .story-container.visible{display:block;}
+  .viz-sticky{display:none;}
+  .narrative-column{width:100%;padding:0 0 32px;}
+  .story-step{min-height:auto;padding:24px 20px 32px;}
+  .story-step .step-inner{opacity:1;transform:none;transition:none;max-width:100%;}
+  .mobile-act-panel{margin:0 12px 40px;background:var(--c-white);border-radius:var(--radius-lg);box-shadow:var(--shadow-md);overflow:hidden;}
+  .mobile-act-panel .viz-panel{position:relative;inset:auto;opacity:1;transform:none;pointer-events:auto;transition:none;width:100%;min-height:370px;padding:56px 16px 16px;background:var(--c-gray-50);border-bottom:1px solid var(--glass-border);}
+  .mobile-act-panel .viz-panel canvas{width:100%;height:280px;display:block;}
+  .mobile-act-panel .viz-panel .viz-label{margin-bottom:12px;font-size:0.76rem;}
+  .mobile-act-panel .viz-panel .viz-sublabel{margin-top:12px;max-width:100%;font-size:0.72rem;}
+  .mobile-act-panel .viz-panel #act7-chart{height:300px !important;}
+  .mobile-act-panel .viz-controls{top:14px;padding:8px 16px;}
+  .mobile-act-panel .viz-controls input[type=range]{width:120px;}
+  .mobile-act-panel .story-step{padding:24px 24px 28px;}
+  .mobile-act-panel .step-inner h2{font-size:1.4rem;}
+}
+@media(max-width:768px){
+  .header{padding:40px 16px 36px;}
+  .header h1{font-size:1.8rem;letter-spacing:-0.5px;}
+  .header .subtitle{font-size:0.88rem;}
+  .map-section{padding:0 12px;margin-top:24px;}
+  .map-section h2{font-size:1.4rem;}
+  .map-card{padding:16px;}
+  #map-container{grid-template-columns:repeat(auto-fill,minmax(90px,1fr));gap:8px;padding:0;}
+  .region-tile{padding:8px 4px 6px;}
+  .region-tile svg{height:48px;}
+  .region-tile .tile-name{font-size:0.7rem;}
+  .region-tile .tile-code{font-size:0.58rem;}
+  .region-banner{margin:16px 12px 0;padding:14px;}
+  .region-banner h2{font-size:1.3rem;}
+  .mode-toggle-section{padding:0 12px;margin-top:16px;}
+  .mode-toggle{flex-direction:column;gap:4px;border-radius:var(--radius-md);}
+  .mode-btn{padding:10px 20px;font-size:0.82rem;border-radius:var(--radius-md);}
+  .compare-section{padding:0 12px;margin-top:16px;}
+  .compare-card{padding:14px;}
+  .compare-row{grid-template-columns:22px 96px 1fr 56px;gap:6px;}
+  .compare-name,.compare-value{font-size:0.78rem;}
+  .scn-panel{left:8px;bottom:12px;width:calc(100% - 16px);max-width:300px;}
+  .viz-controls{padding:6px 12px;gap:8px;}
+  .viz-controls input[type=range]{width:120px;}
+  .viz-controls .yr-label{font-size:13px;min-width:36px;}
+  .viz-controls .yr-btn{width:24px;height:24px;font-size:12px;}
+  .step-inner h2{font-size:1.35rem;}
+  .step-inner p{font-size:0.92rem;}
+  .stat-row{gap:10px;}
+  .stat-box{min-width:70px;padding:10px;}
+  .stat-box .sv{font-size:1.25rem;}
+  .stat-box .sl{font-size:0.65rem;}
+  .viz-label{font-size:0.72rem;}
+  .viz-sublabel{font-size:0.68rem;max-width:300px;}
+  .cta-section{padding:60px 20px;}
+  .cta-content h2{font-size:1.6rem;}
+  .cta-content p{font-size:0.9rem;}
+  .slider-hint{font-size:0.65rem;padding:4px 10px;}
+}
+@media(max-width:480px){
+  .header{padding:28px 12px 24px;}
+  .header h1{font-size:1.5rem;}
+  .header .subtitle{font-size:0.8rem;line-height:1.45;}
+  #map-container{grid-template-columns:repeat(auto-fill,minmax(75px,1fr));gap:6px;}
+  .region-tile svg{height:36px;}
+  .mobile-act-panel{margin:0 8px 32px;}
+  .mobile-act-panel .viz-panel{min-height:300px;padding:50px 12px 12px;}
+  .mobile-act-panel .viz-panel canvas{height:230px;}
+  .story-step{padding:32px 16px;}
+  .step-inner h2{font-size:1.15rem;}
+  .step-inner p{font-size:0.85rem;line-height:1.6;}
+  .viz-controls{flex-wrap:wrap;justify-content:center;}
+  .mode-desc{font-size:0.78rem;}
+}
+'''
+
+# The pre-rendered narrative (#gsPrerendered, see narrative.py) is only shown
+# with scripting disabled; the page's script takes the cards out of it instead.
+NOSCRIPT_CSS_HTML = '''<noscript><style>
+.prerendered{display:block;max-width:760px;margin:0 auto;padding:0 24px 48px;}
+.pre-region{margin-top:48px;}
+.pre-title{font-size:1.6rem;font-weight:800;color:var(--c-navy);}
+.pre-sub{color:var(--c-gray-600);margin-bottom:8px;}
+.prerendered .story-step{min-height:auto;padding:16px 0;}
+.prerendered .step-inner{opacity:1;transform:none;max-width:100%;}
+.prerendered .step-inner p[style]{display:none;}
+</style></noscript>
+'''
+
+BODY_HEADER_HTML = '''<body>
 <div class="scroll-progress" id="progressBar"></div>
 
 <header class="header">
@@ -438,12 +911,16 @@ body{{font-family:var(--font);color:var(--text-secondary);background:#0F1A2E;bac
   <div class="header-accent"></div>
 </header>
 
-<section class="map-section">
+'''
+
+MAP_SECTION_HTML = '''<section class="map-section">
   <h2>Choose Your Grid Region</h2>
   <p class="map-sub">Click a region to explore its energy data. Then choose between historic trends or hourly grid analysis.</p>
   <div class="map-card"><div id="map-container"></div></div>
 </section>
+'''
 
+BODY_MAIN_HTML = '''
 <div class="region-banner" id="region-banner">
   <h2 id="region-title"></h2>
   <p id="region-subtitle"></p>
@@ -453,10 +930,23 @@ body{{font-family:var(--font);color:var(--text-secondary);background:#0F1A2E;bac
   <div class="mode-toggle">
     <button class="mode-btn active" id="btnHistoric" onclick="setMode('historic')">Historic Grid Mix (2019&ndash;2025)</button>
     <button class="mode-btn" id="btnHourly" onclick="setMode('hourly')">How This Grid Works (Hourly)</button>
+    <button class="mode-btn" id="btnCompare" onclick="setMode('compare')" hidden>Compare Regions</button>
   </div>
   <p class="mode-desc" id="modeDesc">Explore how the generation mix has changed across 7 years of EIA data.</p>
 </div>
 
+<!-- ═══════════ COMPARE MODE (all regions, ranked at build time) ═══════════ -->
+<section class="compare-section" id="compareContainer">
+  <div class="compare-card">
+    <div class="compare-controls">
+      <div class="compare-metrics" id="cmpMetrics"></div>
+      <select class="compare-year" id="cmpYear" aria-label="Year" onchange="cmpSetYear(this.value)"></select>
+    </div>
+    <h3 class="compare-title" id="cmpTitle"></h3>
+    <ol class="compare-list" id="cmpList"></ol>
+  </div>
+</section>
+
 <!-- ═══════════ HISTORIC MODE (EIA Grid Story) ═══════════ -->
 <div class="story-container" id="historicContainer">
   <div class="viz-sticky" id="vizStickyH">
@@ -472,6 +962,12 @@ body{{font-family:var(--font);color:var(--text-secondary);background:#0F1A2E;bac
 
 <!-- ═══════════ HOURLY MODE (3D Grid Viz) ═══════════ -->
 <div class="story-container" id="hourlyContainer">
+  <details class="scn-panel" id="scnPanel">
+    <summary>What if: emission factors</summary>
+    <div class="scn-presets" id="scnPresets"></div>
+    <div id="scnSliders"></div>
+    <div class="scn-summary" id="scnSummary">Change a fuel's kg CO&#8322;/MWh to recompute every hourly rate.</div>
+  </details>
   <div class="viz-sticky" id="vizStickyHr">
     <div class="viz-panel" id="hvPanel1" data-act="1">
       <div class="viz-label" id="hvLbl1">Every Hour of Electricity Generation in 2024</div>
@@ -595,128 +1091,158 @@ body{{font-family:var(--font);color:var(--text-secondary);background:#0F1A2E;bac
 <div class="footer-attr" id="footerAttr">Data: U.S. Energy Information Administration (EIA) Form 930 &middot; Hourly Electric Grid Monitor &middot; 2019&ndash;2025 &middot; 13 Grid Regions</div>
 <div class="bottom-bar"></div>
 
-<script>
-// ═══════════════════════════════════════════════════════════════════════════
-// DATA
-// ═══════════════════════════════════════════════════════════════════════════
-{gs_data_line}
-{gv_data_line}
+'''
 
-// ═══════════════════════════════════════════════════════════════════════════
+APP_JS = '''// ═══════════════════════════════════════════════════════════════════════════
 // SHARED STATE
 // ═══════════════════════════════════════════════════════════════════════════
 let selectedRegion = null;
 let currentMode = 'historic';
 
-// ═══════════════════════════════════════════════════════════════════════════
-// SHARED REGIONS (uses .name/.desc from EIA Grid Story format)
-// ═══════════════════════════════════════════════════════════════════════════
-const REGIONS = {{
-  CAL:{{name:'California',desc:'CAISO / Western'}},
-  CAR:{{name:'Carolinas',desc:'Duke Energy / Southeast'}},
-  CENT:{{name:'Central',desc:'SPP / Central'}},
-  FLA:{{name:'Florida',desc:'FRCC / Southeast'}},
-  MIDA:{{name:'Mid-Atlantic',desc:'PJM Interconnection'}},
-  MIDW:{{name:'Midwest',desc:'MISO / Eastern'}},
-  NE:{{name:'New England',desc:'ISO-NE / Northeast'}},
-  NW:{{name:'Northwest',desc:'BPA / Western'}},
-  NY:{{name:'New York',desc:'NYISO / Northeast'}},
-  SE:{{name:'Southeast',desc:'Southern Co / Southeast'}},
-  SW:{{name:'Southwest',desc:'Western Interconnection'}},
-  TEN:{{name:'Tennessee',desc:'TVA / Southeast'}},
-  TEX:{{name:'Texas',desc:'ERCOT Interconnection'}}
-}};
-
-const TILE_ORDER = ['NW','CAL','SW','CENT','TEX','MIDW','MIDA','NY','NE','TEN','SE','CAR','FLA'];
-
-function buildMap() {{
-  const container = document.getElementById('map-container');
-  container.innerHTML = '';
-  const T = {tile_paths};
-  TILE_ORDER.forEach(k => {{
-    if (!T[k] || !REGIONS[k]) return;
-    const tile = document.createElement('div');
-    tile.className = 'region-tile'; tile.dataset.region = k;
+function buildTile(k) {
+  const T = TILE_PATHS;
+  const tile = document.createElement('div');
+  tile.className = 'region-tile'; tile.dataset.region = k;
+  if (T[k]) {
     const ns = 'http://www.w3.org/2000/svg';
     const svg = document.createElementNS(ns, 'svg');
     svg.setAttribute('viewBox', T[k].vb); svg.setAttribute('preserveAspectRatio', 'xMidYMid meet');
     const p = document.createElementNS(ns, 'path');
     p.setAttribute('d', T[k].d); p.setAttribute('fill-rule', 'evenodd');
     svg.appendChild(p);
-    const name = document.createElement('div'); name.className = 'tile-name'; name.textContent = REGIONS[k].name;
-    const code = document.createElement('div'); code.className = 'tile-code'; code.textContent = k;
-    tile.appendChild(svg); tile.appendChild(name); tile.appendChild(code);
-    tile.addEventListener('click', () => selectRegion(k));
-    container.appendChild(tile);
-  }});
-}}
-
-function selectRegion(rk) {{
+    tile.appendChild(svg);
+  }
+  const name = document.createElement('div'); name.className = 'tile-name'; name.textContent = REGIONS[k].name;
+  const code = document.createElement('div'); code.className = 'tile-code'; code.textContent = k;
+  tile.appendChild(name); tile.appendChild(code);
+  if (k === selectedRegion) tile.classList.add('active');
+  tile.addEventListener('click', () => selectRegion(k));
+  return tile;
+}
+
+function buildMap() {
+  const container = document.getElementById('map-container');
+  container.innerHTML = '';
+  TILE_ORDER.forEach(k => {
+    if (!TILE_PATHS[k] || !REGIONS[k]) return;
+    container.appendChild(buildTile(k));
+  });
+}
+
+function selectRegion(rk) {
   selectedRegion = rk;
-  document.querySelectorAll('.region-tile').forEach(t => {{
+  document.querySelectorAll('.region-tile').forEach(t => {
     if (t.dataset.region === rk) t.classList.add('active');
     else t.classList.remove('active');
-  }});
+  });
   const info = REGIONS[rk], banner = document.getElementById('region-banner');
   banner.style.display = '';
   document.getElementById('region-title').textContent = info.name + ' (' + rk + ')';
   document.getElementById('region-subtitle').textContent = info.desc;
   document.getElementById('modeToggleSection').classList.add('visible');
   activateMode(rk);
-  banner.scrollIntoView({{ behavior: 'smooth', block: 'start' }});
-}}
+  if (TILE_ORDER.length > 1) banner.scrollIntoView({ behavior: 'smooth', block: 'start' });
+}
 
-function setMode(mode) {{
+function setMode(mode) {
   currentMode = mode;
   document.getElementById('btnHistoric').classList.toggle('active', mode === 'historic');
   document.getElementById('btnHourly').classList.toggle('active', mode === 'hourly');
+  document.getElementById('btnCompare').classList.toggle('active', mode === 'compare');
   document.getElementById('modeDesc').textContent = mode === 'historic'
     ? 'Explore how the generation mix has changed across 7 years of EIA data.'
-    : 'See how the grid dispatches generation hour by hour throughout 2024.';
+    : mode === 'hourly' ? 'See how the grid dispatches generation hour by hour throughout 2024.'
+    : 'Rank every region by one metric and year. Select a row to open that region.';
+  document.getElementById('compareContainer').classList.toggle('visible', mode === 'compare');
   if (selectedRegion) activateMode(selectedRegion);
-}}
+  else if (mode === 'compare') cmpRender();
+}
 
-function activateMode(rk) {{
+function activateMode(rk) {
   const hc = document.getElementById('historicContainer');
   const hr = document.getElementById('hourlyContainer');
   const cta = document.getElementById('ctaSection');
   const fa = document.getElementById('footerAttr');
 
-  if (currentMode === 'historic') {{
+  if (currentMode === 'compare') {
+    hc.classList.remove('visible'); hr.classList.remove('visible');
+    cmpRender();
+  } else if (currentMode === 'historic') {
     hc.classList.add('visible'); hr.classList.remove('visible');
     gsInit(rk);
-  }} else {{
+  } else {
     hr.classList.add('visible'); hc.classList.remove('visible');
     hvInit(rk);
-  }}
+  }
   cta.classList.add('visible');
   fa.classList.add('visible');
-}}
+}
+
+// ═══════════════════════════════════════════════════════════════════════════
+// COMPARE MODE: all regions ranked by metric / year. RANK_INDEX holds every
+// (metric, year) list pre-sorted by the build (rankings.py); a switch only
+// rewrites the 13 rows.
+// ═══════════════════════════════════════════════════════════════════════════
+let cmpMetric = 0, cmpYear = null;
+
+function cmpInit() {
+  if (!RANK_INDEX) return;
+  document.getElementById('btnCompare').hidden = false;
+  document.getElementById('modeToggleSection').classList.add('visible');
+  document.getElementById('cmpMetrics').innerHTML = RANK_INDEX.metrics.map((m, i) =>
+    `<button class="compare-metric" data-i="${i}" onclick="cmpSetMetric(${i})">${m.label}</button>`).join('');
+}
+
+function cmpSetMetric(i) { cmpMetric = i; cmpRender(); }
+function cmpSetYear(y) { cmpYear = +y; cmpRender(); }
+function cmpOpen(k) { setMode('historic'); selectRegion(k); }
+
+function cmpRender() {
+  if (!RANK_INDEX) return;
+  const m = RANK_INDEX.metrics[cmpMetric];
+  if (!m.years.includes(cmpYear)) cmpYear = m.years[m.years.length - 1];
+  document.querySelectorAll('.compare-metric').forEach(b => b.classList.toggle('active', +b.dataset.i === cmpMetric));
+  const sel = document.getElementById('cmpYear');
+  sel.innerHTML = m.years.map(y => `<option${y === cmpYear ? ' selected' : ''}>${y}</option>`).join('');
+  sel.disabled = m.years.length < 2;
+  document.getElementById('cmpTitle').textContent =
+    m.label + ', ' + cmpYear + ' (' + m.unit + (m.order === 'asc' ? ', lowest first' : '') + ')';
+  const [order, values] = RANK_INDEX.rank[m.key][cmpYear];
+  const max = Math.max(...values.map(Math.abs)) || 1;
+  document.getElementById('cmpList').innerHTML = order.map((ri, i) => {
+    const k = RANK_INDEX.regions[ri], v = values[i];
+    const label = (v > 0 && m.unit === 'pts' ? '+' : '') + v.toFixed(m.digits);
+    return `<li class="compare-row${k === selectedRegion ? ' active' : ''}" onclick="cmpOpen('${k}')">`
+      + `<span class="compare-rank">${i + 1}</span><span class="compare-name">${REGIONS[k] ? REGIONS[k].name : k}</span>`
+      + `<span class="compare-bar"><span class="compare-fill${v < 0 ? ' neg' : ''}" style="width:${(Math.abs(v) / max * 100).toFixed(1)}%"></span></span>`
+      + `<span class="compare-value">${label}</span></li>`;
+  }).join('');
+}
 
 // ═══════════════════════════════════════════════════════════════════════════
 // HISTORIC MODE (from EIA Grid Story)
 // ═══════════════════════════════════════════════════════════════════════════
 var GS_DATA;
-var gsCurrentStep = 0, gsAnimFrames = {{}};
-const RCOL_H = {{CAL:'#2372B9',CAR:'#6BA543',CENT:'#D4820C',FLA:'#F47B27',MIDA:'#0F3460',MIDW:'#007FA4',NE:'#5B8DEF',NW:'#2E7D32',NY:'#7B1FA2',SE:'#C0392B',SW:'#E65100',TEN:'#00838F',TEX:'#FBB254'}};
-const SRC = {{coal:{{c:'#5C636A',n:'Coal'}},gas:{{c:'#D4820C',n:'Natural Gas'}},nuclear:{{c:'#2372B9',n:'Nuclear'}},oil:{{c:'#8B5E3C',n:'Oil'}},solar:{{c:'#FBB254',n:'Solar'}},wind:{{c:'#CADB2E',n:'Wind'}},hydro:{{c:'#007FA4',n:'Hydro'}},storage:{{c:'#F47B27',n:'Storage'}},geo:{{c:'#6BA543',n:'Geothermal'}},other:{{c:'#94A3B8',n:'Other'}}}};
+var gsCurrentStep = 0, gsAnimFrames = {};
+const RCOL_H = {CAL:'#2372B9',CAR:'#6BA543',CENT:'#D4820C',FLA:'#F47B27',MIDA:'#0F3460',MIDW:'#007FA4',NE:'#5B8DEF',NW:'#2E7D32',NY:'#7B1FA2',SE:'#C0392B',SW:'#E65100',TEN:'#00838F',TEX:'#FBB254'};
+const SRC = {coal:{c:'#5C636A',n:'Coal'},gas:{c:'#D4820C',n:'Natural Gas'},nuclear:{c:'#2372B9',n:'Nuclear'},oil:{c:'#8B5E3C',n:'Oil'},solar:{c:'#FBB254',n:'Solar'},wind:{c:'#CADB2E',n:'Wind'},hydro:{c:'#007FA4',n:'Hydro'},storage:{c:'#F47B27',n:'Storage'},geo:{c:'#6BA543',n:'Geothermal'},other:{c:'#94A3B8',n:'Other'}};
 const FUELS = ['coal','gas','oil','other','nuclear','hydro','geo','wind','solar','storage'];
 const CLEAN = ['nuclear','hydro','geo','wind','solar'], FOSSIL = ['coal','gas','oil'];
-const fmt = (v,d=0) => v==null||isNaN(v)?'-':Number(v).toLocaleString('en-US',{{minimumFractionDigits:d,maximumFractionDigits:d}});
+const fmt = (v,d=0) => v==null||isNaN(v)?'-':Number(v).toLocaleString('en-US',{minimumFractionDigits:d,maximumFractionDigits:d});
 const gv = (yr,f) => Math.max(0,yr[f+'_gwh']||0);
 const totalGen = yr => FUELS.reduce((s,f)=>s+gv(yr,f),0);
-const cleanPct = yr => {{ const t=totalGen(yr); return t>0?CLEAN.reduce((s,f)=>s+gv(yr,f),0)/t*100:0; }};
+const cleanPct = yr => { const t=totalGen(yr); return t>0?CLEAN.reduce((s,f)=>s+gv(yr,f),0)/t*100:0; };
 
 let gsScrollObserver = null;
-function isMobile() {{ return window.innerWidth <= 1024; }}
+function isMobile() { return window.innerWidth <= 1024; }
 
-function gsGetPanelMap(rk) {{
+function gsGetPanelMap(rk) {
   const rd = GS_DATA.annual[rk], years = Object.keys(rd).sort();
   const hasCoal = (rd[years[0]].coal_gwh||0)>10 || (rd[years[years.length-1]].coal_gwh||0)>10;
   return hasCoal ? [2,3,4,5,6,7] : [2,3,5,6,7];
-}}
+}
 
-function gsSetupMobileLayout(rk) {{
+function gsSetupMobileLayout(rk) {
   if (!isMobile()) return;
   const vizSticky = document.getElementById('vizStickyH');
   const narr = document.getElementById('narrativeColumnH');
@@ -724,48 +1250,50 @@ function gsSetupMobileLayout(rk) {{
   const panelMap = gsGetPanelMap(rk);
 
   // Move all panels back to vizSticky first (cleanup from previous region)
-  [2,3,4,5,6,7].forEach(n => {{
+  [2,3,4,5,6,7].forEach(n => {
     const p = document.getElementById('vizPanel'+n);
     if (p && !vizSticky.contains(p)) vizSticky.appendChild(p);
-  }});
+  });
 
   narr.innerHTML = '';
-  steps.forEach((step, i) => {{
+  steps.forEach((step, i) => {
     const panelNum = panelMap[i];
     const panel = document.getElementById('vizPanel'+panelNum);
     const wrap = document.createElement('div');
     wrap.className = 'mobile-act-panel';
-    if (panel) {{
+    if (panel) {
       panel.classList.add('active');
       wrap.appendChild(panel);
-    }}
+    }
     step.classList.add('active');
     wrap.appendChild(step);
     narr.appendChild(wrap);
-  }});
+  });
 
   // Draw all visualizations after layout settles
-  Object.values(gsAnimFrames).forEach(id => cancelAnimationFrame(id)); gsAnimFrames = {{}};
-  requestAnimationFrame(() => {{
-    panelMap.forEach(v => {{
-      switch(v) {{ case 2:gsViz2(rk);break; case 3:gsViz3(rk);break; case 4:gsViz4(rk);break; case 5:gsViz5(rk);break; case 6:gsViz6(rk);break; case 7:gsViz7(rk);break; }}
-    }});
-  }});
-}}
-
-function gsSetupCanvas(id) {{
+  Object.values(gsAnimFrames).forEach(id => cancelAnimationFrame(id)); gsAnimFrames = {};
+  requestAnimationFrame(() => {
+    panelMap.forEach(v => {
+      switch(v) { case 2:gsViz2(rk);break; case 3:gsViz3(rk);break; case 4:gsViz4(rk);break; case 5:gsViz5(rk);break; case 6:gsViz6(rk);break; case 7:gsViz7(rk);break; }
+    });
+  });
+}
+
+function gsSetupCanvas(id) {
   const c = document.getElementById(id); if (!c) return null;
   const dpr = window.devicePixelRatio || 1;
   const rect = c.parentElement.getBoundingClientRect();
   c.width = rect.width * dpr; c.height = rect.height * dpr;
   c.style.width = rect.width + 'px'; c.style.height = rect.height + 'px';
   const ctx = c.getContext('2d'); ctx.scale(dpr, dpr);
-  return {{ ctx, w: rect.width, h: rect.height }};
-}}
+  return { ctx, w: rect.width, h: rect.height };
+}
 
-function gsInit(rk) {{
-  Object.values(gsAnimFrames).forEach(id => cancelAnimationFrame(id)); gsAnimFrames = {{}}; gsCurrentStep = 0;
-  const rd = GS_DATA.annual[rk], md = GS_DATA.monthly[rk], years = Object.keys(rd).sort();
+// Story cards of one region. The build renders the same markup for every
+// region it ships (narrative.py, checked with `narrative.py --parity`); this
+// template is used for regions without a pre-rendered fragment (--ba pages).
+function gsStoryHtml(rk) {
+  const rd = GS_DATA.annual[rk], years = Object.keys(rd).sort();
   const fy = years[0], ly = years[years.length-1], first = rd[fy], last = rd[ly], info = REGIONS[rk];
   const fC = cleanPct(first), lC = cleanPct(last), dC = lC - fC;
   const dD = ((last.demand_avg_mw - first.demand_avg_mw) / first.demand_avg_mw * 100);
@@ -773,53 +1301,51 @@ function gsInit(rk) {{
   const fR = (first.solar_gwh||0)+(first.wind_gwh||0), lR = (last.solar_gwh||0)+(last.wind_gwh||0);
   const rChg = fR>0?((lR-fR)/fR*100):(lR>0?999:0);
   const showCoal = fCoal>10||lCoal>10;
-  const narr = document.getElementById('narrativeColumnH');
   let html = '', stepNum = 0;
-  window._rk = rk; window._showCoal = showCoal;
 
   stepNum++;
-  html += `<div class="story-step gs-step" data-step="${{stepNum}}"><div class="step-inner">
+  html += `<div class="story-step gs-step" data-step="${stepNum}"><div class="step-inner">
     <span class="step-badge blue">Overview</span>
-    <h2>${{info.name}}'s Grid at a Glance</h2>
-    <p>This donut chart shows ${{info.name}}'s full generation mix &mdash; every fuel source as a share of total production. Watch it animate from <span class="hl blue">${{fy}}</span> to <span class="hl blue">${{ly}}</span>.</p>
+    <h2>${info.name}'s Grid at a Glance</h2>
+    <p>This donut chart shows ${info.name}'s full generation mix &mdash; every fuel source as a share of total production. Watch it animate from <span class="hl blue">${fy}</span> to <span class="hl blue">${ly}</span>.</p>
     <div class="stat-row">
-      <div class="stat-box"><div class="sv">${{fmt(last.demand_avg_mw,0)}}</div><div class="sl">MW avg demand ${{ly}}</div></div>
-      <div class="stat-box"><div class="sv">${{lC.toFixed(1)}}%</div><div class="sl">Clean share ${{ly}}</div></div>
-      <div class="stat-box"><div class="sv">${{dD>=0?'+':''}}${{dD.toFixed(1)}}%</div><div class="sl">Demand change</div></div>
+      <div class="stat-box"><div class="sv">${fmt(last.demand_avg_mw,0)}</div><div class="sl">MW avg demand ${ly}</div></div>
+      <div class="stat-box"><div class="sv">${lC.toFixed(1)}%</div><div class="sl">Clean share ${ly}</div></div>
+      <div class="stat-box"><div class="sv">${dD>=0?'+':''}${dD.toFixed(1)}%</div><div class="sl">Demand change</div></div>
     </div>
-    <p>${{dC>3?`Clean energy grew from <span class="hl green">${{fC.toFixed(1)}}%</span> to <span class="hl green">${{lC.toFixed(1)}}%</span> &mdash; a <span class="hl green">${{dC.toFixed(1)}}pp</span> increase.`:dC<-3?`Clean energy declined from ${{fC.toFixed(1)}}% to ${{lC.toFixed(1)}}%.`:`Clean energy held stable near <span class="hl blue">${{lC.toFixed(1)}}%</span>.`}}</p>
+    <p>${dC>3?`Clean energy grew from <span class="hl green">${fC.toFixed(1)}%</span> to <span class="hl green">${lC.toFixed(1)}%</span> &mdash; a <span class="hl green">${dC.toFixed(1)}pp</span> increase.`:dC<-3?`Clean energy declined from ${fC.toFixed(1)}% to ${lC.toFixed(1)}%.`:`Clean energy held stable near <span class="hl blue">${lC.toFixed(1)}%</span>.`}</p>
     <p style="font-size:0.88rem;color:var(--c-blue);font-weight:600;margin-top:12px;">\u21c6 Drag the year slider above the chart to compare how the generation mix shifted year by year.</p>
   </div></div>`;
 
   stepNum++;
-  html += `<div class="story-step gs-step" data-step="${{stepNum}}"><div class="step-inner">
+  html += `<div class="story-step gs-step" data-step="${stepNum}"><div class="step-inner">
     <span class="step-badge orange">Demand</span>
     <h2>The Pulse of Demand</h2>
     <p>Each bar represents one year's average hourly demand in megawatts. The <span class="hl orange">orange dots and line</span> connect each year's peak demand &mdash; the highest single hour the grid had to serve.</p>
-    <p>${{dD>2?`Demand climbed <span class="hl orange">${{dD.toFixed(1)}}%</span> since ${{fy}}.`:dD<-2?`Demand fell ${{Math.abs(dD).toFixed(1)}}% since ${{fy}}.`:`Demand stayed relatively flat.`}}${{last.peak_demand_mw>0?` Peak in ${{ly}}: <span class="hl orange">${{fmt(last.peak_demand_mw,0)}} MW</span>.`:''}}</p>
+    <p>${dD>2?`Demand climbed <span class="hl orange">${dD.toFixed(1)}%</span> since ${fy}.`:dD<-2?`Demand fell ${Math.abs(dD).toFixed(1)}% since ${fy}.`:`Demand stayed relatively flat.`}${last.peak_demand_mw>0?` Peak in ${ly}: <span class="hl orange">${fmt(last.peak_demand_mw,0)} MW</span>.`:''}</p>
   </div></div>`;
 
-  if (showCoal) {{
+  if (showCoal) {
     stepNum++;
-    html += `<div class="story-step gs-step" data-step="${{stepNum}}"><div class="step-inner">
+    html += `<div class="story-step gs-step" data-step="${stepNum}"><div class="step-inner">
       <span class="step-badge navy">Coal</span>
       <h2>The Fading of Coal</h2>
-      <p>Each filled square represents a unit of coal-fired generation. The ghost squares show where coal stood in ${{fy}} &mdash; revealing how much has been retired or displaced.</p>
-      <p>${{coalChg<-10?`Coal has <span class="hl red">fallen ${{Math.abs(coalChg).toFixed(0)}}%</span> since ${{fy}}.`:coalChg>10?`Unusually, coal rose ${{coalChg.toFixed(0)}}% here.`:`Coal has held relatively steady.`}}</p>
+      <p>Each filled square represents a unit of coal-fired generation. The ghost squares show where coal stood in ${fy} &mdash; revealing how much has been retired or displaced.</p>
+      <p>${coalChg<-10?`Coal has <span class="hl red">fallen ${Math.abs(coalChg).toFixed(0)}%</span> since ${fy}.`:coalChg>10?`Unusually, coal rose ${coalChg.toFixed(0)}% here.`:`Coal has held relatively steady.`}</p>
       <p style="font-size:0.88rem;color:var(--c-blue);font-weight:600;margin-top:12px;">\u21c6 Drag the year slider above the chart to watch coal squares disappear year by year.</p>
     </div></div>`;
-  }}
+  }
 
   stepNum++;
-  html += `<div class="story-step gs-step" data-step="${{stepNum}}"><div class="step-inner">
+  html += `<div class="story-step gs-step" data-step="${stepNum}"><div class="step-inner">
     <span class="step-badge green">Renewables</span>
     <h2>Solar &amp; Wind: Rapid Rise</h2>
     <p>Each circle represents one year's generation: <span class="hl gold">golden orbs</span> are solar (with radiating rays) and <span class="hl green">green orbs</span> are wind (with spiral traces). Larger circles mean more GWh produced.</p>
-    <p>${{rChg>50?`Combined solar and wind grew ${{rChg>500?'<span class="hl green">dramatically</span>':`<span class="hl green">${{rChg.toFixed(0)}}%</span>`}}.`:rChg>0?`Solar and wind grew modestly.`:`Limited renewable change here.`}}</p>
+    <p>${rChg>50?`Combined solar and wind grew ${rChg>500?'<span class="hl green">dramatically</span>':`<span class="hl green">${rChg.toFixed(0)}%</span>`}.`:rChg>0?`Solar and wind grew modestly.`:`Limited renewable change here.`}</p>
   </div></div>`;
 
   stepNum++;
-  html += `<div class="story-step gs-step" data-step="${{stepNum}}"><div class="step-inner">
+  html += `<div class="story-step gs-step" data-step="${stepNum}"><div class="step-inner">
     <span class="step-badge gold">Seasonality</span>
     <h2>The Rhythm of the Seasons</h2>
     <p>This radial chart arranges all 12 months in a circle, like a clock. Each petal shows that month's total generation, with fuel layers stacking outward from the center &mdash; revealing how the mix shifts with the seasons.</p>
@@ -828,31 +1354,61 @@ function gsInit(rk) {{
   </div></div>`;
 
   stepNum++;
-  html += `<div class="story-step gs-step" data-step="${{stepNum}}"><div class="step-inner">
+  html += `<div class="story-step gs-step" data-step="${stepNum}"><div class="step-inner">
     <span class="step-badge blue">Then vs Now</span>
-    <h2>${{fy}} vs ${{ly}}</h2>
+    <h2>${fy} vs ${ly}</h2>
     <p>Two donut rings side by side &mdash; the generation mix at the start and end of the period. The center percentage shows each year's clean energy share. An arrow connects them to highlight the direction of change.</p>
     <div class="stat-row">
-      <div class="stat-box"><div class="sv">${{fC.toFixed(1)}}%</div><div class="sl">Clean ${{fy}}</div></div>
-      <div class="stat-box"><div class="sv">${{lC.toFixed(1)}}%</div><div class="sl">Clean ${{ly}}</div></div>
-      <div class="stat-box"><div class="sv">${{dC>=0?'+':''}}${{dC.toFixed(1)}}</div><div class="sl">pp change</div></div>
+      <div class="stat-box"><div class="sv">${fC.toFixed(1)}%</div><div class="sl">Clean ${fy}</div></div>
+      <div class="stat-box"><div class="sv">${lC.toFixed(1)}%</div><div class="sl">Clean ${ly}</div></div>
+      <div class="stat-box"><div class="sv">${dC>=0?'+':''}${dC.toFixed(1)}</div><div class="sl">pp change</div></div>
     </div>
   </div></div>`;
+  return html;
+}
+
+// Pre-rendered cards (#gsPrerendered, shown only without scripting): taken
+// out of the page on first use, then cloned on every region switch.
+let gsStory = null;
+function gsPrerendered(rk) {
+  if (!gsStory) {
+    gsStory = {};
+    const box = document.getElementById('gsPrerendered');
+    if (box) {
+      box.querySelectorAll('.pre-steps').forEach(el => {
+        const frag = document.createDocumentFragment();
+        frag.append(...el.children);
+        gsStory[el.dataset.region] = frag;
+      });
+      box.remove();
+    }
+  }
+  return gsStory[rk] ? gsStory[rk].cloneNode(true) : null;
+}
 
-  narr.innerHTML = html;
-  if (isMobile()) {{
+function gsInit(rk) {
+  Object.values(gsAnimFrames).forEach(id => cancelAnimationFrame(id)); gsAnimFrames = {}; gsCurrentStep = 0;
+  const rd = GS_DATA.annual[rk], years = Object.keys(rd).sort();
+  const showCoal = (rd[years[0]].coal_gwh||0)>10 || (rd[years[years.length-1]].coal_gwh||0)>10;
+  const narr = document.getElementById('narrativeColumnH');
+  window._rk = rk; window._showCoal = showCoal;
+
+  const pre = gsPrerendered(rk);
+  if (pre) narr.replaceChildren(pre);
+  else narr.innerHTML = gsStoryHtml(rk);
+  if (isMobile()) {
     gsSetupMobileLayout(rk);
-  }} else {{
+  } else {
     gsSetupScrollObserver();
     setTimeout(() => gsGoToStep(1), 300);
-  }}
-}}
+  }
+}
 
-function gsSliderStep(id,dir) {{ const sl=document.getElementById(id); const v=Math.max(+sl.min,Math.min(+sl.max,+sl.value+dir)); sl.value=v; sl.dispatchEvent(new Event('input')); }}
+function gsSliderStep(id,dir) { const sl=document.getElementById(id); const v=Math.max(+sl.min,Math.min(+sl.max,+sl.value+dir)); sl.value=v; sl.dispatchEvent(new Event('input')); }
 
 // Auto-sweep: animate the slider from min→max then leave it at max
 let _gsSweepTimer = null;
-function gsAutoSweep(sliderId, ctrlId, hintText) {{
+function gsAutoSweep(sliderId, ctrlId, hintText) {
   if (_gsSweepTimer) clearInterval(_gsSweepTimer);
   const sl = document.getElementById(sliderId);
   const ctrl = document.getElementById(ctrlId);
@@ -870,83 +1426,80 @@ function gsAutoSweep(sliderId, ctrlId, hintText) {{
   ctrl.classList.add('sweeping');
 
   // Add hint text below the controls
-  if (hintText) {{
+  if (hintText) {
     const hint = document.createElement('div');
     hint.className = 'slider-hint';
     hint.textContent = hintText;
     ctrl.appendChild(hint);
-  }}
+  }
 
   // Step through each value with a delay
   const maxVal = +sl.max;
   let cur = 0;
   const stepDelay = 250; // ms between steps
-  _gsSweepTimer = setInterval(() => {{
+  _gsSweepTimer = setInterval(() => {
     cur++;
-    if (cur > maxVal) {{
+    if (cur > maxVal) {
       clearInterval(_gsSweepTimer);
       _gsSweepTimer = null;
       // Remove sweep glow after animation completes
-      setTimeout(() => {{
+      setTimeout(() => {
         ctrl.classList.remove('sweeping');
-      }}, 600);
+      }, 600);
       return;
-    }}
+    }
     sl.value = cur;
     sl.dispatchEvent(new Event('input'));
-  }}, stepDelay);
-}}
+  }, stepDelay);
+}
 
-function gsSetupScrollObserver() {{
+function gsSetupScrollObserver() {
   if (gsScrollObserver) gsScrollObserver.disconnect();
   const steps = document.querySelectorAll('.gs-step');
-  gsScrollObserver = new IntersectionObserver(entries => {{
-    entries.forEach(e => {{
-      if (e.isIntersecting) {{ e.target.classList.add('active'); gsGoToStep(parseInt(e.target.dataset.step)); }}
-    }});
-  }}, {{ threshold: 0.4, rootMargin: '-10% 0px -10% 0px' }});
+  gsScrollObserver = new IntersectionObserver(entries => {
+    entries.forEach(e => {
+      if (e.isIntersecting) { e.target.classList.add('active'); gsGoToStep(parseInt(e.target.dataset.step)); }
+    });
+  }, { threshold: 0.4, rootMargin: '-10% 0px -10% 0px' });
   steps.forEach(s => gsScrollObserver.observe(s));
-}}
+}
 
-function gsGoToStep(step) {{
+function gsGoToStep(step) {
   if (isMobile()) return;
   if (step === gsCurrentStep || !selectedRegion) return; gsCurrentStep = step;
   document.querySelectorAll('#historicContainer .viz-panel').forEach(p => p.classList.remove('active'));
-  Object.values(gsAnimFrames).forEach(id => cancelAnimationFrame(id)); gsAnimFrames = {{}};
+  Object.values(gsAnimFrames).forEach(id => cancelAnimationFrame(id)); gsAnimFrames = {};
   // Clear any running sweep
-  if (_gsSweepTimer) {{ clearInterval(_gsSweepTimer); _gsSweepTimer = null; }}
+  if (_gsSweepTimer) { clearInterval(_gsSweepTimer); _gsSweepTimer = null; }
   document.querySelectorAll('.viz-controls').forEach(c => c.classList.remove('sweeping'));
 
   const rd = GS_DATA.annual[selectedRegion], years = Object.keys(rd).sort();
   const hasCoal = (rd[years[0]].coal_gwh||0)>10 || (rd[years[years.length-1]].coal_gwh||0)>10;
   const baseMap = [2,3,4,5,6,7];
   let vizNum;
-  if (hasCoal) {{ vizNum = baseMap[step-1]||7; }}
-  else {{ const noCoalMap = [2,3,5,6,7]; vizNum = noCoalMap[step-1]||7; }}
+  if (hasCoal) { vizNum = baseMap[step-1]||7; }
+  else { const noCoalMap = [2,3,5,6,7]; vizNum = noCoalMap[step-1]||7; }
   const panel = document.getElementById('vizPanel'+vizNum);
   if (panel) panel.classList.add('active');
   const rk = selectedRegion;
-  switch(vizNum) {{ case 2:gsViz2(rk);break; case 3:gsViz3(rk);break; case 4:gsViz4(rk);break; case 5:gsViz5(rk);break; case 6:gsViz6(rk);break; case 7:gsViz7(rk);break; }}
+  switch(vizNum) { case 2:gsViz2(rk);break; case 3:gsViz3(rk);break; case 4:gsViz4(rk);break; case 5:gsViz5(rk);break; case 6:gsViz6(rk);break; case 7:gsViz7(rk);break; }
 
   // Trigger auto-sweep on slider panels after a brief delay for the viz to render
-  setTimeout(() => {{
+  setTimeout(() => {
     if (vizNum === 2) gsAutoSweep('s2', 'ctrl2', '\u2190 Drag to compare years');
     else if (vizNum === 4) gsAutoSweep('s4', 'ctrl4', '\u2190 Drag to compare years');
     else if (vizNum === 6) gsAutoSweep('s6', 'ctrl6', '\u2190 Drag to compare years');
-  }}, 400);
-}}
+  }, 400);
+}
 '''
 
-# ── Append the historic viz functions (viz2-viz7, renamed to gsViz2-gsViz7) ──
-html += "\n// Historic visualization functions\n"
-html += gs_viz_code
 
-# ── Append the hourly mode code inside an IIFE ──────────────────────────────
+# ── Hourly mode IIFE ──────────────────────────────────────────────────────────
 # The IIFE completely isolates the hourly code scope.
 # It receives RDATA and REGIONS from the outer scope.
 # Internally, REGIONS properties are accessed as .n and .d (the original format),
 # so we create a mapped version inside the IIFE.
-html += """
+HOURLY_OPEN_JS = """
 // ═══════════════════════════════════════════════════════════════════════════
 // HOURLY MODE (from 3D Grid Viz) — wrapped in IIFE to isolate scope
 // ═══════════════════════════════════════════════════════════════════════════
@@ -963,11 +1516,9 @@ var hvInit; // exposed to global scope
 
 """
 
-html += gv_viz_code
-
-# Now add the buildStory, setupObs, goToStep functions that reference
-# the hourly-specific DOM elements
-html += """
+# buildStory, setupObs, goToStep functions that reference the hourly-specific
+# DOM elements
+HOURLY_STORY_JS = """
   var hvMobileSetup = false;
   function hvSetupMobileLayout() {
     if (!isMobile()) return;
@@ -990,8 +1541,7 @@ html += """
     }
   }
 
-  function buildStory(k) {
-    const D = RDATA[k], S = D.stats;
+  function hvShowStats(S) {
     document.getElementById('statTWh').textContent = S.totalTWh;
     document.getElementById('statHours').textContent = S.nHours.toLocaleString();
     document.getElementById('statAvgGW').textContent = Math.round(S.avgGen / 1000);
@@ -1000,6 +1550,10 @@ html += """
     document.getElementById('statMaxRate').textContent = S.rateP95 + ' kg';
     document.getElementById('statAvgFossil').textContent = S.avgFossil + '%';
     document.getElementById('statHighHours').textContent = S.highFossilHours.toLocaleString();
+  }
+
+  function buildStory(k) {
+    hvShowStats(RDATA[k].stats);
 
     Object.values(animFrames).forEach(id => cancelAnimationFrame(id));
     animFrames = {};
@@ -1037,20 +1591,165 @@ html += """
     document.querySelectorAll('#hourlyContainer .viz-panel').forEach(p => p.classList.remove('active'));
     const panel = document.getElementById('hvPanel' + step);
     if (panel) panel.classList.add('active');
+    if (step >= 6 && typeof hvShowSankey === 'function') hvShowSankey();
   }
+"""
 
+HOURLY_CLOSE_JS = """
   // Expose hvInit to global scope
   hvInit = function(rk) {
     if (!RDATA[rk]) return;
     selReg = rk;
+    scnBuild();
+    scnApply(rk);
     buildStory(rk);
+    scnSummary();
   };
 })();
+"""
 
+# ── Emission-factor scenarios (hourly what-if control) ───────────────────────
+# factors: kg CO2/MWh per fuel, which must reproduce RDATA.rate (other fuels
+# emit nothing; every build checks this, see check_scenario_factors); ranges: slider bounds; presets: factor overrides. fossil and
+# highFossilPct define stats.avgFossil / highFossilHours. A fuel whose factor
+# is set to 0 (e.g. full carbon capture) drops out of the fossil share.
+# scenario.py is the NumPy version of the engine below.
+SCENARIO = {
+    "fuels": ["coal", "gas", "oil", "other", "nuclear", "hydro", "geo", "wind", "solar", "storage"],
+    "factors": {"coal": 1000, "gas": 410, "oil": 800, "other": 300},
+    "labels": {"coal": "Coal", "gas": "Gas", "oil": "Oil", "other": "Other"},
+    "ranges": {"coal": [0, 1400], "gas": [0, 800], "oil": [0, 1200], "other": [0, 800]},
+    "presets": [
+        ["As built", {}],
+        ["Gas CCGT", {"gas": 365}],
+        ["Gas peakers", {"gas": 560}],
+        ["Efficient coal", {"coal": 900}],
+        ["Older coal", {"coal": 1100}],
+        ["Coal CCS", {"coal": 100}],
+    ],
+    "fossil": ["coal", "gas", "oil"],
+    "highFossilPct": 60,
+}
+
+# Global so scenario.py can run it under node for the parity check.
+SCENARIO_ENGINE_JS = """
+// ═══════════════════════════════════════════════════════════════════════════
+// EMISSION-FACTOR SCENARIOS: RDATA[k].gen is packed once into a fuel-major
+// Float64Array (SCENARIO.fuels x hours); a factor vector then gives every
+// hourly rate in one pass over the rows with a non-zero factor, and the
+// rate percentiles / fossil-hour stats are recomputed on typed arrays.
+// ═══════════════════════════════════════════════════════════════════════════
+const SCN_CACHE = {};
+function scnMatrix(k) {
+  const D = RDATA[k];
+  const m = SCN_CACHE[k];
+  if (m && m.D === D) return m;
+  const F = SCENARIO.fuels, n = D.load.length, G = new Float64Array(F.length * n);
+  F.forEach((f, i) => { if (D.gen[f]) G.set(D.gen[f], i * n); });
+  // rate / stats keep the baked values while a scenario replaces D's
+  return SCN_CACHE[k] = { D, n, G, load: Float64Array.from(D.load), rate: D.rate, stats: D.stats };
+}
+function scnCompute(k, factors) {
+  const m = scnMatrix(k), n = m.n;
+  const em = new Float64Array(n), fossil = new Float64Array(n);
+  SCENARIO.fuels.forEach((f, i) => {
+    const ef = factors[f] || 0;
+    if (!ef) return;
+    const row = m.G.subarray(i * n, i * n + n);
+    for (let h = 0; h < n; h++) em[h] += row[h] * ef;
+    if (SCENARIO.fossil.includes(f)) for (let h = 0; h < n; h++) fossil[h] += row[h];
+  });
+  const rate = new Int32Array(n);
+  let shareSum = 0, high = 0;
+  for (let h = 0; h < n; h++) {
+    const load = m.load[h];
+    rate[h] = load ? Math.floor(em[h] / load + 0.5) : 0;
+    const share = load ? fossil[h] / load * 100 : 0;
+    shareSum += share;
+    if (share > SCENARIO.highFossilPct) high++;
+  }
+  const sorted = rate.slice().sort();
+  return { rate, stats: {
+    rateP5: n ? sorted[Math.floor(0.05 * n)] : 0, rateP95: n ? sorted[Math.floor(0.95 * n)] : 0,
+    avgFossil: n ? Math.floor(shareSum / n * 10 + 0.5) / 10 : 0, highFossilHours: high } };
+}
 """
 
-# Add scroll progress and DOMContentLoaded
-html += """
+# Inside the hourly IIFE: a scenario swaps recomputed rate / stats into
+# RDATA[selReg] (the baked ones stay in SCN_CACHE) and redraws the acts.
+SCENARIO_UI_JS = """
+  let scnFactors = null, scnPending = false, scnMs = null;
+  function scnBuild() {
+    const box = document.getElementById('scnSliders');
+    if (!box || box.childElementCount) return;
+    Object.keys(SCENARIO.factors).forEach(f => {
+      const [lo, hi] = SCENARIO.ranges[f], row = document.createElement('label');
+      row.className = 'scn-row';
+      row.innerHTML = '<span>' + SCENARIO.labels[f] + '</span><input type="range" min="' + lo + '" max="' + hi +
+        '" step="5" value="' + SCENARIO.factors[f] + '" data-fuel="' + f + '"><b>' + SCENARIO.factors[f] + '</b>';
+      row.querySelector('input').addEventListener('input', scnRead);
+      box.appendChild(row);
+    });
+    const presets = document.getElementById('scnPresets');
+    SCENARIO.presets.forEach(([name, over], i) => {
+      const b = document.createElement('button');
+      b.type = 'button'; b.className = 'scn-preset' + (i ? '' : ' active'); b.textContent = name;
+      b.addEventListener('click', () => {
+        document.querySelectorAll('#scnSliders input').forEach(inp => {
+          inp.value = over[inp.dataset.fuel] != null ? over[inp.dataset.fuel] : SCENARIO.factors[inp.dataset.fuel];
+        });
+        scnRead();
+        document.querySelectorAll('.scn-preset').forEach(p => p.classList.toggle('active', p === b));
+      });
+      presets.appendChild(b);
+    });
+  }
+  function scnRead() {
+    const f = {};
+    let baked = true;
+    document.querySelectorAll('#scnSliders input').forEach(inp => {
+      f[inp.dataset.fuel] = +inp.value;
+      inp.nextElementSibling.textContent = inp.value;
+      if (+inp.value !== SCENARIO.factors[inp.dataset.fuel]) baked = false;
+    });
+    scnFactors = baked ? null : f;
+    document.querySelectorAll('.scn-preset').forEach(p => p.classList.remove('active'));
+    if (!scnPending) { scnPending = true; requestAnimationFrame(scnUpdate); }
+  }
+  function scnApply(k) {
+    const D = RDATA[k];
+    scnMs = null;
+    if (!D || (!scnFactors && !SCN_CACHE[k])) return;
+    const m = scnMatrix(k);
+    if (!scnFactors) { D.rate = m.rate; D.stats = m.stats; return; }
+    const t0 = performance.now(), r = scnCompute(k, scnFactors);
+    D.rate = Array.from(r.rate);
+    D.stats = Object.assign({}, m.stats, r.stats);
+    scnMs = performance.now() - t0;
+  }
+  function scnUpdate() {
+    scnPending = false;
+    if (!selReg || !RDATA[selReg]) return;
+    scnApply(selReg);
+    hvShowStats(RDATA[selReg].stats);
+    Object.values(animFrames).forEach(id => cancelAnimationFrame(id));
+    animFrames = {};
+    drawAct1(selReg); drawAct2(selReg); drawAct3(selReg); drawAct4(selReg); drawAct5(selReg); drawAct6(selReg);
+    scnSummary();
+  }
+  function scnSummary() {
+    const el = document.getElementById('scnSummary');
+    if (!el || !selReg || !SCN_CACHE[selReg]) return;
+    const S = RDATA[selReg].stats, B = SCN_CACHE[selReg].stats;
+    el.textContent = scnFactors
+      ? 'P5 / P95 ' + S.rateP5 + ' / ' + S.rateP95 + ' kg/MWh (built ' + B.rateP5 + ' / ' + B.rateP95 + '), ' +
+        S.highFossilHours.toLocaleString() + ' high-fossil hours; recomputed in ' + scnMs.toFixed(1) + ' ms'
+      : 'Built factors: P5 / P95 ' + B.rateP5 + ' / ' + B.rateP95 + ' kg/MWh';
+  }
+"""
+
+# Scroll progress and DOMContentLoaded
+INIT_SCROLL_JS = """
 // ═══════════════════════════════════════════════════════════════════════════
 // INITIALIZATION
 // ═══════════════════════════════════════════════════════════════════════════
@@ -1058,22 +1757,888 @@ window.addEventListener('scroll', () => {
   const h = document.documentElement.scrollHeight - window.innerHeight;
   document.getElementById('progressBar').style.width = (h>0?(window.scrollY/h)*100:0)+'%';
 }, {passive:true});
+"""
 
+INIT_READY_JS = """
 document.addEventListener('DOMContentLoaded', () => {
   GS_DATA = INLINE_DATA;
-  buildMap();
+  // Single-region pages have no tile map; open the region straight away
+  if (TILE_ORDER.length === 1) selectRegion(TILE_ORDER[0]);
+  else buildMap();
+  cmpInit();
 });
-</script>
-</body>
-</html>
 """
 
-# Write the combined file
-out_path = os.path.join(BASE, "index.html")
-with open(out_path, "w", encoding="utf-8") as f:
-    f.write(html)
 
-file_size_kb = os.path.getsize(out_path) / 1024
-print(f"\nBuilt: {out_path}")
-print(f"Size: {file_size_kb:.0f} KB")
-print("Done!")
+# ── Balancing-authority build (--ba) ─────────────────────────────────────────
+# The page carries only names, tile outlines for the 13 region totals and an
+# index of per-key data chunks; GS_DATA / RDATA start empty and each BA's or
+# region's chunk (assets/ba/<KEY>.<hash>.js, a baChunk() call) is loaded the
+# first time its tile is hovered or selected. BA tiles are built when their
+# region's list is first opened.
+BA_CSS = """
+/* ═══ BALANCING AUTHORITY MAP (--ba) ═══ */
+#map-container.ba-map{display:block;max-width:1000px;text-align:left;}
+.ba-group{margin-bottom:20px;}
+.ba-group>summary{cursor:pointer;font:700 1rem var(--font-heading);color:var(--c-navy);padding:8px 4px;border-bottom:1px solid var(--c-gray-200);margin-bottom:12px;}
+.ba-group>summary .ba-count{font:500 0.8rem var(--font);color:var(--c-gray-500);margin-left:8px;}
+.ba-grid{display:grid;grid-template-columns:repeat(auto-fill,minmax(130px,1fr));gap:12px;}
+.ba-members{margin-top:8px;}
+.ba-members>summary{cursor:pointer;font:600 0.82rem var(--font);color:var(--c-gray-500);padding:4px;}
+.ba-members[open]>.ba-grid{margin:8px 0 4px;}
+.region-tile.ba-tile{justify-content:center;min-height:64px;}
+.region-tile.loading{opacity:0.6;cursor:progress;}
+@media(max-width:768px){
+  .ba-grid{grid-template-columns:repeat(auto-fill,minmax(90px,1fr));gap:8px;}
+}
+"""
+
+BA_JS = """
+// ═══════════════════════════════════════════════════════════════════════════
+// BALANCING AUTHORITIES: grouped map + on-demand data chunks
+// ═══════════════════════════════════════════════════════════════════════════
+const baPending = {};
+function baChunk(k, d) {
+  GS_DATA.monthly[k] = d.monthly;
+  GS_DATA.annual[k] = d.annual;
+  if (d.hourly) RDATA[k] = d.hourly;
+  if (typeof __perf !== 'undefined' && __perf) __perf.measure('chunk:' + k, 'chunk:' + k + ':requested');
+  const waiting = baPending[k] || [];
+  delete baPending[k];
+  waiting.forEach(done => done());
+}
+
+function baLoadChunk(k, done) {
+  if (GS_DATA.annual[k]) { if (done) done(); return; }
+  if (baPending[k]) { if (done) baPending[k].push(done); return; }
+  baPending[k] = done ? [done] : [];
+  if (typeof __perf !== 'undefined' && __perf) __perf.mark('chunk:' + k + ':requested');
+  const s = document.createElement('script');
+  s.integrity = BA_INTEGRITY[k]; s.crossOrigin = 'anonymous';
+  s.src = BA_INDEX[k];
+  s.onerror = () => { delete baPending[k]; console.warn('[ba] could not load ' + BA_INDEX[k]); };
+  document.head.appendChild(s);
+}
+
+function baTile(k) {
+  const tile = buildTile(k);
+  if (!TILE_PATHS[k]) tile.classList.add('ba-tile');
+  tile.addEventListener('pointerenter', () => baLoadChunk(k), {once: true});
+  return tile;
+}
+
+function baBuildMap() {
+  const container = document.getElementById('map-container');
+  container.innerHTML = '';
+  container.classList.add('ba-map');
+  BA_GROUPS.forEach(g => {
+    const sec = document.createElement('details');
+    sec.className = 'ba-group'; sec.open = true;
+    const head = document.createElement('summary');
+    const count = document.createElement('span'); count.className = 'ba-count';
+    count.textContent = g.regions.length + (g.regions.length === 1 ? ' region · ' : ' regions · ')
+      + g.regions.reduce((n, r) => n + r[1].length, 0) + ' balancing authorities';
+    head.textContent = g.name; head.appendChild(count);
+    const grid = document.createElement('div'); grid.className = 'ba-grid';
+    g.regions.forEach(([rk]) => grid.appendChild(baTile(rk)));
+    sec.appendChild(head); sec.appendChild(grid);
+    g.regions.forEach(([rk, bas]) => {
+      const list = document.createElement('details'); list.className = 'ba-members';
+      const label = document.createElement('summary');
+      label.textContent = REGIONS[rk].name + ': ' + bas.length + (bas.length === 1 ? ' balancing authority' : ' balancing authorities');
+      const tiles = document.createElement('div'); tiles.className = 'ba-grid';
+      list.addEventListener('toggle', () => {
+        if (list.open && !tiles.firstChild) bas.forEach(b => tiles.appendChild(baTile(b)));
+      });
+      list.appendChild(label); list.appendChild(tiles);
+      sec.appendChild(list);
+    });
+    container.appendChild(sec);
+  });
+}
+
+// Selecting a tile waits for its chunk; everything downstream is unchanged
+const baSelectLoaded = selectRegion;
+selectRegion = function(rk) {
+  const tiles = document.querySelectorAll('.region-tile[data-region="' + rk + '"]');
+  tiles.forEach(t => t.classList.add('loading'));
+  baLoadChunk(rk, () => {
+    tiles.forEach(t => t.classList.remove('loading'));
+    baSelectLoaded(rk);
+  });
+};
+buildMap = baBuildMap;
+"""
+
+
+# ── Offline cache (--service-worker) ──────────────────────────────────────────
+# sw.js precaches the pages and shared assets listed in a content-hashed
+# precache manifest. Hashed asset URLs never change content, so they are
+# served cache-first (BA chunks are cached the first time they are used);
+# pages are stale-while-revalidate. A data refresh changes the manifest name
+# and so sw.js itself, and the new worker only downloads entries whose
+# revision changed. Pages opened from file:// never register it.
+SW_REGISTER_JS = """
+// Offline cache: only over http(s); file:// pages run without the worker
+if ('serviceWorker' in navigator && navigator.serviceWorker && location.protocol !== 'file:') {
+  window.addEventListener('load', () => {
+    navigator.serviceWorker.register('sw.js').catch(err => console.warn('[sw] registration failed', err));
+  });
+}
+"""
+
+SW_JS = """// Grid Explorer service worker (written by build_explorer.py --service-worker)
+const MANIFEST = '__MANIFEST__';
+const PRECACHE = 'gx-precache', RUNTIME = 'gx-runtime', FONTS = 'gx-fonts';
+const REVISIONS = new URL('__gx-revisions', self.registration.scope).href;
+const IMMUTABLE = /\\/assets\\/.+\\.[0-9a-f]{12}\\.(?:js|css|json)$/;
+
+self.addEventListener('install', event => {
+  event.waitUntil((async () => {
+    const manifest = await (await fetch(MANIFEST, {cache: 'no-cache'})).json();
+    const cache = await caches.open(PRECACHE);
+    const old = await cache.match(REVISIONS);
+    const prev = old ? await old.json() : {}, next = {};
+    // Only entries whose content hash changed are downloaded again
+    await Promise.all(manifest.entries.map(async e => {
+      const url = new URL(e.url, self.registration.scope).href;
+      next[url] = e.revision;
+      if (prev[url] === e.revision && await cache.match(url)) return;
+      await cache.add(new Request(url, {cache: 'reload'}));
+    }));
+    await cache.put(REVISIONS, new Response(JSON.stringify(next)));
+    await self.skipWaiting();
+  })());
+});
+
+self.addEventListener('activate', event => {
+  event.waitUntil((async () => {
+    for (const name of await caches.keys()) {
+      if (![PRECACHE, RUNTIME, FONTS].includes(name)) await caches.delete(name);
+    }
+    // Drop precached entries the new manifest no longer lists
+    const cache = await caches.open(PRECACHE);
+    const keep = await (await cache.match(REVISIONS)).json();
+    for (const req of await cache.keys()) {
+      if (req.url !== REVISIONS && !(req.url in keep)) await cache.delete(req);
+    }
+    await self.clients.claim();
+  })());
+});
+
+async function cacheFirst(request, cacheName) {
+  const hit = await caches.match(request);
+  if (hit) return hit;
+  const res = await fetch(request);
+  if (res.ok || res.type === 'opaque') (await caches.open(cacheName)).put(request, res.clone());
+  return res;
+}
+
+async function staleWhileRevalidate(request, cacheName, event) {
+  // Pages are matched without their query (?region=..., ?perf=1), a
+  // directory URL (the usual Pages entry) as its index.html, and a
+  // precached page is refreshed in place
+  let url = request.url.split('#')[0].split('?')[0];
+  if (url.endsWith('/')) url += 'index.html';
+  const precache = await caches.open(PRECACHE);
+  const precached = await precache.match(url);
+  const hit = precached || await caches.match(request);
+  const update = fetch(request).then(async res => {
+    if (res.ok || res.type === 'opaque') {
+      if (precached) await precache.put(url, res.clone());
+      else await (await caches.open(cacheName)).put(request, res.clone());
+    }
+    return res;
+  });
+  if (hit) { event.waitUntil(update.catch(() => {})); return hit; }
+  return update;
+}
+
+self.addEventListener('fetch', event => {
+  const request = event.request;
+  if (request.method !== 'GET') return;
+  const url = new URL(request.url);
+  if (url.origin === self.location.origin) {
+    if (IMMUTABLE.test(url.pathname)) event.respondWith(cacheFirst(request, RUNTIME));
+    else if (request.mode === 'navigate' || url.pathname.endsWith('.html') || url.pathname.endsWith('/'))
+      event.respondWith(staleWhileRevalidate(request, RUNTIME, event));
+  } else if (url.hostname === 'fonts.gstatic.com') {
+    event.respondWith(cacheFirst(request, FONTS));
+  } else if (url.hostname === 'fonts.googleapis.com') {
+    event.respondWith(staleWhileRevalidate(request, FONTS, event));
+  }
+});
+"""
+
+
+def write_service_worker(out_dir, files):
+    """sw.js plus a content-hashed precache manifest for files (paths
+    relative to out_dir); older manifests in out_dir are removed."""
+    entries = []
+    for rel in files:
+        with open(os.path.join(out_dir, rel), "rb") as f:
+            revision = hashlib.sha256(f.read()).hexdigest()[:12]
+        url = rel.replace(os.sep, "/")
+        entries.append({"url": url, "revision": revision, "immutable": url.startswith("assets/")})
+    entries.sort(key=lambda e: e["url"])
+    manifest = json.dumps({"entries": entries}, indent=1)
+    name = write_hashed_asset(out_dir, "precache-manifest", "json", manifest)
+    for old in os.listdir(out_dir):
+        if old.startswith("precache-manifest.") and old.endswith(".json") and old != name:
+            os.remove(os.path.join(out_dir, old))  # only the current sw.js refers to a manifest
+    with open(os.path.join(out_dir, "sw.js"), "w", encoding="utf-8") as f:
+        f.write(SW_JS.replace("__MANIFEST__", name))
+    total = sum(os.path.getsize(os.path.join(out_dir, e["url"])) for e in entries)
+    print(f"  Service worker: sw.js + {name} ({len(entries)} entries, {total / 1024:.0f} KB precached)")
+
+
+def config_js(gs_data_line, gv_data_line, region_keys, tiles, perf=False, names=None):
+    """Per-target script: data blobs plus the REGIONS / TILE_ORDER / tile
+    paths for the regions this page carries. names maps key → (name, desc)
+    and defaults to REGIONS."""
+    return data_js(gs_data_line, gv_data_line, perf=perf) + regions_js(region_keys, tiles, names=names)
+
+
+def data_js(gs_data_line, gv_data_line, perf=False):
+    """The INLINE_DATA / RDATA statements (a data asset of its own with --split)."""
+    js = """// ═══════════════════════════════════════════════════════════════════════════
+// DATA
+// ═══════════════════════════════════════════════════════════════════════════
+"""
+    if perf:
+        # The gap between the runtime script and the first statement here covers
+        # fetching + parsing/compiling the app script, data literals included.
+        js += ("if (__perf) { __perf.mark('script:app:start'); "
+               "__perf.measure('parse:app+data', 'script:app:requested', 'script:app:start'); "
+               "__perf.mark('data:eval:start'); }\n")
+    js += gs_data_line + "\n" + gv_data_line + "\n"
+    if perf:
+        js += "if (__perf) { __perf.mark('data:eval:end'); __perf.measure('data:eval', 'data:eval:start', 'data:eval:end'); }\n"
+    js += ranking_js(gs_data_line, gv_data_line)
+    return js
+
+
+def ranking_js(gs_data_line, gv_data_line):
+    """RANK_INDEX for the Compare mode (null with fewer than two regions)."""
+    index = rankings.build_index(parse_data_line(gs_data_line)[1], parse_data_line(gv_data_line)[1])
+    return "const RANK_INDEX = " + json.dumps(index, separators=(",", ":")) + ";\n"
+
+
+def narrative_block(gs_data_line, gv_data_line):
+    """Pre-rendered story cards and hourly stats for the regions a page
+    carries (narrative.py)."""
+    inline = parse_data_line(gs_data_line)[1]
+    stats = {k: d["stats"] for k, d in iter_data_line(gv_data_line) if d.get("stats")}
+    return narrative.prerender(inline, stats, REGIONS)
+
+
+def regions_js(region_keys, tiles, names=None):
+    """REGIONS / TILE_ORDER / TILE_PATHS for the regions a page carries."""
+    names = names or REGIONS
+    js = """
+// ═══════════════════════════════════════════════════════════════════════════
+// SHARED REGIONS (uses .name/.desc from EIA Grid Story format)
+// ═══════════════════════════════════════════════════════════════════════════
+const REGIONS = {
+"""
+    js += ",\n".join(f"  {k}:{{name:{js_str(names[k][0])},desc:{js_str(names[k][1])}}}"
+                     for k in sorted(region_keys)) + "\n};\n\n"
+    js += "const TILE_ORDER = [" + ",".join(js_str(k) for k in region_keys) + "];\n"
+    js += "const TILE_PATHS = " + tile_paths_js({k: tiles[k] for k in region_keys if k in tiles}) + ";\n\n"
+    return js
+
+
+def app_js(gs_viz_code, gv_viz_code, sankey="deferred", perf=False, ba=False, service_worker=False):
+    """Everything that is identical across targets."""
+    js = APP_JS
+    # Historic viz functions (viz2-viz7, renamed to gsViz2-gsViz7)
+    js += "\n// Historic visualization functions\n"
+    js += gs_viz_code
+
+    js += "\nconst SCENARIO = " + json.dumps(SCENARIO, separators=(",", ":")) + ";\n" + SCENARIO_ENGINE_JS
+    js += HOURLY_OPEN_JS
+    if sankey == "deferred":
+        js += SANKEY_DEFERRED_JS
+        gv_viz_code = re.sub(r'\bfunction buildSankey\(', 'function buildSankeyNow(', gv_viz_code)
+    elif sankey == "canvas":
+        js += SANKEY_CANVAS_JS
+    js += gv_viz_code
+    js += HOURLY_STORY_JS
+    js += SCENARIO_UI_JS
+    if perf:
+        js += PERF_WRAP_HOURLY_JS
+    js += HOURLY_CLOSE_JS
+
+    js += INIT_SCROLL_JS
+    if ba:
+        js += BA_JS
+    if perf:
+        js += PERF_WRAP_GLOBAL_JS
+    js += INIT_READY_JS
+    if service_worker:
+        js += SW_REGISTER_JS
+    return js
+
+
+def assemble_page(styles, scripts, head_vendor="", tail_vendor="", perf=False, show_map=True,
+                  fonts_html=GOOGLE_FONTS_HTML, narrative_html=""):
+    html = PAGE_HEAD_HTML + fonts_html + head_vendor + styles
+    if narrative_html:
+        html += NOSCRIPT_CSS_HTML
+    html += "</head>\n" + BODY_HEADER_HTML
+    if show_map:
+        html += MAP_SECTION_HTML
+    html += narrative_html + BODY_MAIN_HTML
+    if perf:
+        html += PERF_RUNTIME_JS
+    html += scripts + tail_vendor + "</body>\n</html>\n"
+    return html
+
+
+def render(parts, gs_viz_code, gv_viz_code, sankey="deferred", perf=False, service_worker=False):
+    """Assemble the self-contained single-file page."""
+    config = config_js(parts["gs_data_line"], parts["gv_data_line"], TILE_ORDER, parts["tiles"], perf=perf)
+    return render_page(parts, config, app_js(gs_viz_code, gv_viz_code, sankey=sankey, perf=perf,
+                                             service_worker=service_worker), sankey=sankey, perf=perf,
+                       narrative_html=narrative_block(parts["gs_data_line"], parts["gv_data_line"]))
+
+
+def render_page(parts, config, app_script, sankey="deferred", perf=False, narrative_html=""):
+    """render() from an already generated config, app script and narrative
+    block (--watch keeps all three between rebuilds)."""
+    highcharts_js, sankey_js = parts["highcharts_js"], parts["sankey_js"]
+    head_vendor = ""
+    deferred_vendor = ""
+    if sankey == "inline":
+        head_vendor = f"<script>{highcharts_js}</script>\n<script>{sankey_js}</script>\n"
+    elif sankey == "deferred":
+        # type="text/plain" keeps the browser from parsing/compiling it until
+        # hvLoadSankeyVendor() copies it into a live <script>.
+        deferred_vendor = f'<script type="text/plain" id="hvSankeyVendor">{highcharts_js}\n;\n{sankey_js}</script>\n'
+
+    scripts = "<script>\n" + config + app_script + "</script>\n"
+    return assemble_page("<style>\n" + parts.get("font_css", "") + PAGE_CSS + "</style>\n", scripts,
+                         fonts_html=parts.get("font_links", GOOGLE_FONTS_HTML),
+                         head_vendor=head_vendor, tail_vendor=deferred_vendor, perf=perf,
+                         narrative_html=narrative_html)
+
+
+# ── Write the combined file ───────────────────────────────────────────────────
+def write_output(html, out_path):
+    # newline="" keeps "\n" on every platform so rebuilds are byte-identical
+    with open(out_path, "w", encoding="utf-8", newline="") as f:
+        f.write(html)
+    return os.path.getsize(out_path)
+
+
+def write_hashed_asset(assets_dir, stem, ext, content):
+    """Write content once under a content-hash name; returns the file name."""
+    data = content.encode("utf-8")
+    name = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}.{ext}"
+    path = os.path.join(assets_dir, name)
+    if not os.path.exists(path):
+        with open(path, "wb") as f:
+            f.write(data)
+    return name
+
+
+def subresource_integrity(content):
+    """Subresource Integrity value (sha384) for an asset's content."""
+    return "sha384-" + base64.b64encode(hashlib.sha384(content.encode("utf-8")).digest()).decode("ascii")
+
+
+def write_asset(assets_dir, stem, ext, content, manifest):
+    """write_hashed_asset() plus a manifest entry under the logical name
+    stem.ext; returns the integrity attributes for the asset's tag."""
+    name = write_hashed_asset(assets_dir, stem, ext, content)
+    sri = subresource_integrity(content)
+    manifest[f"{stem}.{ext}"] = {"file": name, "integrity": sri}
+    return name, f'integrity="{sri}" crossorigin="anonymous"'
+
+
+def write_asset_manifest(assets_dir, manifest):
+    """assets/manifest.json: logical name → hashed file + integrity."""
+    path = os.path.join(assets_dir, "manifest.json")
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        json.dump(dict(sorted(manifest.items())), f, indent=1)
+        f.write("\n")
+    return path
+
+
+def write_shared_assets(assets_dir, parts, css, app_script, sankey="deferred", sri=True):
+    """Stylesheet, app script and (unless --sankey=canvas) the vendor bundle
+    under content-hash names, plus the tags a page needs to reference them.
+    With sri the tags carry Subresource Integrity, which makes them CORS
+    requests: fine over http(s), blocked for pages opened from file://."""
+    os.makedirs(assets_dir, exist_ok=True)
+    manifest = {}
+    css_name, css_attrs = write_asset(assets_dir, "app", "css", parts.get("font_css", "") + css, manifest)
+    app_name, app_attrs = write_asset(assets_dir, "app", "js", app_script, manifest)
+    names = {css_name, app_name}
+    head_vendor = tail_vendor = ""
+    if sankey != "canvas":
+        vendor_name, vendor_attrs = write_asset(assets_dir, "vendor", "js",
+                                                parts["highcharts_js"] + "\n;\n" + parts["sankey_js"] + "\n",
+                                                manifest)
+        names.add(vendor_name)
+        if sankey == "inline":
+            head_vendor = f'<script src="assets/{vendor_name}"{" " + vendor_attrs if sri else ""}></script>\n'
+        else:
+            integrity = f' data-integrity="{manifest["vendor.js"]["integrity"]}"' if sri else ""
+            tail_vendor = (f'<script type="text/plain" id="hvSankeyVendor" data-src="assets/{vendor_name}"'
+                           f'{integrity}></script>\n')
+    return {
+        "names": names,
+        "manifest": manifest,
+        "bytes": sum(os.path.getsize(os.path.join(assets_dir, n)) for n in names),
+        "styles": f'<link rel="stylesheet" href="assets/{css_name}"{" " + css_attrs if sri else ""}>\n',
+        "app_tag": f'<script src="assets/{app_name}"{" " + app_attrs if sri else ""}></script>\n',
+        "head_vendor": head_vendor,
+        "tail_vendor": tail_vendor,
+    }
+
+
+def simplify_tile_paths(parts, tol_px):
+    """Replace parts["tiles"] with simplified, quantized outlines."""
+    tiles, report = tile_geometry.simplify_tiles(parts["tiles"], tol_px)
+    before = sum(r["bytes_before"] for r in report)
+    after = sum(r["bytes_after"] for r in report)
+    print(f"  Tile paths simplified at {tol_px} px: {before} -> {after} bytes ({before - after} saved)")
+    for r in report:
+        note = "" if r["ok"] else f"  kept original (IoU below {tile_geometry.MIN_IOU})"
+        print(f"    {r['region']:<5} {r['points_before']:>4} -> {r['points_after']:>3} points  IoU {r['iou']:.3f}{note}")
+    parts["tiles"] = tiles
+
+
+def inline_from_store(parts, store_dir):
+    """Replace INLINE_DATA with the one assembled from a month-partitioned
+    store's aggregates (see month_store.py); regions the store does not
+    hold keep the source page's data."""
+    import month_store
+    store = month_store.MonthStore(store_dir)
+    prefix, page = parse_data_line(parts["gs_data_line"])
+    data = store.inline_data()
+    for section in ("monthly", "annual"):
+        page.setdefault(section, {}).update(data[section])
+    parts["gs_data_line"] = data_line(prefix, page)
+    months = sum(len(p) for p in store.agg["partitions"].values())
+    kept = [k for k in page["annual"] if k not in data["annual"]]
+    print(f"  INLINE_DATA from store {store_dir}: {len(data['annual'])} regions, {months} months"
+          + (f" (page data kept for {', '.join(kept)})" if kept else ""))
+
+
+def page_text(gs_viz_code, gv_viz_code, extra=""):
+    """Every string the page can show, for font subsetting: markup, the app
+    and viz scripts, region names and any build-specific extra text."""
+    return "".join([PAGE_HEAD_HTML, BODY_HEADER_HTML, MAP_SECTION_HTML, BODY_MAIN_HTML,
+                    app_js(gs_viz_code, gv_viz_code, ba=True), SANKEY_CANVAS_JS, PERF_RUNTIME_JS,
+                    "".join(name + desc for name, desc in REGIONS.values()), extra])
+
+
+def inline_fonts(parts, font_dir, text):
+    """Subset the web fonts in font_dir to the page's characters and inline
+    them as @font-face rules in place of the Google Fonts <link>s (see
+    font_subset.py; needs fontTools and brotli)."""
+    import font_subset
+    fonts = font_subset.build_fonts(font_dir, text)
+    parts["font_css"], parts["font_links"] = fonts["css"], fonts["links"]
+    print(f"  Fonts: {font_dir} ({fonts['chars']} characters)")
+    for family, st in fonts["families"].items():
+        print(f"    {family:<22} {st['faces']} face(s)  {st['source_bytes'] / 1024:>6.0f} KB -> "
+              f"{st['woff2_bytes'] / 1024:>4.0f} KB WOFF2")
+    for family, (weights, italic) in fonts["missing"].items():
+        what = "not found" if family not in fonts["families"] else "weight(s) " + ", ".join(
+            [str(w) for w in weights] + [f"{w} italic" for w in italic]) + " not found"
+        print(f"    {family:<22} {what}, still loaded from Google Fonts")
+    fcp = font_subset.fcp_change(fonts["css"], links_removed=not fonts["missing"])
+    print("    Modelled first paint change: " + ", ".join(f"{net} {ms:+d} ms" for net, ms in fcp.items()))
+
+
+def check_scenario_factors(parts):
+    """Warn when SCENARIO["factors"] do not reproduce the rates / stats baked
+    into RDATA: "As built" would show the baked arrays, and the first slider
+    move would jump every rate and stat (see scenario.baked_check; skipped
+    without NumPy)."""
+    try:
+        import scenario
+    except ImportError:
+        print("  Scenario factors: not checked against RDATA (needs NumPy)")
+        return
+    _, rdata = parse_data_line(parts["gv_data_line"])
+    if not rdata:
+        return
+    off = {k: v for k, v in scenario.baked_check(rdata).items() if v[0] > 1 or v[1]}
+    if not off:
+        print(f"  Scenario factors: reproduce RDATA for {len(rdata)} regions")
+        return
+    print(f"  WARNING: SCENARIO factors do not reproduce RDATA for {len(off)} of {len(rdata)} regions")
+    for k, (diff, stats) in off.items():
+        extra = ", ".join(f"{s} {a} -> {b}" for s, (a, b) in stats.items())
+        print(f"    {k:<5} max |rate diff| {diff} kg/MWh{'; ' + extra if extra else ''}")
+
+
+def write_rate_sketches(parts, path):
+    """Build the per-(year, region, month, hour) rate sketches from RDATA and
+    save them to path (see rate_sketch.py; needs NumPy)."""
+    import rate_sketch
+    _, rdata = parse_data_line(parts["gv_data_line"])
+    if not rdata:
+        print("  Rate sketches: no RDATA in the hourly source, skipped")
+        return
+    sk = rate_sketch.RateSketches.from_rdata(rdata)
+    sk.save(path)
+    print(f"  Rate sketches: {path} ({os.path.getsize(path) / 1024:.0f} KB, "
+          f"relative error <= {sk.alpha:.1%})")
+    for k, d in rdata.items():
+        p5, p95 = sk.quantiles([0.05, 0.95], regions=[k])
+        stats = d.get("stats", {})
+        print(f"    {k:<5} P5 {p5:>6.0f} (stats {stats.get('rateP5', '-')})  "
+              f"P95 {p95:>6.0f} (stats {stats.get('rateP95', '-')})")
+
+
+def export_data(parts, out_dir):
+    """Write INLINE_DATA / RDATA as memory-mappable .npy files (see
+    grid_data.py; needs NumPy)."""
+    import grid_data
+    inline = parse_data_line(parts["gs_data_line"])[1]
+    rdata = parse_data_line(parts["gv_data_line"])[1]
+    manifest = grid_data.write_store(inline, rdata, out_dir)
+    size = sum(os.path.getsize(os.path.join(out_dir, e["file"])) for e in manifest["files"].values())
+    print(f"  Data store: {out_dir} ({len(manifest['regions'])} regions, {len(manifest['years'])} years, "
+          f"{len(manifest['hourly'])} hourly series, {size / 1024:.0f} KB)")
+
+
+def export_parquet(parts, out_dir):
+    """Write the datasets as partitioned Parquet and read them back against
+    the embedded JSON (see parquet_export.py; needs pyarrow)."""
+    import parquet_export
+    rows = parquet_export.export(parts["gs_data_line"], parts["gv_data_line"], out_dir)
+    print(f"  Parquet export: {out_dir}")
+    for name, n in rows.items():
+        print(f"    {name:<15} {n:>9,} rows")
+    problems = parquet_export.verify(parts["gs_data_line"], parts["gv_data_line"], out_dir)
+    for p in problems:
+        print(f"    MISMATCH {p}")
+    print(f"    Round trip against the page JSON: {'OK' if not problems else f'{len(problems)} mismatches'}")
+
+
+def report_sources(parts, gs_viz_code, gv_viz_code):
+    print(f"  INLINE_DATA: {len(parts['gs_data_line'])} chars")
+    print(f"  RDATA: {len(parts['gv_data_line'])} chars")
+    print(f"  Highcharts JS: {len(parts['highcharts_js'])} chars")
+    print(f"  Sankey JS: {len(parts['sankey_js'])} chars")
+    print(f"  Tile paths: {len(parts['tiles'])} regions")
+    print(f"  Historic viz code: {len(gs_viz_code)} chars")
+    print(f"  Hourly viz code: {len(gv_viz_code)} chars")
+
+
+def build(grid_story_path, grid_viz_path, out_path, sankey="deferred", perf=False,
+          simplify_tiles=None, sketches=None, export_dir=None, parquet_dir=None, service_worker=False,
+          font_dir=None, store_dir=None):
+    gs_lines, gv_lines = read_sources(grid_story_path, grid_viz_path)
+    parts = extract(gs_lines, gv_lines)
+    if store_dir:
+        inline_from_store(parts, store_dir)
+    gs_viz_code = rename_historic(gs_lines)
+    gv_viz_code = skip_hourly(gv_lines)
+    report_sources(parts, gs_viz_code, gv_viz_code)
+    check_scenario_factors(parts)
+    if simplify_tiles:
+        simplify_tile_paths(parts, simplify_tiles)
+    if font_dir:
+        inline_fonts(parts, font_dir, page_text(gs_viz_code, gv_viz_code))
+    if sketches:
+        write_rate_sketches(parts, sketches)
+    if export_dir:
+        export_data(parts, export_dir)
+    if parquet_dir:
+        export_parquet(parts, parquet_dir)
+
+    html = render(parts, gs_viz_code, gv_viz_code, sankey=sankey, perf=perf, service_worker=service_worker)
+    size = write_output(html, out_path)
+    if service_worker:
+        write_service_worker(os.path.dirname(out_path), [os.path.basename(out_path)])
+
+    vendor_bytes = len(parts["highcharts_js"].encode("utf-8")) + len(parts["sankey_js"].encode("utf-8"))
+    print(f"\nBuilt: {out_path}")
+    print(f"Size: {size / 1024:.0f} KB")
+    if sankey == "deferred":
+        print(f"Sankey vendor: {vendor_bytes / 1024:.0f} KB moved out of <head> (parsed on demand)")
+    elif sankey == "canvas":
+        print(f"Sankey vendor: {vendor_bytes / 1024:.0f} KB dropped "
+              f"(canvas renderer adds {len(SANKEY_CANVAS_JS.encode('utf-8')) / 1024:.1f} KB)")
+    if perf:
+        print("Perf telemetry: included (open with ?perf=1)")
+    return html
+
+
+def build_targets(grid_story_path, grid_viz_path, out_dir, targets, sankey="deferred", perf=False,
+                  simplify_tiles=None, sketches=None, export_dir=None, parquet_dir=None,
+                  service_worker=False, split=False, font_dir=None, store_dir=None):
+    """Parse the sources once and write one page per target into out_dir.
+
+    A target is a region key (a standalone single-region page without the
+    tile map) or "all". The stylesheet, app script and vendor bundle are the
+    same for every target, so they are written once under assets/ with
+    content-hash names; each page inlines only its own data slices.
+
+    With split, the data slices become hashed assets too (data-<target>.js)
+    and "all" is written as index.html, so every page is a small shell and
+    only a data refresh or a code change replaces the matching asset.
+    Every asset tag carries Subresource Integrity; assets/manifest.json maps
+    logical names to the hashed files.
+    """
+    gs_lines, gv_lines = read_sources(grid_story_path, grid_viz_path)
+    parts = extract(gs_lines, gv_lines)
+    if store_dir:
+        inline_from_store(parts, store_dir)
+    gs_viz_code = rename_historic(gs_lines)
+    gv_viz_code = skip_hourly(gv_lines)
+    report_sources(parts, gs_viz_code, gv_viz_code)
+    check_scenario_factors(parts)
+    if simplify_tiles:
+        simplify_tile_paths(parts, simplify_tiles)
+    if font_dir:
+        inline_fonts(parts, font_dir, page_text(gs_viz_code, gv_viz_code))
+    if sketches:
+        write_rate_sketches(parts, sketches)
+    if export_dir:
+        export_data(parts, export_dir)
+    if parquet_dir:
+        export_parquet(parts, parquet_dir)
+
+    assets_dir = os.path.join(out_dir, "assets")
+    shared = write_shared_assets(assets_dir, parts, PAGE_CSS,
+                                 app_js(gs_viz_code, gv_viz_code, sankey=sankey, perf=perf,
+                                        service_worker=service_worker), sankey, sri=split)
+    styles, app_tag = shared["styles"], shared["app_tag"]
+    head_vendor, tail_vendor, shared_bytes = shared["head_vendor"], shared["tail_vendor"], shared["bytes"]
+
+    gs_prefix, inline_data = parse_data_line(parts["gs_data_line"])
+    gv_prefix, rdata = parse_data_line(parts["gv_data_line"])
+
+    manifest, pages, data_names = dict(shared["manifest"]), [], []
+    print(f"\nShared assets: {shared_bytes / 1024:.0f} KB ({', '.join(sorted(shared['names']))})")
+    for target in targets:
+        if target == "all":
+            keys = TILE_ORDER
+            gs_line, gv_line = parts["gs_data_line"], parts["gv_data_line"]
+        else:
+            keys = [target]
+            gs_line = data_line(gs_prefix, slice_inline_data(inline_data, keys))
+            gv_line = data_line(gv_prefix, slice_rdata(rdata, keys)) if gv_prefix else ""
+        if split:
+            page = "index.html" if target == "all" else f"{target}.html"
+            data_name, data_attrs = write_asset(assets_dir, f"data-{target}", "js",
+                                                data_js(gs_line, gv_line, perf=perf), manifest)
+            data_names.append(data_name)
+            scripts = ("<script>\n" + regions_js(keys, parts["tiles"]) + "</script>\n"
+                       + f'<script src="assets/{data_name}" {data_attrs}></script>\n' + app_tag)
+            extra = f" + {os.path.getsize(os.path.join(assets_dir, data_name)) / 1024:.0f} KB data"
+        else:
+            page = f"{target}.html"
+            scripts = "<script>\n" + config_js(gs_line, gv_line, keys, parts["tiles"], perf=perf) + "</script>\n" + app_tag
+            extra = ""
+        html = assemble_page(styles, scripts, head_vendor=head_vendor, tail_vendor=tail_vendor, perf=perf,
+                             fonts_html=parts.get("font_links", GOOGLE_FONTS_HTML),
+                             show_map=len(keys) > 1, narrative_html=narrative_block(gs_line, gv_line))
+        size = write_output(html, os.path.join(out_dir, page))
+        pages.append(page)
+        print(f"  {page:<12} {size / 1024:>7.0f} KB{extra}  (+ {shared_bytes / 1024:.0f} KB shared)")
+    print(f"  Asset manifest: {write_asset_manifest(assets_dir, manifest)}")
+    if service_worker:
+        write_service_worker(out_dir, pages + [os.path.join("assets", n) for n in sorted(shared["names"])]
+                             + [os.path.join("assets", n) for n in data_names])
+
+
+def build_ba(grid_story_path, grid_viz_path, out_dir, ba_dir, registry_path=BA_REGISTRY, sankey="deferred",
+             perf=False, simplify_tiles=None, service_worker=False, font_dir=None):
+    """Balancing-authority page: out_dir/ba.html plus one data chunk per BA
+    and per region total under out_dir/assets/ba/.
+
+    Region totals are summed from their member BAs here (ba_regions.py), so
+    the data lines in the source pages are not used; the sources still
+    supply the viz code, the vendor bundle and the region outlines.
+    """
+    gs_lines, gv_lines = read_sources(grid_story_path, grid_viz_path)
+    parts = extract(gs_lines, gv_lines)
+    gs_viz_code = rename_historic(gs_lines)
+    gv_viz_code = skip_hourly(gv_lines)
+    report_sources(parts, gs_viz_code, gv_viz_code)
+    if simplify_tiles:
+        simplify_tile_paths(parts, simplify_tiles)
+
+    registry = ba_regions.load_registry(registry_path)
+    if font_dir:
+        inline_fonts(parts, font_dir, page_text(gs_viz_code, gv_viz_code, "·".join(
+            e["name"] for group in ("interconnections", "regions", "bas") for e in registry[group])))
+    assets_dir = os.path.join(out_dir, "assets")
+    shared = write_shared_assets(assets_dir, parts, PAGE_CSS + BA_CSS,
+                                 app_js(gs_viz_code, gv_viz_code, sankey=sankey, perf=perf, ba=True,
+                                        service_worker=service_worker), sankey)
+
+    chunk_dir = os.path.join(assets_dir, "ba")
+    os.makedirs(chunk_dir, exist_ok=True)
+    index, integrity, chunk_bytes = {}, {}, {}
+    manifest = dict(shared["manifest"])
+
+    def emit(key, data, kind):
+        content = f"baChunk({js_str(key)}," + json.dumps(data, separators=(",", ":"), ensure_ascii=False) + ");\n"
+        name = write_hashed_asset(chunk_dir, key, "js", content)
+        index[key] = "assets/ba/" + name
+        integrity[key] = subresource_integrity(content)
+        manifest[f"ba/{key}.js"] = {"file": "ba/" + name, "integrity": integrity[key]}
+        chunk_bytes[key] = os.path.getsize(os.path.join(chunk_dir, name))
+
+    report = ba_regions.build_chunks(registry, ba_dir, emit)
+
+    ic_names = {ic["key"]: ic["name"] for ic in registry["interconnections"]}
+    region_names = {r["key"]: r["name"] for r in registry["regions"]}
+    region_ic = {r["key"]: ic_names[r["interconnection"]] for r in registry["regions"]}
+    names, keys, groups = {}, [], []
+    members = ba_regions.members(registry)
+    for ic in registry["interconnections"]:
+        regions = []
+        for r in registry["regions"]:
+            if r["interconnection"] != ic["key"] or r["key"] not in index:
+                continue
+            bas = [b for b in members[r["key"]] if b in index]
+            names[r["key"]] = (r["name"], f"{len(bas)} balancing authorities · {ic['name']}")
+            regions.append([r["key"], bas])
+            keys.append(r["key"])
+        if regions:
+            groups.append({"name": ic["name"], "regions": regions})
+    for ba in registry["bas"]:
+        if ba["key"] in index:
+            names[ba["key"]] = (ba["name"], f"{region_names[ba['region']]} · {region_ic[ba['region']]}")
+            keys.append(ba["key"])
+
+    config = config_js("const INLINE_DATA = {\"monthly\":{},\"annual\":{}};", "const RDATA = {};", keys,
+                       parts["tiles"], perf=perf, names=names)
+    config += "const BA_GROUPS = " + json.dumps(groups, separators=(",", ":"), ensure_ascii=False) + ";\n"
+    config += "const BA_INDEX = " + json.dumps({k: index[k] for k in keys}, separators=(",", ":")) + ";\n"
+    config += "const BA_INTEGRITY = " + json.dumps({k: integrity[k] for k in keys}, separators=(",", ":")) + ";\n"
+    html = assemble_page(shared["styles"], "<script>\n" + config + "</script>\n" + shared["app_tag"],
+                         head_vendor=shared["head_vendor"], tail_vendor=shared["tail_vendor"], perf=perf,
+                         fonts_html=parts.get("font_links", GOOGLE_FONTS_HTML))
+    size = write_output(html, os.path.join(out_dir, "ba.html"))
+
+    ba_sizes = [chunk_bytes[b] for b in keys if b not in region_names]
+    region_sizes = [chunk_bytes[r] for r in keys if r in region_names]
+    print(f"\nShared assets: {shared['bytes'] / 1024:.0f} KB ({', '.join(sorted(shared['names']))})")
+    print(f"  ba.html      {size / 1024:>7.0f} KB  (+ {shared['bytes'] / 1024:.0f} KB shared)")
+    print(f"  Asset manifest: {write_asset_manifest(assets_dir, manifest)}")
+    print(f"  {report['bas']} BA chunks: {sum(ba_sizes) / 1024:.0f} KB total, "
+          f"largest {max(ba_sizes, default=0) / 1024:.0f} KB")
+    print(f"  {report['regions']} region totals summed from BAs: {sum(region_sizes) / 1024:.0f} KB total, "
+          f"largest {max(region_sizes, default=0) / 1024:.0f} KB")
+    if report["missing"]:
+        print(f"  No data for {len(report['missing'])} BAs (tiles omitted): {', '.join(report['missing'])}")
+    for rk, skipped in report["hourly_skipped"].items():
+        print(f"  {rk}: hourly data of {', '.join(skipped)} does not line up with the other members; left out of the sum")
+    if service_worker:
+        # BA chunks are cached as they are first loaded rather than precached
+        write_service_worker(out_dir, ["ba.html"] + [os.path.join("assets", n) for n in sorted(shared["names"])])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the combined EIA Grid Explorer page.")
+    parser.add_argument("--sankey", choices=["deferred", "canvas", "inline"], default="deferred",
+                        help="how to ship the Sankey panel: deferred vendor chunk (default), "
+                             "built-in canvas renderer, or the old blocking <head> scripts")
+    parser.add_argument("--perf", action="store_true",
+                        help="inject the ?perf=1 telemetry overlay (omitted from the build by default)")
+    parser.add_argument("--simplify-tiles", nargs="?", type=float, const=0.5, metavar="PX",
+                        help="simplify and quantize the tile-map outlines with a tolerance of PX "
+                             "rendered pixels (default when given: 0.5)")
+    parser.add_argument("--sketches", metavar="PATH",
+                        help="also write mergeable emission-rate quantile sketches (.npz, needs NumPy) "
+                             "for month / season / hour-of-day percentiles; see rate_sketch.py")
+    parser.add_argument("--targets",
+                        help="comma-separated region keys and/or 'all' ('regions' = every region); "
+                             "writes one page per target into --out-dir instead of index.html")
+    parser.add_argument("--export-data", metavar="DIR",
+                        help="also write the datasets as memory-mappable .npy files + manifest.json "
+                             "(needs NumPy); read them with grid_data.py")
+    parser.add_argument("--export-parquet", metavar="DIR",
+                        help="also write every dataset as region/year-partitioned Parquet and check it "
+                             "round-trips (needs pyarrow); see parquet_export.py")
+    parser.add_argument("--ba", metavar="DIR",
+                        help="balancing-authority build: read <DIR>/<BA>.json for every BA in the registry "
+                             "and write ba.html plus per-BA data chunks into --out-dir")
+    parser.add_argument("--registry", default=BA_REGISTRY,
+                        help="region registry for --ba (default: src/ba_registry.json)")
+    parser.add_argument("--split", action="store_true",
+                        help="CDN layout: pages become small shells and the data slices join the app, "
+                             "style and vendor assets as content-hashed, SRI-tagged files listed in "
+                             "assets/manifest.json; the full explorer is written as index.html "
+                             "(implies --targets all unless --targets is given)")
+    parser.add_argument("--service-worker", action="store_true",
+                        help="also write sw.js and a precache manifest so the page works offline once "
+                             "visited over http(s); file:// pages never register it")
+    parser.add_argument("--store", metavar="DIR",
+                        help="assemble INLINE_DATA from the aggregates of a month-partitioned store "
+                             "(python month_store.py --seed / --append) instead of the source page")
+    parser.add_argument("--fonts", metavar="DIR",
+                        help="inline the page's web fonts from local font files in DIR, subset to the "
+                             "characters the page uses, instead of linking Google Fonts (needs fontTools "
+                             "and brotli); see font_subset.py")
+    parser.add_argument("--watch", nargs="?", type=int, const=8000, metavar="PORT",
+                        help="serve index.html on localhost:PORT (default 8000), rebuild only the stages "
+                             "whose input changed on every source edit and live-reload open tabs; "
+                             "see watch_build.py")
+    parser.add_argument("--out-dir", default=os.path.join(BASE, "dist"),
+                        help="output directory for --targets and --ba (default: dist/)")
+    args = parser.parse_args(argv)
+
+    grid_story_path, grid_viz_path = find_sources()
+    if args.watch:
+        unsupported = [flag for flag, value in [
+            ("--ba", args.ba), ("--targets", args.targets), ("--split", args.split), ("--store", args.store),
+            ("--fonts", args.fonts), ("--service-worker", args.service_worker), ("--sketches", args.sketches),
+            ("--export-data", args.export_data), ("--export-parquet", args.export_parquet)] if value]
+        if unsupported:
+            parser.error("--watch rebuilds index.html from the source pages only; it cannot be combined "
+                         f"with {', '.join(unsupported)}")
+        import watch_build
+        watch_build.watch(grid_story_path, grid_viz_path, os.path.join(BASE, "index.html"), port=args.watch,
+                          sankey=args.sankey, perf=args.perf, simplify_tiles=args.simplify_tiles)
+        return
+    if args.ba:
+        if args.store:
+            parser.error("--store feeds INLINE_DATA, which --ba builds do not use")
+        unsupported = [flag for flag, value in [
+            ("--sketches", args.sketches), ("--export-data", args.export_data),
+            ("--export-parquet", args.export_parquet)] if value]
+        if unsupported:
+            parser.error("--ba builds its data from the BA files; it cannot be combined "
+                         f"with {', '.join(unsupported)}")
+        build_ba(grid_story_path, grid_viz_path, args.out_dir, args.ba, registry_path=args.registry,
+                 sankey=args.sankey, perf=args.perf, simplify_tiles=args.simplify_tiles,
+                 service_worker=args.service_worker, font_dir=args.fonts)
+    elif args.targets or args.split:
+        targets = []
+        for t in (args.targets or "all").split(","):
+            t = t.strip()
+            if t == "regions":
+                targets += TILE_ORDER
+            elif t == "all" or t in REGIONS:
+                targets.append(t)
+            elif t:
+                parser.error(f"unknown target {t!r}: expected 'all', 'regions' or one of {', '.join(TILE_ORDER)}")
+        build_targets(grid_story_path, grid_viz_path, args.out_dir, list(dict.fromkeys(targets)),
+                      sankey=args.sankey, perf=args.perf, simplify_tiles=args.simplify_tiles,
+                      sketches=args.sketches, export_dir=args.export_data,
+                      parquet_dir=args.export_parquet, service_worker=args.service_worker,
+                      split=args.split, font_dir=args.fonts, store_dir=args.store)
+    else:
+        build(grid_story_path, grid_viz_path, os.path.join(BASE, "index.html"),
+              sankey=args.sankey, perf=args.perf, simplify_tiles=args.simplify_tiles,
+              sketches=args.sketches, export_dir=args.export_data,
+              parquet_dir=args.export_parquet, service_worker=args.service_worker,
+              font_dir=args.fonts, store_dir=args.store)
+    print("Done!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Build-time font subsetting for build_explorer.py --fonts DIR
+
+The page asks Google Fonts for four families (FAMILIES), which blocks the
+first render on a cross-origin stylesheet and breaks the page offline. With
+--fonts DIR the build reads those families from local font files instead
+(static or variable .ttf / .otf / .woff / .woff2, e.g. the Google Fonts
+download), subsets every face to the characters the page can show, and
+inlines the result as WOFF2 data URIs in @font-face rules with
+font-display: swap. The Google Fonts <link>s are dropped; any requested
+weight with no file in DIR (or a whole family) keeps its own Google Fonts
+request, so a partial directory still builds a page without faux bold.
+
+Faces are matched by family name (name ID 16, else 1), weight (OS/2
+usWeightClass, or the wght axis range of a variable font) and style (italic
+flag in OS/2 fsSelection). Only faces covering a weight the page requests
+are kept.
+
+The character set is everything in the generated markup and scripts (HTML
+entities and \\uXXXX escapes decoded) plus printable ASCII, which covers
+numbers and names that only exist in the data.
+"""
+import base64, gzip, html, io, logging, os, re
+
+from fontTools import subset
+from fontTools.ttLib import TTFont
+
+# family → (weights, italic weights), as requested from Google Fonts
+FAMILIES = {
+    "Lexend": ([400, 500, 600, 700], []),
+    "Plus Jakarta Sans": ([400, 500, 600, 700], [400, 500]),
+    "Rajdhani": ([400, 500, 600, 700], []),
+    "Barlow Semi Condensed": ([400, 500, 600, 700, 800], []),
+}
+FONT_EXTS = (".ttf", ".otf", ".woff", ".woff2")
+
+# "FFTM NOT subset" and similar notes for tables that are dropped anyway
+logging.getLogger("fontTools.subset").setLevel(logging.ERROR)
+
+# Simulated network of Lighthouse's throttling presets: (RTT ms, throughput kbit/s)
+NETWORKS = {"mobile": (150, 1638.4), "desktop": (40, 10240)}
+
+
+def google_fonts_html(families):
+    """The Google Fonts <link>s for {family: (weights, italic weights)}
+    ("" for none)."""
+    if not families:
+        return ""
+    specs = []
+    for family, (weights, italic) in families.items():
+        name = family.replace(" ", "+")
+        if italic:
+            axes = ";".join([f"0,{w}" for w in weights] + [f"1,{w}" for w in italic])
+            specs.append(f"family={name}:ital,wght@{axes}")
+        else:
+            specs.append(f"family={name}:wght@{';'.join(str(w) for w in weights)}")
+    return ('<link rel="preconnect" href="https://fonts.googleapis.com">\n'
+            '<link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>\n'
+            f'<link href="https://fonts.googleapis.com/css2?{"&".join(specs)}&display=swap" rel="stylesheet">\n')
+
+
+def page_chars(text):
+    """Characters the page can render, from its markup and script source."""
+    text = html.unescape(text)
+    text += "".join(chr(int(h, 16)) for h in re.findall(r"\\u([0-9a-fA-F]{4})", text))
+    chars = {c for c in text if c.isprintable()}
+    chars.update(chr(c) for c in range(0x20, 0x7F))
+    return "".join(sorted(chars))
+
+
+def _name(font, name_id):
+    rec = font["name"].getName(name_id, 3, 1) or font["name"].getName(name_id, 1, 0)
+    return rec.toUnicode() if rec else None
+
+
+def read_faces(font_dir):
+    """Every font file in font_dir as {path, family, weight: (lo, hi), italic}."""
+    faces = []
+    for name in sorted(os.listdir(font_dir)):
+        if not name.lower().endswith(FONT_EXTS):
+            continue
+        path = os.path.join(font_dir, name)
+        font = TTFont(path, lazy=True)
+        weight = font["OS/2"].usWeightClass
+        lo = hi = weight
+        if "fvar" in font:
+            for axis in font["fvar"].axes:
+                if axis.axisTag == "wght":
+                    lo, hi = int(axis.minValue), int(axis.maxValue)
+        faces.append({"path": path, "family": _name(font, 16) or _name(font, 1),
+                      "weight": (lo, hi), "italic": bool(font["OS/2"].fsSelection & 1)})
+        font.close()
+    return faces
+
+
+def subset_woff2(path, chars):
+    """WOFF2 bytes of one face subset to chars."""
+    font = TTFont(path)
+    options = subset.Options()
+    options.flavor = "woff2"
+    options.layout_features = ["*"]
+    options.hinting = False
+    options.desubroutinize = True
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(text=chars)
+    subsetter.subset(font)
+    buf = io.BytesIO()
+    font.flavor = "woff2"
+    font.save(buf)
+    return buf.getvalue()
+
+
+def font_face_css(family, weight, italic, woff2):
+    lo, hi = weight
+    return (f"@font-face{{font-family:'{family}';font-style:{'italic' if italic else 'normal'};"
+            f"font-weight:{lo if lo == hi else f'{lo} {hi}'};font-display:swap;"
+            f"src:url(data:font/woff2;base64,{base64.b64encode(woff2).decode('ascii')}) format('woff2');}}\n")
+
+
+def build_fonts(font_dir, text):
+    """@font-face CSS for every requested face found in font_dir.
+
+    Returns {"css", "links" (Google Fonts <link>s for the weights not
+    found), "families": {family: {"faces", "source_bytes", "woff2_bytes"}},
+    "missing": {family: (weights, italic weights) not found}, "chars": n}."""
+    chars = page_chars(text)
+    faces = read_faces(font_dir)
+    css, report, missing = "", {}, {}
+    for family, (weights, italic_weights) in FAMILIES.items():
+        used, uncovered = [], ([], [])  # (upright, italic) weights with no face
+        for italic, wanted in ((False, weights), (True, italic_weights)):
+            covered = set()
+            for face in faces:
+                lo, hi = face["weight"]
+                hits = {w for w in wanted if lo <= w <= hi}
+                if face["family"] == family and face["italic"] == italic and hits:
+                    used.append(face)
+                    covered |= hits
+            uncovered[italic].extend(w for w in wanted if w not in covered)
+        if uncovered[0] or uncovered[1]:
+            missing[family] = uncovered
+        if not used:
+            continue
+        stats = report[family] = {"faces": 0, "source_bytes": 0, "woff2_bytes": 0}
+        for face in used:
+            woff2 = subset_woff2(face["path"], chars)
+            css += font_face_css(family, face["weight"], face["italic"], woff2)
+            stats["faces"] += 1
+            stats["source_bytes"] += os.path.getsize(face["path"])
+            stats["woff2_bytes"] += len(woff2)
+    return {"css": css, "links": google_fonts_html(missing), "families": report,
+            "missing": missing, "chars": len(chars)}
+
+
+def fcp_change(css, links_removed):
+    """Modelled first-contentful-paint change in ms per NETWORKS profile.
+
+    The Google Fonts stylesheet is render-blocking on a new origin: DNS,
+    TCP, TLS and the request cost about 4 round trips before first paint
+    (the font files themselves use display=swap and do not block it).
+    Inlined fonts instead add their gzipped bytes to the critical path."""
+    added = len(gzip.compress(css.encode("utf-8")))
+    return {net: round(added * 8 / kbps - (4 * rtt if links_removed else 0))
+            for net, (rtt, kbps) in NETWORKS.items()}
@@ -0,0 +1,518 @@
+"""
+Read-only HTTP query API over the explorer's datasets
+
+`python grid_api.py [--page index.html] [--port 8765]` loads INLINE_DATA and
+RDATA from a built page once (RDATA region by region, into array('d')
+columns) and answers:
+
+  GET /regions                          keys, names, years, hourly range
+  GET /region/{k}/hourly                load, rate and per-fuel generation
+      ?from=2024-03-01&to=2024-03-07    inclusive; dates or YYYY-MM-DDTHH:MM,
+                                        no UTC offset
+      &resample=hour|day|week|month     MW fields are averaged, the emission
+                                        rate is load-weighted
+      &fields=load,rate,gas             default: every column
+  GET /region/{k}/monthly               INLINE_DATA.monthly records
+      ?from=2023-01&to=2024-12&resample=month|quarter|year
+                                        GWh summed, demand hour-weighted
+  GET /region/{k}/annual?from=2019&to=2025
+  GET /stats                            request / cache counters
+
+Every data endpoint also takes format=json (default) or format=csv. JSON is
+{"region", "dataset", "resample", "fields": ["time", ...], "rows": [[...]]}
+with null for missing values.
+
+Responses carry an ETag built from the datasets' digest and the normalized
+query, so If-None-Match is answered with 304 before any work is done.
+Encoded bodies are kept in an LRU cache (--cache-mb); a response estimated
+above STREAM_ROWS rows is sent with chunked transfer encoding as it is
+encoded, yielding to other connections between chunks, and is cached
+afterwards if it fits under the per-entry limit. HTTP/1.1 keep-alive is
+supported; the server only ever reads the page it was started with.
+
+bench_api.py is the matching load test.
+"""
+import argparse, asyncio, collections, datetime, hashlib, json, math, operator, os, traceback
+from array import array
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import build_explorer
+
+STREAM_ROWS = 5000  # larger responses are streamed
+CHUNK_ROWS = 1000
+IDLE_TIMEOUT = 15
+MAX_HEADER = 16 * 1024
+HOUR = datetime.timedelta(hours=1)
+HOURS = [f"{h:02d}:00" for h in range(24)]
+RESAMPLE_HOURLY = ("hour", "day", "week", "month")
+RESAMPLE_MONTHLY = ("month", "quarter", "year")
+
+
+class QueryError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# ── Datasets ──────────────────────────────────────────────────────────────────
+class GridData:
+    """The page's datasets, loaded once."""
+
+    def __init__(self, page):
+        gs_line = gv_line = ""
+        with open(page, "r", encoding="utf-8") as f:
+            for line in f:
+                s = line.strip()
+                if s.startswith("const INLINE_DATA"):
+                    gs_line = s
+                elif s.startswith("const RDATA"):
+                    gv_line = s
+        if not gs_line and not gv_line:
+            raise SystemExit(f"no INLINE_DATA / RDATA lines in {page}")
+        self.digest = hashlib.sha256((gs_line + "\n" + gv_line).encode("utf-8")).hexdigest()[:16]
+        inline = build_explorer.parse_data_line(gs_line)[1]
+        self.monthly = inline.get("monthly", {})
+        self.annual = inline.get("annual", {})
+        self.hourly = {}
+        for k, d in build_explorer.iter_data_line(gv_line):
+            cols = {"load": _column(d["load"]), "rate": _column(d["rate"])}
+            cols.update((f, _column(s)) for f, s in d["gen"].items())
+            self.hourly[k] = {"start": datetime.datetime(int(d.get("year", 2024)), 1, 1),
+                              "n": len(d["load"]), "columns": cols,
+                              "gaps": {f for f, c in cols.items() if any(v != v for v in c)}}
+        self.regions = list(dict.fromkeys(list(self.annual) + list(self.hourly)))
+
+    def describe(self):
+        out = {}
+        for k in self.regions:
+            name = build_explorer.REGIONS.get(k, (k, ""))[0]
+            entry = {"name": name, "years": sorted(self.annual.get(k, {}))}
+            h = self.hourly.get(k)
+            if h:
+                entry["hourly"] = {"from": _ts(h["start"]), "to": _ts(h["start"] + (h["n"] - 1) * HOUR),
+                                   "fields": list(h["columns"])}
+            out[k] = entry
+        return out
+
+
+def _column(values):
+    """array('i') for whole-number series (most of RDATA), else array('d')
+    with NaN for missing hours."""
+    if all(v is not None and float(v).is_integer() and abs(v) < 2 ** 31 for v in values):
+        return array("i", map(int, values))
+    return array("d", (math.nan if v is None else v for v in values))
+
+
+def _ts(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M")
+
+
+def _num(v):
+    if v is None or v != v:
+        return "null"
+    if float(v).is_integer():
+        return str(int(v))
+    return repr(round(v, 3))
+
+
+# ── Queries ───────────────────────────────────────────────────────────────────
+class Query:
+    """A validated query: normalized key, estimated rows and a row source."""
+
+    def __init__(self, key, region, dataset, resample, fields, rows, estimate, fmt, num=None):
+        self.key, self.region, self.dataset, self.resample = key, region, dataset, resample
+        self.fields, self.rows, self.estimate, self.fmt = fields, rows, estimate, fmt
+        self.num = num or _num  # value encoder; str when every value is an int
+
+    def chunks(self):
+        """Encoded body in pieces of CHUNK_ROWS rows."""
+        if self.fmt == "csv":
+            yield (",".join(["time"] + self.fields) + "\n").encode("utf-8")
+            num = self.num
+            encode = lambda r: r[0] + "," + ",".join("" if v is None or v != v else num(v) for v in r[1:]) + "\n"
+            sep, end = "", ""
+        else:
+            head = {"region": self.region, "dataset": self.dataset, "resample": self.resample,
+                    "fields": ["time"] + self.fields}
+            yield (json.dumps(head, separators=(",", ":"))[:-1] + ',"rows":[').encode("utf-8")
+            encode = lambda r: '["' + r[0] + '",' + ",".join(map(self.num, r[1:])) + "]"
+            sep, end = ",", "]}"
+        buf, lead = [], ""
+        for r in self.rows:
+            buf.append(encode(r))
+            if len(buf) >= CHUNK_ROWS:
+                yield (lead + sep.join(buf)).encode("utf-8")
+                buf, lead = [], sep
+        if buf:
+            yield (lead + sep.join(buf)).encode("utf-8")
+        if end:
+            yield end.encode("utf-8")
+
+
+def _parse_time(value, name):
+    try:
+        if len(value) == 10:
+            return datetime.datetime.strptime(value, "%Y-%m-%d"), datetime.timedelta(days=1)
+        t = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        raise QueryError(400, f"{name}: expected YYYY-MM-DD or YYYY-MM-DDTHH:MM, got {value!r}")
+    if t.tzinfo is not None:
+        # the hourly series are on the page's own clock, which carries no offset to convert against
+        raise QueryError(400, f"{name}: expected a time without a UTC offset, got {value!r}")
+    return t.replace(minute=0, second=0, microsecond=0), HOUR
+
+
+def _fields(params, available):
+    if "fields" not in params:
+        return list(available)
+    fields = [f for f in params["fields"].split(",") if f]
+    unknown = [f for f in fields if f not in available]
+    if unknown or not fields:
+        raise QueryError(400, f"unknown fields {', '.join(unknown) or '(none)'}; available: {', '.join(available)}")
+    return fields
+
+
+def _choice(params, name, options):
+    value = params.get(name, options[0])
+    if value not in options:
+        raise QueryError(400, f"{name}: expected one of {', '.join(options)}")
+    return value
+
+
+def _bucket(dt, resample):
+    if resample == "day":
+        return dt.replace(hour=0)
+    if resample == "week":
+        return (dt - datetime.timedelta(days=dt.weekday())).replace(hour=0)
+    return dt.replace(day=1, hour=0)
+
+
+def _mean(values, gaps):
+    if gaps:
+        values = [v for v in values if v == v]
+    return sum(values) / len(values) if len(values) else None
+
+
+def _weighted_mean(values, weights, gaps):
+    if gaps:
+        pairs = [(v, w) for v, w in zip(values, weights) if v == v and w == w]
+        values, weights = [v for v, _ in pairs], [w for _, w in pairs]
+    total = sum(weights)
+    return sum(map(operator.mul, values, weights)) / total if total else None
+
+
+def _next_bucket(b, resample):
+    if resample == "day":
+        return b + datetime.timedelta(days=1)
+    if resample == "week":
+        return b + datetime.timedelta(days=7)
+    return b.replace(year=b.year + (b.month == 12), month=b.month % 12 + 1)
+
+
+def plan_hourly(data, k, params):
+    h = data.hourly.get(k)
+    if not h:
+        raise QueryError(404, f"no hourly data for {k}")
+    start, n, cols = h["start"], h["n"], h["columns"]
+    resample = _choice(params, "resample", RESAMPLE_HOURLY)
+    fields = _fields(params, list(cols))
+    i0, i1 = 0, n
+    if "from" in params:
+        t, _ = _parse_time(params["from"], "from")
+        i0 = max(0, math.ceil((t - start) / HOUR))
+    if "to" in params:
+        t, span = _parse_time(params["to"], "to")
+        i1 = min(n, math.ceil((t + span - start) / HOUR))
+    i1 = max(i0, i1)
+    series = [cols[f] for f in fields]
+    load, gaps = cols["load"], h["gaps"]
+
+    def raw():
+        day = None
+        for i in range(i0, i1):
+            if day is None or i % 24 == 0:  # hour 0 of RDATA is midnight
+                day = (start + i * HOUR).strftime("%Y-%m-%dT")
+            yield [day + HOURS[i % 24]] + [s[i] for s in series]
+
+    def resampled():
+        # one C-level sum per bucket and field over array slices
+        rate, b, a = cols["rate"], _bucket(start + i0 * HOUR, resample), i0
+        while a < i1:
+            nb = _next_bucket(b, resample)
+            e = min(i1, (nb - start) // HOUR)
+            row = [_ts(b)]
+            for f, s in zip(fields, series):
+                if f == "rate":
+                    row.append(_weighted_mean(rate[a:e], load[a:e], bool(gaps & {"rate", "load"})))
+                else:
+                    row.append(_mean(s[a:e], f in gaps))
+            yield row
+            a, b = e, nb
+
+    fmt = _choice(params, "format", ("json", "csv"))
+    key = f"{k}/hourly?{i0}-{i1}&{resample}&{','.join(fields)}&{fmt}"
+    est = (i1 - i0) if resample == "hour" else (i1 - i0) // {"day": 24, "week": 168, "month": 672}[resample] + 1
+    if resample == "hour":
+        return Query(key, k, "hourly", resample, fields, raw(), est, fmt,
+                     num=str if all(s.typecode == "i" for s in series) else None)
+    return Query(key, k, "hourly", resample, fields, resampled(), est, fmt)
+
+
+def _month_key(value, name):
+    try:
+        y, m = value.split("-")
+        return int(y), int(m)
+    except ValueError:
+        raise QueryError(400, f"{name}: expected YYYY-MM, got {value!r}")
+
+
+def plan_monthly(data, k, params):
+    by_year = data.monthly.get(k)
+    if by_year is None:
+        raise QueryError(404, f"no monthly data for {k}")
+    records = sorted(((int(y), int(m)), rec) for y, months in by_year.items() for m, rec in months.items())
+    available = list(dict.fromkeys(f for _, rec in records for f in rec))
+    fields = _fields(params, available)
+    resample = _choice(params, "resample", RESAMPLE_MONTHLY)
+    lo = _month_key(params["from"], "from") if "from" in params else (0, 0)
+    hi = _month_key(params["to"], "to") if "to" in params else (9999, 12)
+    records = [(ym, rec) for ym, rec in records if lo <= ym <= hi]
+
+    def label(ym):
+        y, m = ym
+        return {"month": f"{y:04d}-{m:02d}", "quarter": f"{y:04d}-Q{(m - 1) // 3 + 1}", "year": f"{y:04d}"}[resample]
+
+    def rows():
+        groups = collections.OrderedDict()
+        for ym, rec in records:
+            groups.setdefault(label(ym), []).append((ym, rec))
+        for name, recs in groups.items():
+            row = [name]
+            for f in fields:
+                vals = [(rec.get(f), _month_hours(ym)) for ym, rec in recs if rec.get(f) is not None]
+                if not vals:
+                    row.append(None)
+                elif f.endswith("_gwh"):
+                    row.append(sum(v for v, _ in vals))
+                else:  # averages (demand_avg_mw): weight by hours in the month
+                    row.append(sum(v * h for v, h in vals) / sum(h for _, h in vals))
+            yield row
+
+    fmt = _choice(params, "format", ("json", "csv"))
+    key = f"{k}/monthly?{lo}-{hi}&{resample}&{','.join(fields)}&{fmt}"
+    return Query(key, k, "monthly", resample, fields, rows(), len(records), fmt)
+
+
+def _month_hours(ym):
+    y, m = ym
+    days = (datetime.date(y + (m == 12), m % 12 + 1, 1) - datetime.date(y, m, 1)).days
+    return days * 24
+
+
+def plan_annual(data, k, params):
+    by_year = data.annual.get(k)
+    if by_year is None:
+        raise QueryError(404, f"no annual data for {k}")
+    available = list(dict.fromkeys(f for rec in by_year.values() for f in rec))
+    fields = _fields(params, available)
+    try:
+        lo, hi = int(params.get("from", 0)), int(params.get("to", 9999))
+    except ValueError:
+        raise QueryError(400, "from / to: expected a year")
+    years = [y for y in sorted(by_year, key=int) if lo <= int(y) <= hi]
+    fmt = _choice(params, "format", ("json", "csv"))
+    rows = ([y] + [by_year[y].get(f) for f in fields] for y in years)
+    return Query(f"{k}/annual?{lo}-{hi}&{','.join(fields)}&{fmt}", k, "annual", "year", fields, rows, len(years), fmt)
+
+
+PLANS = {"hourly": plan_hourly, "monthly": plan_monthly, "annual": plan_annual}
+
+
+# ── Cache ─────────────────────────────────────────────────────────────────────
+class LRUCache:
+    """Encoded response bodies by normalized query, bounded in bytes."""
+
+    def __init__(self, max_bytes, entry_max):
+        self.max_bytes, self.entry_max = max_bytes, entry_max
+        self.items = collections.OrderedDict()
+        self.bytes = 0
+
+    def get(self, key):
+        body = self.items.get(key)
+        if body is not None:
+            self.items.move_to_end(key)
+        return body
+
+    def put(self, key, body):
+        if len(body) > self.entry_max or key in self.items:
+            return
+        self.items[key] = body
+        self.bytes += len(body)
+        while self.bytes > self.max_bytes:
+            _, old = self.items.popitem(last=False)
+            self.bytes -= len(old)
+
+
+# ── HTTP ──────────────────────────────────────────────────────────────────────
+class QueryServer:
+    def __init__(self, data, cache_mb=64, entry_max_mb=4):
+        self.data = data
+        self.cache = LRUCache(cache_mb << 20, entry_max_mb << 20)
+        self.counters = collections.Counter()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), IDLE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ")
+                except ValueError:
+                    await self.send(writer, 400, _error("malformed request line"), {}, keep=False)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                keep = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                await self.respond(writer, method, target, headers, keep)
+                if not keep:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, method, target, headers, keep):
+        self.counters["requests"] += 1
+        try:
+            await self._respond(writer, method, target, headers, keep)
+        except ConnectionError:
+            raise
+        except Exception:
+            self.counters["failures"] += 1
+            traceback.print_exc()
+            if not writer.is_closing():
+                await self.send(writer, 500, _error("internal error"), {}, keep)
+
+    async def _respond(self, writer, method, target, headers, keep):
+        if method not in ("GET", "HEAD"):
+            return await self.send(writer, 405, _error("read-only API: GET and HEAD only"), {"Allow": "GET, HEAD"}, keep)
+        url = urlsplit(target)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        parts = [unquote(p) for p in url.path.strip("/").split("/")]
+        head_only = method == "HEAD"
+        if parts == ["regions"]:
+            return await self.send(writer, 200, _json(self.data.describe()), {}, keep, head_only)
+        if parts == ["stats"]:
+            stats = dict(self.counters, cache_entries=len(self.cache.items), cache_bytes=self.cache.bytes)
+            return await self.send(writer, 200, _json(stats), {"Cache-Control": "no-store"}, keep, head_only)
+        if len(parts) != 3 or parts[0] != "region" or parts[2] not in PLANS:
+            return await self.send(writer, 404, _error("expected /regions, /stats or /region/{k}/hourly|monthly|annual"),
+                                   {}, keep, head_only)
+        try:
+            q = PLANS[parts[2]](self.data, parts[1], params)
+        except QueryError as e:
+            self.counters["errors"] += 1
+            return await self.send(writer, e.status, _error(str(e)), {}, keep, head_only)
+
+        etag = f'"{self.data.digest}-{hashlib.sha1(q.key.encode("utf-8")).hexdigest()[:16]}"'
+        extra = {"ETag": etag, "Cache-Control": "no-cache",
+                 "Content-Type": "text/csv; charset=utf-8" if q.fmt == "csv" else "application/json"}
+        if etag in [t.strip() for t in headers.get("if-none-match", "").split(",")]:
+            self.counters["not_modified"] += 1
+            return await self.send(writer, 304, b"", extra, keep, head_only=True)
+        body = self.cache.get(q.key)
+        if body is not None:
+            self.counters["hits"] += 1
+            return await self.send(writer, 200, body, dict(extra, **{"X-Cache": "hit"}), keep, head_only)
+        self.counters["misses"] += 1
+        if head_only or q.estimate <= STREAM_ROWS:
+            body = b"".join(q.chunks())
+            self.cache.put(q.key, body)
+            return await self.send(writer, 200, body, dict(extra, **{"X-Cache": "miss"}), keep, head_only)
+
+        self.counters["streamed"] += 1
+        writer.write(_head(200, dict(extra, **{"X-Cache": "miss", "Transfer-Encoding": "chunked"}), keep))
+        kept, size = [], 0
+        try:
+            for chunk in q.chunks():
+                writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                if kept is not None:
+                    kept.append(chunk)
+                    size += len(chunk)
+                    if size > self.cache.entry_max:
+                        kept = None
+                await writer.drain()
+                await asyncio.sleep(0)  # let other connections in between chunks
+        except Exception:
+            writer.close()  # the 200 head is already out; a cut-off body is the only signal left
+            raise
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+        if kept is not None:
+            self.cache.put(q.key, b"".join(kept))
+
+    async def send(self, writer, status, body, headers, keep, head_only=False):
+        headers = dict({"Content-Type": "application/json"}, **headers)
+        if status != 304:
+            headers["Content-Length"] = str(len(body))
+        writer.write(_head(status, headers, keep) + (b"" if head_only else body))
+        await writer.drain()
+
+
+REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           500: "Internal Server Error"}
+
+
+def _head(status, headers, keep):
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+    lines += [f"{k}: {v}" for k, v in headers.items()]
+    lines.append("Connection: " + ("keep-alive" if keep else "close"))
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def _json(obj):
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def _error(message):
+    return _json({"error": message})
+
+
+async def serve(data, host="127.0.0.1", port=8765, cache_mb=64, ready=None):
+    app = QueryServer(data, cache_mb=cache_mb)
+    server = await asyncio.start_server(app.handle, host, port, limit=MAX_HEADER)
+    if ready:
+        ready(server)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Read-only query API over the Grid Explorer datasets.")
+    parser.add_argument("--page", default=os.path.join(build_explorer.BASE, "index.html"),
+                        help="built page with the INLINE_DATA / RDATA lines (default: index.html)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cache-mb", type=int, default=64, help="LRU cache size for encoded responses (default: 64)")
+    args = parser.parse_args(argv)
+    data = GridData(args.page)
+    hours = sum(h["n"] for h in data.hourly.values())
+    print(f"  Loaded {args.page}: {len(data.regions)} regions, {hours:,} region-hours (digest {data.digest})")
+
+    def ready(server):
+        print(f"  Serving http://{args.host}:{server.sockets[0].getsockname()[1]}/regions (Ctrl+C to stop)", flush=True)
+
+    try:
+        asyncio.run(serve(data, args.host, args.port, args.cache_mb, ready))
+    except KeyboardInterrupt:
+        print("\n  Stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Memory-mapped access to the Grid Explorer datasets
+
+`python build_explorer.py --export-data DIR` writes the numbers behind the
+page as fixed-layout NumPy files plus a JSON manifest:
+
+  annual.npy       structured (region, year) records: year + one float64
+                   column per INLINE_DATA.annual field (NaN where missing)
+  monthly.npy      structured (region, year, month) records, the same way
+  hourly_gen.npy   float64 (region, fuel, hour) generation, MW
+  hourly_load.npy  float64 (region, hour) load, MW
+  hourly_rate.npy  float64 (region, hour) emission rate, kg CO2/MWh
+  manifest.json    regions, years, fields, fuels, per-region hourly start
+                   year / length / stats, and the shape of every file
+
+Hourly arrays are padded with NaN to the longest region. open_store() reads
+only the manifest and the .npy headers; every view below is a slice of an
+np.memmap, so only the pages that are touched are read from disk:
+
+  import grid_data
+  store = grid_data.open_store("data")
+  cal = store.region("CAL")
+  cal.annual()["gas_gwh"]         # one value per store.years
+  cal.monthly(2024)["solar_gwh"]  # 12 values
+  cal.hourly("gas")               # MW per hour from 1 Jan of cal.hourly_year
+  cal.hourly("rate")
+
+Usage:
+  python grid_data.py --bench DIR   # open + query vs json.loads of index.html
+"""
+import argparse, json, os, time
+
+import numpy as np
+
+MANIFEST = "manifest.json"
+
+
+# ── Writing ───────────────────────────────────────────────────────────────────
+def _fields(records):
+    out = []
+    for rec in records:
+        for f in rec:
+            if f not in out:
+                out.append(f)
+    return out
+
+
+def write_store(inline, rdata, out_dir):
+    """Write INLINE_DATA / RDATA dicts as .npy files + manifest.json."""
+    os.makedirs(out_dir, exist_ok=True)
+    regions = list(inline.get("annual", {})) + [k for k in rdata if k not in inline.get("annual", {})]
+    annual, monthly = inline.get("annual", {}), inline.get("monthly", {})
+    years = sorted({int(y) for by_year in list(annual.values()) + list(monthly.values()) for y in by_year})
+    a_fields = _fields(rec for by_year in annual.values() for rec in by_year.values())
+    m_fields = _fields(rec for by_year in monthly.values() for ms in by_year.values() for rec in ms.values())
+    manifest = {"version": 1, "regions": regions, "years": years,
+                "annual_fields": a_fields, "monthly_fields": m_fields, "files": {}}
+
+    a = np.zeros((len(regions), len(years)), dtype=[("year", "i2")] + [(f, "f8") for f in a_fields])
+    m = np.zeros((len(regions), len(years), 12), dtype=[("year", "i2"), ("month", "i1")] + [(f, "f8") for f in m_fields])
+    for f in a_fields:
+        a[f] = np.nan
+    for f in m_fields:
+        m[f] = np.nan
+    a["year"] = years
+    m["year"] = np.asarray(years)[:, None]
+    m["month"] = np.arange(1, 13)
+    for ri, k in enumerate(regions):
+        for y, rec in annual.get(k, {}).items():
+            for f, v in rec.items():
+                a[ri, years.index(int(y))][f] = v
+        for y, ms in monthly.get(k, {}).items():
+            for mo, rec in ms.items():
+                for f, v in rec.items():
+                    m[ri, years.index(int(y)), int(mo) - 1][f] = v
+
+    fuels = _fields(d["gen"] for d in rdata.values())
+    n = max((len(d["load"]) for d in rdata.values()), default=0)
+    gen = np.full((len(regions), len(fuels), n), np.nan)
+    load = np.full((len(regions), n), np.nan)
+    rate = np.full((len(regions), n), np.nan)
+    hourly = {}
+    for ri, k in enumerate(regions):
+        d = rdata.get(k)
+        if not d:
+            continue
+        nk = len(d["load"])
+        for fi, fu in enumerate(fuels):
+            if fu in d["gen"]:
+                gen[ri, fi, :nk] = d["gen"][fu]
+        load[ri, :nk] = d["load"]
+        rate[ri, :nk] = d["rate"]
+        hourly[k] = {"year": d.get("year"), "hours": nk, "stats": d.get("stats", {})}
+    manifest.update({"fuels": fuels, "hourly": hourly})
+
+    for name, arr in (("annual", a), ("monthly", m), ("hourly_gen", gen), ("hourly_load", load), ("hourly_rate", rate)):
+        np.save(os.path.join(out_dir, name + ".npy"), arr)
+        manifest["files"][name] = {"file": name + ".npy", "shape": list(arr.shape), "dtype": arr.dtype.descr
+                                   if arr.dtype.names else arr.dtype.str}
+    with open(os.path.join(out_dir, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+# ── Reading ───────────────────────────────────────────────────────────────────
+class RegionView:
+    """Views of one region's rows; nothing is copied until it is used."""
+
+    def __init__(self, store, key):
+        self.store, self.key = store, key
+        self._i = store.regions.index(key)
+        h = store.manifest["hourly"].get(key)
+        self.hourly_year = h["year"] if h else None
+        self.hours = h["hours"] if h else 0
+        self.stats = h["stats"] if h else {}
+
+    def annual(self):
+        """Structured (year,) records; columns as in INLINE_DATA.annual."""
+        return self.store.array("annual")[self._i]
+
+    def monthly(self, year):
+        """Structured (month,) records for one year."""
+        return self.store.array("monthly")[self._i, self.store.years.index(int(year))]
+
+    def hourly(self, fuel):
+        """Hourly series for a fuel, or "load" / "rate"."""
+        if fuel in ("load", "rate"):
+            return self.store.array("hourly_" + fuel)[self._i, :self.hours]
+        return self.store.array("hourly_gen")[self._i, self.store.fuels.index(fuel), :self.hours]
+
+    def hour_stamps(self):
+        """datetime64[h] stamp for every hourly value."""
+        start = np.datetime64(f"{self.hourly_year}-01-01T00", "h")
+        return start + np.arange(self.hours, dtype="timedelta64[h]")
+
+
+class GridStore:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.regions = self.manifest["regions"]
+        self.years = self.manifest["years"]
+        self.fuels = self.manifest["fuels"]
+        self._arrays = {}
+
+    def array(self, name):
+        """The memory-mapped array behind a manifest entry (opened lazily)."""
+        if name not in self._arrays:
+            self._arrays[name] = np.load(os.path.join(self.path, self.manifest["files"][name]["file"]),
+                                         mmap_mode="r")
+        return self._arrays[name]
+
+    def region(self, key):
+        return RegionView(self, key)
+
+
+def open_store(path):
+    return GridStore(path)
+
+
+# ── Benchmark against json.loads of the page blob ─────────────────────────────
+def bench(store_dir, page, repeat=5):
+    def best(fn):
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            out = fn()
+            times.append(time.perf_counter() - t0)
+        return min(times) * 1000, out
+
+    def via_json():
+        inline = rdata = None
+        with open(page, "r", encoding="utf-8") as f:
+            for line in f:
+                s = line.strip()
+                if s.startswith("const INLINE_DATA"):
+                    inline = json.loads(s[s.index("{"):].rstrip(";"))
+                elif s.startswith("const RDATA"):
+                    rdata = json.loads(s[s.index("{"):].rstrip(";"))
+        k = next(iter(rdata))
+        return (inline["annual"][k]["2024"]["gas_gwh"], inline["monthly"][k]["2024"]["7"]["solar_gwh"],
+                sum(rdata[k]["gen"]["gas"]))
+
+    def via_store():
+        store = open_store(store_dir)
+        r = store.region(next(iter(store.manifest["hourly"])))
+        return (float(r.annual()["gas_gwh"][store.years.index(2024)]), float(r.monthly(2024)["solar_gwh"][6]),
+                float(r.hourly("gas").sum()))
+
+    def open_only():
+        return open_store(store_dir)
+
+    t_json, a = best(via_json)
+    t_open, _ = best(open_only)
+    t_store, b = best(via_store)
+    size = sum(os.path.getsize(os.path.join(store_dir, e["file"])) for e in open_store(store_dir).manifest["files"].values())
+    rows = [(f"json.loads of {os.path.basename(page)} ({os.path.getsize(page) / 1e6:.1f} MB) + 3 lookups", t_json),
+            (f"open_store ({size / 1e6:.1f} MB of .npy)", t_open),
+            ("open_store + the same 3 lookups", t_store)]
+    for label, t in rows:
+        print(f"  {label:<52} {t:9.2f} ms")
+    print(f"  results match: {np.allclose(a, b)}")
+    return t_json, t_open, t_store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the memory-mapped store against the page blob.")
+    parser.add_argument("--bench", metavar="DIR", required=True, help="store written by build_explorer.py --export-data")
+    parser.add_argument("--page", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "index.html"),
+                        help="built page whose data lines are parsed for comparison (default: index.html)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+    bench(args.bench, args.page, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+"""
+Month-partitioned grid data store with incrementally maintained aggregates
+
+EIA-930 data arrives a month at a time. Instead of regenerating INLINE_DATA
+from 2019 onward, the months live in a local store and every append only
+touches its own partition:
+
+  STORE/partitions/<REGION>/<YYYY>-<MM>.json
+      {"region", "year", "month", "kind": "hourly", "start": "YYYY-MM-01T00:00",
+       "columns": {"demand_mw": [...], "<fuel>_mw": [...]}}   one value per hour
+      or {"kind": "summary", ...}: a month known only by its totals (seeded
+      from an existing page, see seed())
+  STORE/aggregates.json
+      "partitions": {region: {"YYYY-MM": summary}}   per-partition sums
+      "years":      {region: {"YYYY": sums}}         running annual sums
+      "seed_peaks": {region: {"YYYY": MW}}           annual peaks of seeded years
+      "seed_residuals": {region: {"YYYY": sums}}     page annual sums minus the
+                                                     seeded months' (see seed())
+
+A summary holds hours, hours with demand, demand and per-fuel energy as
+integer kWh, and the peak hourly demand. Integer sums make the running
+totals exact: put() subtracts the replaced partition's summary and adds the
+new one, so the annual sums never drift from a recount. Peaks cannot be
+subtracted, so a year's peak is re-derived from its (at most 12) partition
+peaks, as is the set of fuels it reports. An append therefore reads and
+sums one month of hours, rewrites one partition file and aggregates.json,
+and nothing else.
+
+inline_data() turns the aggregates into the page's INLINE_DATA layout
+(GWh to one decimal, hour-weighted average demand, peak demand), which is
+what `build_explorer.py --store STORE` embeds. verify() recomputes every
+summary and annual sum from the partition files and compares them with the
+maintained aggregates.
+
+Usage:
+  python month_store.py --seed STORE [--page src/grid-story.html]
+  python month_store.py --append STORE CAL 2025-10 cal-2025-10.csv
+  python month_store.py --verify STORE
+
+The CSV for --append has a header row: the hour first, then demand (or
+demand_mw) and one column per fuel (coal or coal_mw, ...); empty cells are
+missing hours.
+"""
+import argparse, calendar, csv, hashlib, json, math, os, time
+
+# INLINE_DATA field order
+FUELS = ["coal", "gas", "nuclear", "oil", "solar", "wind", "hydro", "storage", "geo", "other"]
+AGGREGATES = "aggregates.json"
+
+
+def _kwh(mw):
+    """One hour at mw as integer kWh (the unit all sums are kept in)."""
+    return int(round(mw * 1000))
+
+
+def _key(year, month):
+    return f"{int(year):04d}-{int(month):02d}"
+
+
+def hours_in_month(year, month):
+    return calendar.monthrange(int(year), int(month))[1] * 24
+
+
+def summarize(part):
+    """Sums of one partition; summary partitions already are one."""
+    if part["kind"] == "summary":
+        return {k: part[k] for k in ("hours", "demand_hours", "demand_kwh", "gen_kwh", "peak_mw")}
+    cols = part["columns"]
+    demand = cols.get("demand_mw", [])
+    present = [v for v in demand if v is not None]
+    gen = {}
+    for f in FUELS:
+        series = cols.get(f + "_mw")
+        if series is not None:
+            gen[f] = sum(_kwh(v) for v in series if v is not None)
+    return {"hours": len(demand), "demand_hours": len(present), "demand_kwh": sum(_kwh(v) for v in present),
+            "gen_kwh": gen, "peak_mw": max(present) if present else None}
+
+
+def _empty_year():
+    return {"months": 0, "hours": 0, "demand_hours": 0, "demand_kwh": 0, "gen_kwh": {}, "peak_mw": None}
+
+
+class MonthStore:
+    def __init__(self, root):
+        self.root = root
+        path = os.path.join(root, AGGREGATES)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.agg = json.load(f)
+        else:
+            self.agg = {"version": 1, "partitions": {}, "years": {}, "seed_peaks": {}, "seed_residuals": {}}
+
+    def partition_path(self, region, year, month):
+        return os.path.join(self.root, "partitions", region, _key(year, month) + ".json")
+
+    def save(self):
+        _write_json(os.path.join(self.root, AGGREGATES), self.agg)
+
+    # ── Incremental maintenance ──────────────────────────────────────────────
+    def put(self, part, save=True):
+        """Append or replace one region-month partition and update the
+        aggregates by the difference. Returns the partition's summary."""
+        region, year, month = part["region"], int(part["year"]), int(part["month"])
+        path = self.partition_path(region, year, month)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = _write_json(path, part)
+        summary = summarize(part)
+        summary["kind"] = part["kind"]
+        summary["sha256"] = hashlib.sha256(data).hexdigest()
+
+        parts = self.agg["partitions"].setdefault(region, {})
+        old = parts.get(_key(year, month))
+        years = self.agg["years"].setdefault(region, {})
+        y = years.setdefault(str(year), _empty_year())
+        if old:
+            _add(y, old, -1)
+        _add(y, summary, 1)
+        parts[_key(year, month)] = summary
+        self._refresh_year(region, year)
+        if save:
+            self.save()
+        return summary
+
+    def _refresh_year(self, region, year):
+        """The parts of a year's aggregate that are not sums: its peak, and
+        which fuels it reports at all."""
+        y = self.agg["years"][region][str(year)]
+        months = [s for k, s in self.agg["partitions"][region].items() if k.startswith(f"{int(year):04d}-")]
+        reported = {f for s in months for f in s["gen_kwh"]}
+        y["gen_kwh"] = {f: v for f, v in y["gen_kwh"].items() if f in reported}
+        peaks = [s["peak_mw"] for s in months if s["peak_mw"] is not None]
+        seed = self.agg["seed_peaks"].get(region, {}).get(str(year))
+        if seed is not None and any(s["kind"] == "summary" for s in months):
+            peaks.append(seed)
+        y["peak_mw"] = max(peaks) if peaks else None
+
+    # ── Page blobs ───────────────────────────────────────────────────────────
+    def inline_data(self):
+        """INLINE_DATA ({"monthly", "annual"}) from the aggregates."""
+        monthly, annual = {}, {}
+        for region, parts in self.agg["partitions"].items():
+            for key in sorted(parts):
+                year, month = key.split("-")
+                monthly.setdefault(region, {}).setdefault(str(int(year)), {})[str(int(month))] = _record(parts[key])
+            for year in sorted(self.agg["years"].get(region, {})):
+                y = self.agg["years"][region][year]
+                if y["months"]:
+                    annual.setdefault(region, {})[year] = self.annual_record(region, year)
+        return {"monthly": monthly, "annual": annual}
+
+    def annual_record(self, region, year):
+        """One region-year's INLINE_DATA annual record."""
+        year = str(year)
+        return _record(self._seeded(region, year, self.agg["years"][region][year]), peak=True)
+
+    def _seeded(self, region, year, y):
+        """A year's sums plus the page's seed residual while any of its
+        months is still a seeded summary; the running sums stay pure
+        partition sums, so verify() is unaffected."""
+        residual = self.agg.get("seed_residuals", {}).get(region, {}).get(year)
+        months = self.agg["partitions"][region]
+        if residual is None or not any(s["kind"] == "summary" for k, s in months.items() if k.startswith(year + "-")):
+            return y
+        gen = dict(y["gen_kwh"])
+        for f, v in residual["gen_kwh"].items():
+            gen[f] = gen.get(f, 0) + v
+        return dict(y, demand_kwh=y["demand_kwh"] + residual["demand_kwh"], gen_kwh=gen)
+
+    # ── Full recompute ───────────────────────────────────────────────────────
+    def recompute(self):
+        """Aggregates rebuilt from every partition file (ignores the
+        maintained ones); sha256 is of the file as it is on disk now."""
+        fresh = MonthStore.__new__(MonthStore)
+        fresh.root = self.root
+        fresh.agg = {"version": 1, "partitions": {}, "years": {}, "seed_peaks": self.agg["seed_peaks"],
+                     "seed_residuals": self.agg.get("seed_residuals", {})}
+        base = os.path.join(self.root, "partitions")
+        for region in sorted(os.listdir(base)) if os.path.isdir(base) else []:
+            for name in sorted(os.listdir(os.path.join(base, region))):
+                if not name.endswith(".json"):
+                    continue
+                with open(os.path.join(base, region, name), "rb") as f:
+                    data = f.read()
+                part = json.loads(data)
+                summary = summarize(part)
+                summary["kind"] = part["kind"]
+                summary["sha256"] = hashlib.sha256(data).hexdigest()
+                fresh.agg["partitions"].setdefault(region, {})[name[:-5]] = summary
+                y = fresh.agg["years"].setdefault(region, {}).setdefault(str(int(name[:4])), _empty_year())
+                _add(y, summary, 1)
+        for region, years in fresh.agg["years"].items():
+            for year in years:
+                fresh._refresh_year(region, year)
+        return fresh
+
+    def verify(self):
+        """Mismatches between the maintained aggregates and a full
+        recompute (empty when they agree exactly)."""
+        fresh = self.recompute()
+        problems = []
+        for section in ("partitions", "years"):
+            mine, theirs = self.agg[section], fresh.agg[section]
+            for region in sorted(set(mine) | set(theirs)):
+                a, b = mine.get(region, {}), theirs.get(region, {})
+                for key in sorted(set(a) | set(b)):
+                    if a.get(key) != b.get(key):
+                        fields = sorted(f for f in set(a.get(key) or {}) | set(b.get(key) or {})
+                                        if (a.get(key) or {}).get(f) != (b.get(key) or {}).get(f))
+                        problems.append(f"{section} {region} {key}: " + (", ".join(fields) if a.get(key) and b.get(key)
+                                        else "missing from the " + ("aggregates" if not a.get(key) else "partitions")))
+        return problems
+
+
+def _add(y, s, sign):
+    y["months"] += sign
+    for k in ("hours", "demand_hours", "demand_kwh"):
+        y[k] += sign * s[k]
+    for f, v in s["gen_kwh"].items():
+        y["gen_kwh"][f] = y["gen_kwh"].get(f, 0) + sign * v
+
+
+def _record(s, peak=False):
+    rec = {"demand_avg_mw": round(s["demand_kwh"] / 1000 / s["demand_hours"], 1) if s["demand_hours"] else None}
+    if peak:
+        rec["peak_demand_mw"] = float(s["peak_mw"]) if s["peak_mw"] is not None else None
+    for f in FUELS:
+        if f in s["gen_kwh"]:
+            rec[f + "_gwh"] = round(s["gen_kwh"][f] / 1e6, 1)
+    return rec
+
+
+def _write_json(path, obj):
+    """Write via a temporary file so a reader never sees half a file."""
+    data = json.dumps(obj, separators=(",", ":")).encode("utf-8")
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return data
+
+
+# ── Loading data ──────────────────────────────────────────────────────────────
+def hourly_partition(region, year, month, demand, gen):
+    """Partition dict from hourly demand and {fuel: series} (MW, None = missing)."""
+    n = hours_in_month(year, month)
+    if len(demand) != n or any(len(s) != n for s in gen.values()):
+        raise ValueError(f"{region} {_key(year, month)}: expected {n} hourly values")
+    cols = {"demand_mw": list(demand)}
+    cols.update({f + "_mw": list(gen[f]) for f in FUELS if f in gen})
+    return {"region": region, "year": int(year), "month": int(month), "kind": "hourly",
+            "start": f"{_key(year, month)}-01T00:00", "columns": cols}
+
+
+def read_csv(path, region, year, month):
+    """Partition from a CSV of hourly rows (see the module docstring)."""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        rows = list(csv.reader(f))
+    header = [h.strip().lower() for h in rows[0]]
+    cols = {h[:-3] if h.endswith("_mw") else h: i for i, h in enumerate(header) if i}
+    if "demand" not in cols:
+        raise ValueError(f"{path}: no demand column")
+    value = lambda row, i: float(row[i]) if i < len(row) and row[i].strip() else None
+    data = [r for r in rows[1:] if r]
+    return hourly_partition(region, year, month, [value(r, cols["demand"]) for r in data],
+                            {f: [value(r, cols[f]) for r in data] for f in FUELS if f in cols})
+
+
+def _seed_kwh(gwh):
+    """A page GWh figure as integer kWh; -0.0 (a small negative total) stays
+    negative so it rounds back to -0.0."""
+    kwh = int(round(gwh * 1e6))
+    return -1 if kwh == 0 and math.copysign(1, gwh) < 0 else kwh
+
+
+def seed(store, inline):
+    """Fill an empty store from a page's INLINE_DATA: one summary partition
+    per region-month, the annual peaks, and each year's residual: the page's
+    annual sums minus the sum of its (rounded) monthly records. While a year
+    still has a seeded month, inline_data() adds the residual back, so a
+    freshly seeded store reproduces the page's records exactly; once every
+    month of a year has hourly data, its record is the plain sum again."""
+    for region, years in inline.get("monthly", {}).items():
+        for year, months in years.items():
+            for month, rec in months.items():
+                hours = hours_in_month(year, month)
+                avg = rec.get("demand_avg_mw")
+                store.put({"region": region, "year": int(year), "month": int(month), "kind": "summary",
+                           "hours": hours, "demand_hours": hours if avg is not None else 0,
+                           "demand_kwh": int(round(avg * hours * 1000)) if avg is not None else 0,
+                           "gen_kwh": {f: _seed_kwh(rec[f + "_gwh"]) for f in FUELS if rec.get(f + "_gwh") is not None},
+                           "peak_mw": None}, save=False)
+    for region, years in inline.get("annual", {}).items():
+        for year, rec in years.items():
+            if rec.get("peak_demand_mw") is not None:
+                store.agg["seed_peaks"].setdefault(region, {})[year] = rec["peak_demand_mw"]
+            y = store.agg["years"].get(region, {}).get(year)
+            if y is None:
+                continue
+            store._refresh_year(region, year)
+            residual = {"demand_kwh": 0, "gen_kwh": {}}
+            if rec.get("demand_avg_mw") is not None and y["demand_hours"]:
+                residual["demand_kwh"] = int(round(rec["demand_avg_mw"] * y["demand_hours"] * 1000)) - y["demand_kwh"]
+            for f in FUELS:
+                if rec.get(f + "_gwh") is not None:
+                    residual["gen_kwh"][f] = _seed_kwh(rec[f + "_gwh"]) - y["gen_kwh"].get(f, 0)
+            store.agg["seed_residuals"].setdefault(region, {})[year] = residual
+    store.save()
+
+
+def annual_drift(store, inline):
+    """{(region, year, field): (page, store)} where the store's annual
+    record differs from the page's."""
+    out = {}
+    mine = store.inline_data()["annual"]
+    for region, years in inline.get("annual", {}).items():
+        for year, rec in years.items():
+            got = mine.get(region, {}).get(year, {})
+            for f, v in rec.items():
+                if got.get(f) != v:
+                    out[(region, year, f)] = (v, got.get(f))
+    return out
+
+
+def _read_inline(page):
+    with open(page, "r", encoding="utf-8") as f:
+        for line in f:
+            s = line.strip()
+            if s.startswith("const INLINE_DATA"):
+                return json.loads(s[s.index("{"):].rstrip(";"))
+    raise SystemExit(f"no INLINE_DATA line in {page}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the month-partitioned grid data store.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--seed", metavar="STORE", help="create STORE from the INLINE_DATA of --page")
+    group.add_argument("--append", nargs=4, metavar=("STORE", "REGION", "YYYY-MM", "CSV"),
+                       help="add or replace one region-month from an hourly CSV")
+    group.add_argument("--verify", metavar="STORE", help="recompute every aggregate from the partitions and compare")
+    parser.add_argument("--page", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "grid-story.html"),
+                        help="page with the INLINE_DATA line for --seed (default: src/grid-story.html)")
+    args = parser.parse_args(argv)
+
+    if args.seed:
+        if os.path.exists(os.path.join(args.seed, AGGREGATES)):
+            raise SystemExit(f"{args.seed} already holds a store")
+        inline = _read_inline(args.page)
+        t0 = time.perf_counter()
+        store = MonthStore(args.seed)
+        seed(store, inline)
+        n = sum(len(p) for p in store.agg["partitions"].values())
+        print(f"  Seeded {args.seed}: {len(store.agg['partitions'])} regions, {n} months "
+              f"in {time.perf_counter() - t0:.2f} s")
+        drift = annual_drift(store, inline)
+        worst = {}
+        for (_, _, f), (a, b) in drift.items():
+            kind = "GWh" if f.endswith("_gwh") else f
+            worst[kind] = max(worst.get(kind, 0), abs(a - b) if a is not None and b is not None else float("inf"))
+        print("  Monthly and annual records reproduce the page" if not drift else
+              f"  {len(drift)} annual values differ from the page"
+              + "".join(f"\n    {kind}: up to {v:.1f}" for kind, v in sorted(worst.items())))
+    elif args.append:
+        root, region, ym, path = args.append
+        year, month = (int(v) for v in ym.split("-"))
+        t0 = time.perf_counter()
+        store = MonthStore(root)
+        old = store.agg["partitions"].get(region, {}).get(_key(year, month))
+        s = store.put(read_csv(path, region, year, month))
+        rec = store.annual_record(region, year)
+        print(f"  {'Replaced' if old else 'Appended'} {region} {_key(year, month)}: {s['hours']} hours "
+              f"in {(time.perf_counter() - t0) * 1000:.0f} ms")
+        print(f"  {region} {year}: {rec['demand_avg_mw']} MW average, {rec['peak_demand_mw']} MW peak, "
+              f"{len(store.agg['partitions'][region])} months stored")
+    else:
+        t0 = time.perf_counter()
+        problems = MonthStore(args.verify).verify()
+        for p in problems[:20]:
+            print("  MISMATCH", p)
+        print(f"  Full recompute: {'OK' if not problems else f'{len(problems)} mismatches'} "
+              f"({time.perf_counter() - t0:.2f} s)")
+        raise SystemExit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,490 @@
+"""
+Build-time narrative fragments for the historic and hourly story
+
+The historic mode's story cards (the .gs-step cards gsInit puts into
+#narrativeColumnH) are fully determined by a region's annual records, so the
+build renders them here, once per region, with the same thresholds as the
+page's gsStoryHtml():
+
+  clean share change dC      > 3 grew  / < -3 declined / else stable (pp)
+  demand change dD           > 2 climbed / < -2 fell / else flat (%)
+  coal change coalChg        < -10 fallen / > 10 rose / else steady (%);
+                             the coal card only when either end year > 10 GWh
+  wind + solar change rChg   > 50 grew (> 500 "dramatically") / > 0 modestly
+
+The fragments ship in a #gsPrerendered block that is only displayed with
+scripting disabled; with scripting the page takes each region's cards out of
+it once and clones them on every region switch instead of building and
+parsing the template. Pages whose data is loaded on demand (--ba) have no
+block and keep using gsStoryHtml(). The block also carries each region's
+hourly headline stats as hvShowStats() writes them, so the hourly figures are
+readable without scripting too (the page itself still fills those boxes at
+run time, since the what-if control recomputes them).
+
+Number formatting follows the page exactly: to_fixed() is
+Number.prototype.toFixed (the double's exact value, ties away from zero) and
+fmt() is the page's fmt(), toLocaleString('en-US') (the shortest decimal
+representation, ties away from zero) -- the two disagree on inputs like
+1.005.
+
+Usage:
+  python narrative.py --parity                 # Python vs the page's JS (node)
+  python narrative.py --parity --page dist/index.html --trials 500
+"""
+import argparse, html, json, math, os, random, re, shutil, subprocess, tempfile
+from decimal import Decimal, ROUND_HALF_UP
+
+FUELS = ["coal", "gas", "oil", "other", "nuclear", "hydro", "geo", "wind", "solar", "storage"]
+CLEAN = ["nuclear", "hydro", "geo", "wind", "solar"]
+NAN = float("nan")
+
+# hvShowStats() element id → label of its stat box (as in the hourly acts)
+HOURLY_STATS = [
+    ("statTWh", "TWh in 2024"), ("statHours", "Hours/year"), ("statAvgGW", "GW avg load"),
+    ("statCF", "GW avg clean firm"), ("statMinRate", "Cleanest hours"), ("statMaxRate", "Dirtiest hours"),
+    ("statAvgFossil", "Avg fossil share"), ("statHighHours", "High-fossil hours"),
+]
+
+
+# ── JS number formatting ──────────────────────────────────────────────────────
+def _special(x):
+    if x != x:
+        return "NaN"
+    if math.isinf(x):
+        return "Infinity" if x > 0 else "-Infinity"
+    return None
+
+
+def js_number(x):
+    """String(x) for a JS number (integers without ".0")."""
+    x = float(x)
+    if _special(x):
+        return _special(x)
+    if x.is_integer() and abs(x) < 1e21:
+        return str(int(x))
+    return repr(x)
+
+
+def to_fixed(x, digits):
+    """Number.prototype.toFixed(digits)."""
+    x = float(x)
+    if _special(x):
+        return _special(x)
+    if x == 0:
+        x = 0.0  # (-0).toFixed() has no sign
+    return format(Decimal(x).quantize(Decimal(1).scaleb(-digits), rounding=ROUND_HALF_UP), "f")
+
+
+def to_locale(x, min_digits=0, max_digits=3):
+    """Number.prototype.toLocaleString('en-US', {minimumFractionDigits,
+    maximumFractionDigits}); the defaults are those of toLocaleString()."""
+    x = float(x)
+    if x != x:
+        return "NaN"
+    if math.isinf(x):
+        return "-∞" if x < 0 else "∞"
+    q = Decimal(repr(x)).quantize(Decimal(1).scaleb(-max_digits), rounding=ROUND_HALF_UP)
+    s = format(q, f",.{max_digits}f")
+    if max_digits > min_digits:
+        whole, _, frac = s.partition(".")
+        frac = frac.rstrip("0").ljust(min_digits, "0")
+        s = whole + ("." + frac if frac else "")
+    return s
+
+
+def fmt(v, d=0):
+    """The page's fmt(): '-' for null / NaN, else en-US with d decimals."""
+    if v is None or v != v:
+        return "-"
+    return to_locale(v, d, d)
+
+
+def js_round(x):
+    """Math.round (ties toward +Infinity)."""
+    r = math.floor(x)
+    return r + 1 if x - r >= 0.5 else r
+
+
+# ── Historic story ────────────────────────────────────────────────────────────
+def _num(rec, key):
+    """rec.key in JS arithmetic: undefined → NaN, null → 0."""
+    if key not in rec:
+        return NAN
+    return rec[key] if rec[key] is not None else 0
+
+
+def _or0(rec, key):
+    """rec.key || 0"""
+    return rec.get(key) or 0
+
+
+def _div(a, b):
+    """a / b with JS semantics for b == 0 and NaN."""
+    if a != a or b != b:
+        return NAN
+    if b == 0:
+        return NAN if a == 0 else math.copysign(math.inf, a) * math.copysign(1, b)
+    return a / b
+
+
+def clean_pct(rec):
+    """The page's cleanPct(): clean share of generation, negatives as 0."""
+    gen = {f: max(0, rec.get(f + "_gwh") or 0) for f in FUELS}
+    total = 0
+    for f in FUELS:
+        total += gen[f]
+    clean = 0
+    for f in CLEAN:
+        clean += gen[f]
+    return clean / total * 100 if total > 0 else 0
+
+
+def story_figures(annual):
+    """The figures gsStoryHtml() derives from one region's annual records."""
+    years = sorted(annual)
+    fy, ly = years[0], years[-1]
+    first, last = annual[fy], annual[ly]
+    fC, lC = clean_pct(first), clean_pct(last)
+    dD = _div(_num(last, "demand_avg_mw") - _num(first, "demand_avg_mw"), _num(first, "demand_avg_mw")) * 100
+    fCoal, lCoal = _or0(first, "coal_gwh"), _or0(last, "coal_gwh")
+    fR = _or0(first, "solar_gwh") + _or0(first, "wind_gwh")
+    lR = _or0(last, "solar_gwh") + _or0(last, "wind_gwh")
+    return {
+        "fy": fy, "ly": ly, "first": first, "last": last, "fC": fC, "lC": lC, "dC": lC - fC, "dD": dD,
+        "fCoal": fCoal, "lCoal": lCoal, "coalChg": (lCoal - fCoal) / fCoal * 100 if fCoal > 10 else 0,
+        "fR": fR, "lR": lR, "rChg": (lR - fR) / fR * 100 if fR > 0 else (999 if lR > 0 else 0),
+        "showCoal": fCoal > 10 or lCoal > 10,
+    }
+
+
+def _step(n, body, indent="    "):
+    return (f'<div class="story-step gs-step" data-step="{n}"><div class="step-inner">\n'
+            + "".join(indent + line + "\n" for line in body) + indent[:-2] + "</div></div>")
+
+
+def historic_steps(name, annual):
+    """The historic cards for one region, identical to gsStoryHtml(rk)."""
+    g = story_figures(annual)
+    fy, ly, last = g["fy"], g["ly"], g["last"]
+    fC, lC, dC, dD = g["fC"], g["lC"], g["dC"], g["dD"]
+    coalChg, rChg = g["coalChg"], g["rChg"]
+    hint = '<p style="font-size:0.88rem;color:var(--c-blue);font-weight:600;margin-top:12px;">⇆ '
+    steps = []
+
+    if dC > 3:
+        clean = (f'Clean energy grew from <span class="hl green">{to_fixed(fC, 1)}%</span> to <span class="hl green">'
+                 f'{to_fixed(lC, 1)}%</span> &mdash; a <span class="hl green">{to_fixed(dC, 1)}pp</span> increase.')
+    elif dC < -3:
+        clean = f"Clean energy declined from {to_fixed(fC, 1)}% to {to_fixed(lC, 1)}%."
+    else:
+        clean = f'Clean energy held stable near <span class="hl blue">{to_fixed(lC, 1)}%</span>.'
+    steps.append([
+        '<span class="step-badge blue">Overview</span>',
+        f"<h2>{name}'s Grid at a Glance</h2>",
+        f"<p>This donut chart shows {name}'s full generation mix &mdash; every fuel source as a share of total "
+        f'production. Watch it animate from <span class="hl blue">{fy}</span> to <span class="hl blue">{ly}</span>.</p>',
+        '<div class="stat-row">',
+        f'  <div class="stat-box"><div class="sv">{fmt(last.get("demand_avg_mw"), 0)}</div>'
+        f'<div class="sl">MW avg demand {ly}</div></div>',
+        f'  <div class="stat-box"><div class="sv">{to_fixed(lC, 1)}%</div><div class="sl">Clean share {ly}</div></div>',
+        f'  <div class="stat-box"><div class="sv">{"+" if dD >= 0 else ""}{to_fixed(dD, 1)}%</div>'
+        '<div class="sl">Demand change</div></div>',
+        "</div>",
+        f"<p>{clean}</p>",
+        hint + "Drag the year slider above the chart to compare how the generation mix shifted year by year.</p>",
+    ])
+
+    if dD > 2:
+        demand = f'Demand climbed <span class="hl orange">{to_fixed(dD, 1)}%</span> since {fy}.'
+    elif dD < -2:
+        demand = f"Demand fell {to_fixed(abs(dD), 1)}% since {fy}."
+    else:
+        demand = "Demand stayed relatively flat."
+    peak = _num(last, "peak_demand_mw")
+    if peak > 0:
+        demand += f' Peak in {ly}: <span class="hl orange">{fmt(last.get("peak_demand_mw"), 0)} MW</span>.'
+    steps.append([
+        '<span class="step-badge orange">Demand</span>',
+        "<h2>The Pulse of Demand</h2>",
+        "<p>Each bar represents one year's average hourly demand in megawatts. The <span class=\"hl orange\">orange "
+        "dots and line</span> connect each year's peak demand &mdash; the highest single hour the grid had to serve.</p>",
+        f"<p>{demand}</p>",
+    ])
+
+    if g["showCoal"]:
+        if coalChg < -10:
+            coal = f'Coal has <span class="hl red">fallen {to_fixed(abs(coalChg), 0)}%</span> since {fy}.'
+        elif coalChg > 10:
+            coal = f"Unusually, coal rose {to_fixed(coalChg, 0)}% here."
+        else:
+            coal = "Coal has held relatively steady."
+        steps.append([
+            '<span class="step-badge navy">Coal</span>',
+            "<h2>The Fading of Coal</h2>",
+            "<p>Each filled square represents a unit of coal-fired generation. The ghost squares show where coal stood "
+            f"in {fy} &mdash; revealing how much has been retired or displaced.</p>",
+            f"<p>{coal}</p>",
+            hint + "Drag the year slider above the chart to watch coal squares disappear year by year.</p>",
+        ])
+
+    if rChg > 50:
+        grew = '<span class="hl green">dramatically</span>' if rChg > 500 else \
+            f'<span class="hl green">{to_fixed(rChg, 0)}%</span>'
+        renew = f"Combined solar and wind grew {grew}."
+    elif rChg > 0:
+        renew = "Solar and wind grew modestly."
+    else:
+        renew = "Limited renewable change here."
+    steps.append([
+        '<span class="step-badge green">Renewables</span>',
+        "<h2>Solar &amp; Wind: Rapid Rise</h2>",
+        "<p>Each circle represents one year's generation: <span class=\"hl gold\">golden orbs</span> are solar (with "
+        "radiating rays) and <span class=\"hl green\">green orbs</span> are wind (with spiral traces). Larger circles "
+        "mean more GWh produced.</p>",
+        f"<p>{renew}</p>",
+    ])
+
+    steps.append([
+        '<span class="step-badge gold">Seasonality</span>',
+        "<h2>The Rhythm of the Seasons</h2>",
+        "<p>This radial chart arranges all 12 months in a circle, like a clock. Each petal shows that month's total "
+        "generation, with fuel layers stacking outward from the center &mdash; revealing how the mix shifts with the "
+        "seasons.</p>",
+        "<p>Summer peaks push the petals outward; milder months contract. Notice how the <span class=\"hl green\">green "
+        "(renewables)</span> layer grows thicker in recent years.</p>",
+        hint + "Drag the year slider above the chart to see how seasonal patterns have evolved.</p>",
+    ])
+
+    steps.append([
+        '<span class="step-badge blue">Then vs Now</span>',
+        f"<h2>{fy} vs {ly}</h2>",
+        "<p>Two donut rings side by side &mdash; the generation mix at the start and end of the period. The center "
+        "percentage shows each year's clean energy share. An arrow connects them to highlight the direction of change.</p>",
+        '<div class="stat-row">',
+        f'  <div class="stat-box"><div class="sv">{to_fixed(fC, 1)}%</div><div class="sl">Clean {fy}</div></div>',
+        f'  <div class="stat-box"><div class="sv">{to_fixed(lC, 1)}%</div><div class="sl">Clean {ly}</div></div>',
+        f'  <div class="stat-box"><div class="sv">{"+" if dC >= 0 else ""}{to_fixed(dC, 1)}</div>'
+        '<div class="sl">pp change</div></div>',
+        "</div>",
+    ])
+
+    # the coal card's lines sit two spaces deeper in the template
+    return "".join(_step(i + 1, body, "      " if body[0].endswith(">Coal</span>") else "    ")
+                   for i, body in enumerate(steps))
+
+
+# ── Hourly stats ──────────────────────────────────────────────────────────────
+def hourly_stats(S):
+    """{element id: text} as hvShowStats(S) writes them."""
+    return {
+        "statTWh": js_number(S["totalTWh"]),
+        "statHours": to_locale(S["nHours"]),
+        "statAvgGW": js_number(js_round(S["avgGen"] / 1000)),
+        "statCF": js_number(js_round(S["avgCF"] / 1000)),
+        "statMinRate": js_number(S["rateP5"]) + " kg",
+        "statMaxRate": js_number(S["rateP95"]) + " kg",
+        "statAvgFossil": js_number(S["avgFossil"]) + "%",
+        "statHighHours": to_locale(S["highFossilHours"]),
+    }
+
+
+# ── Page block ────────────────────────────────────────────────────────────────
+def prerender(inline, stats, names):
+    """The #gsPrerendered block for a page: one section per region with its
+    historic cards (.pre-steps, cloned by the page) and hourly stats.
+
+    inline is INLINE_DATA, stats {region: RDATA[region].stats}, names
+    {region: (name, desc)}. Returns "" when there is nothing to render."""
+    annual = inline.get("annual", {})
+    keys = [k for k in sorted(set(annual) | set(stats)) if k in names]
+    if not keys:
+        return ""
+    out = ['<div class="prerendered" id="gsPrerendered">\n']
+    for k in keys:
+        name, desc = names[k]
+        out.append(f'<section class="pre-region" id="pre-{k}">\n'
+                   f'<h2 class="pre-title">{html.escape(name)} ({k})</h2>\n'
+                   f'<p class="pre-sub">{html.escape(desc)}</p>\n')
+        if annual.get(k):
+            out.append(f'<div class="pre-steps" data-region="{k}">{historic_steps(name, annual[k])}</div>\n')
+        if stats.get(k):
+            values = hourly_stats(stats[k])
+            out.append('<div class="stat-row pre-hourly">'
+                       + "".join(f'<div class="stat-box"><div class="sv">{values[i]}</div><div class="sl">{label}</div></div>'
+                                 for i, label in HOURLY_STATS)
+                       + "</div>\n")
+        out.append("</section>\n")
+    out.append("</div>\n")
+    return "".join(out)
+
+
+# ── Parity check against the page's JS ────────────────────────────────────────
+NODE_RUNNER = """
+const fs = require('fs');
+const job = JSON.parse(fs.readFileSync(process.argv[2], 'utf8'));
+const shown = {};
+const document = { getElementById: id => ({ set textContent(v) { shown[id] = String(v); } }) };
+let GS_DATA;
+const out = eval(job.js + `;({
+  story: job.story.map(([name, annual]) => {
+    GS_DATA = { annual: { R: annual } };
+    REGIONS.R = { name, desc: '' };
+    return gsStoryHtml('R');
+  }),
+  stats: job.stats.map(S => { hvShowStats(S); return Object.assign({}, shown); }),
+  fmt: job.numbers.map(([v, d]) => [fmt(v, d), Number(v).toFixed(d), v.toLocaleString()]),
+})`);
+process.stdout.write(JSON.stringify(out));
+"""
+
+
+def _js_function(source, name):
+    """The source of `function name(...) {...}` in a JS string (brace-matched)."""
+    start = source.index(f"function {name}(")
+    depth, i = 0, source.index("{", start)
+    while True:
+        c = source[i]
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                return source[start:i + 1]
+        i += 1
+
+
+def page_js():
+    """The page's formatting helpers, gsStoryHtml() and hvShowStats()."""
+    import build_explorer
+    helpers = "\n".join(line for line in build_explorer.APP_JS.splitlines()
+                        if re.match(r"const (FUELS|CLEAN|fmt|gv|totalGen|cleanPct) ", line))
+    return ("const REGIONS = {};\n" + helpers + "\n" + _js_function(build_explorer.APP_JS, "gsStoryHtml") + "\n"
+            + _js_function(build_explorer.HOURLY_STORY_JS, "hvShowStats") + "\n")
+
+
+def random_annual(rng):
+    """Annual records that reach every branch and rounding tie of the template."""
+    def value(scale):
+        r = rng.random()
+        if r < 0.1:
+            return 0
+        if r < 0.2:
+            return rng.choice([10, 10.5, 0.125, 2.5, 1.005, 1.015, 12.345, 1e-7, -3.5])
+        if r < 0.3:
+            return rng.randrange(0, 4) * scale / 4  # ties in the percentages
+        return round(rng.uniform(0, scale), rng.choice([0, 1, 2, 3]))
+
+    if rng.random() < 0.3:  # first / last year exactly on the thresholds
+        base = rng.choice([100, 200, 1000, 50000])
+        first = {"demand_avg_mw": base, "coal_gwh": base, "solar_gwh": base / 2, "wind_gwh": base / 2,
+                 "gas_gwh": base, "nuclear_gwh": base, "peak_demand_mw": rng.choice([0, base * 2])}
+        last = {"demand_avg_mw": base * (100 + rng.choice([2, -2, 0])) / 100,
+                "coal_gwh": base * (100 + rng.choice([10, -10, 0])) / 100,
+                "solar_gwh": base * (100 + rng.choice([50, 500, 0])) / 100, "wind_gwh": 0,
+                "gas_gwh": base, "nuclear_gwh": base * rng.choice([1, 1.06, 0.94]), "peak_demand_mw": base * 2}
+        if rng.random() < 0.3:  # clean share 50% -> 47 / 53%
+            d = rng.choice([3, -3])
+            first.update({f + "_gwh": 0 for f in FUELS}, nuclear_gwh=50, coal_gwh=50)
+            last.update({f + "_gwh": 0 for f in FUELS}, nuclear_gwh=50 + d, coal_gwh=50 - d)
+        return {"2019": first, "2025": last}
+    out = {}
+    for y in range(2019, 2019 + rng.randint(1, 7)):
+        rec = {f + "_gwh": value(rng.choice([5, 50, 5000, 100000])) for f in FUELS if rng.random() > 0.15}
+        if rng.random() > 0.05:
+            rec["demand_avg_mw"] = value(rng.choice([100, 30000]))
+        if rng.random() > 0.2:
+            rec["peak_demand_mw"] = value(rng.choice([100, 60000]))
+        out[str(y)] = rec
+    return out
+
+
+def random_stats(rng):
+    return {"totalTWh": rng.choice([231, 231.5, 0.05, round(rng.uniform(0, 500), 1)]),
+            "nHours": rng.choice([8760, 8784, 999, 1000, 123456]),
+            "avgGen": rng.choice([1500, 2500, 500.0, rng.uniform(0, 90000)]),
+            "avgCF": rng.choice([499.99, 1500, rng.uniform(0, 30000)]),
+            "rateP5": rng.randrange(0, 900), "rateP95": rng.randrange(0, 1200),
+            "avgFossil": rng.choice([40, 40.5, round(rng.uniform(0, 100), 1)]),
+            "highFossilHours": rng.choice([0, 999, 1200, rng.randrange(0, 8784)])}
+
+
+def parity(inline, rdata_stats, names, trials=200, seed=0):
+    """Render the same regions (plus random ones) in Python and in node.
+    Returns a list of mismatch descriptions."""
+    node = shutil.which("node")
+    if not node:
+        raise SystemExit("node is needed for the parity check")
+    rng = random.Random(seed)
+    story = [(names.get(k, (k, ""))[0], annual) for k, annual in sorted(inline.get("annual", {}).items())]
+    story += [(f"Region {i}", random_annual(rng)) for i in range(trials)]
+    stats = [S for _, S in sorted(rdata_stats.items())] + [random_stats(rng) for _ in range(trials)]
+    numbers = [[v, d] for v in (0, -0.0, 0.5, 1.5, 2.5, -2.5, 1.005, 1.015, 0.125, -0.04, 1234.5, 99999.95,
+                                1e-7, 123456789.125) for d in (0, 1, 2)]
+    numbers += [[rng.choice([-1, 1]) * rng.randrange(0, 10 ** 6) / 10 ** rng.randrange(0, 5), rng.randrange(0, 3)]
+                for _ in range(trials)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        job = os.path.join(tmp, "job.json")
+        with open(job, "w", encoding="utf-8") as f:
+            json.dump({"js": page_js(), "story": story, "stats": stats, "numbers": numbers}, f)
+        script = os.path.join(tmp, "run.js")
+        with open(script, "w", encoding="utf-8") as f:
+            f.write(NODE_RUNNER)
+        proc = subprocess.run([node, script, job], capture_output=True, text=True)
+    if proc.returncode:
+        raise SystemExit(f"node failed:\n{proc.stderr}")
+    js = json.loads(proc.stdout)
+
+    problems = []
+    for (name, annual), got in zip(story, js["story"]):
+        want = historic_steps(name, annual)
+        if want != got:
+            i = next((i for i, (a, b) in enumerate(zip(want, got)) if a != b), min(len(want), len(got)))
+            problems.append(f"story {name} {json.dumps(annual)[:200]}: ...{got[max(0, i - 60):i + 40]!r} "
+                            f"!= ...{want[max(0, i - 60):i + 40]!r}")
+    for S, got in zip(stats, js["stats"]):
+        want = hourly_stats(S)
+        for key, value in want.items():
+            if got.get(key) != value:
+                problems.append(f"stats {S}: {key} {got.get(key)!r} != {value!r}")
+    for (v, d), (got_fmt, got_fixed, got_locale) in zip(numbers, js["fmt"]):
+        for what, want, got in (("fmt", fmt(v, d), got_fmt), ("toFixed", to_fixed(v, d), got_fixed),
+                                ("toLocaleString", to_locale(v), got_locale)):
+            if want != got:
+                problems.append(f"{what}({v!r}, {d}): {got!r} != {want!r}")
+    return problems
+
+
+def main(argv=None):
+    import build_explorer
+
+    parser = argparse.ArgumentParser(description="Check the pre-rendered narrative against the page's JS templates.")
+    parser.add_argument("--parity", action="store_true", required=True)
+    parser.add_argument("--page", default=os.path.join(build_explorer.BASE, "index.html"),
+                        help="built page with the INLINE_DATA / RDATA lines (default: index.html)")
+    parser.add_argument("--trials", type=int, default=200, help="random regions / stats / numbers (default: 200)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    inline, stats = {}, {}
+    with open(args.page, "r", encoding="utf-8") as f:
+        for line in f:
+            s = line.strip()
+            if s.startswith("const INLINE_DATA"):
+                inline = build_explorer.parse_data_line(s)[1]
+            elif s.startswith("const RDATA"):
+                stats = {k: d.get("stats") for k, d in build_explorer.iter_data_line(s) if d.get("stats")}
+    if not inline and not stats:
+        raise SystemExit(f"no INLINE_DATA / RDATA lines in {args.page}")
+
+    problems = parity(inline, stats, build_explorer.REGIONS, args.trials, args.seed)
+    for p in problems[:20]:
+        print("  MISMATCH", p)
+    n = len(inline.get("annual", {})) + len(stats)
+    print(f"  Python vs JS: {n} page regions + {args.trials} random regions / stats / numbers, "
+          f"{'OK' if not problems else f'{len(problems)} mismatches'}")
+    raise SystemExit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Parquet export of the explorer's datasets for downstream dashboards
+
+`python build_explorer.py --export-parquet DIR` writes every figure the page
+renders as hive-partitioned Parquet, DIR/<dataset>/region=<k>/year=<y>/
+part-0.parquet:
+
+  annual_mix      fuel, gwh                         (INLINE_DATA.annual)
+  annual_demand   demand_avg_mw, peak_demand_mw     (INLINE_DATA.annual)
+  monthly_mix     month, fuel, gwh                  (INLINE_DATA.monthly)
+  monthly_demand  month, demand_avg_mw              (INLINE_DATA.monthly)
+  hourly_gen      hour, fuel, mw                    (RDATA.gen)
+  hourly          hour, load_mw, rate_kg_per_mwh    (RDATA.load / .rate)
+  hourly_stats    the RDATA.stats fields            (one row per region)
+
+Schemas are fixed below (SCHEMAS); region (partition key) and fuel are
+dictionary-encoded, hour is the hour-start timestamp counted from 00:00 on
+1 January of RDATA[k].year. Rows are grouped by fuel, in time order, and
+written with column statistics, one row group per fuel in hourly_gen, so
+filters on fuel or hour skip row groups (and region / year whole files). hourly_stats is partitioned by the
+first year of the hourly series.
+
+The export streams RDATA region by region (build_explorer.iter_data_line),
+so memory stays at one region's hourly data plus the open writer. verify()
+reads every partition back and compares it value by value with the JSON
+embedded in the page.
+"""
+import argparse, datetime, os
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+import build_explorer
+
+DICT = pa.dictionary(pa.int8(), pa.string())
+PARTITIONING = pa.schema([("region", pa.dictionary(pa.int32(), pa.string())), ("year", pa.int16())])
+SCHEMAS = {
+    "annual_mix": pa.schema([("fuel", DICT), ("gwh", pa.float64())]),
+    "annual_demand": pa.schema([("demand_avg_mw", pa.float64()), ("peak_demand_mw", pa.float64())]),
+    "monthly_mix": pa.schema([("month", pa.int8()), ("fuel", DICT), ("gwh", pa.float64())]),
+    "monthly_demand": pa.schema([("month", pa.int8()), ("demand_avg_mw", pa.float64())]),
+    "hourly_gen": pa.schema([("hour", pa.timestamp("ms")), ("fuel", DICT), ("mw", pa.float64())]),
+    "hourly": pa.schema([("hour", pa.timestamp("ms")), ("load_mw", pa.float64()), ("rate_kg_per_mwh", pa.float64())]),
+    "hourly_stats": pa.schema([
+        ("total_twh", pa.float64()), ("n_hours", pa.int32()), ("avg_gen_mw", pa.float64()),
+        ("avg_cf_mw", pa.float64()), ("rate_p5", pa.float64()), ("rate_p95", pa.float64()),
+        ("avg_fossil_pct", pa.float64()), ("high_fossil_hours", pa.int32()),
+    ]),
+}
+STATS_FIELDS = {
+    "total_twh": "totalTWh", "n_hours": "nHours", "avg_gen_mw": "avgGen", "avg_cf_mw": "avgCF",
+    "rate_p5": "rateP5", "rate_p95": "rateP95", "avg_fossil_pct": "avgFossil", "high_fossil_hours": "highFossilHours",
+}
+FUEL_SUFFIX = "_gwh"
+
+
+def _write(root, dataset, region, year, columns, row_group_size=None):
+    schema = SCHEMAS[dataset]
+    arrays = []
+    for field in schema:
+        values = columns[field.name]
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, pa.string()).dictionary_encode().cast(field.type))
+        else:
+            arrays.append(pa.array(values, field.type))
+    table = pa.Table.from_arrays(arrays, schema=schema)
+    part = os.path.join(root, dataset, f"region={region}", f"year={year}")
+    os.makedirs(part, exist_ok=True)
+    pq.write_table(table, os.path.join(part, "part-0.parquet"), write_statistics=True,
+                   row_group_size=row_group_size or max(1, table.num_rows), compression="zstd")
+    return table.num_rows
+
+
+def _hours(start_year, n):
+    t0 = datetime.datetime(start_year, 1, 1)
+    return [t0 + datetime.timedelta(hours=h) for h in range(n)]
+
+
+def _mix_rows(records, fuels):
+    fuel, gwh = [], []
+    for f in fuels:
+        fuel += [f[:-len(FUEL_SUFFIX)]] * len(records)
+        gwh += [rec.get(f) for rec in records]
+    return fuel, gwh
+
+
+def export_historic(inline, root):
+    """annual_* / monthly_* datasets from INLINE_DATA; returns row counts."""
+    rows = {}
+    for rk, by_year in inline.get("annual", {}).items():
+        for y, rec in by_year.items():
+            fuels = [f for f in rec if f.endswith(FUEL_SUFFIX)]
+            fuel, gwh = _mix_rows([rec], fuels)
+            rows["annual_mix"] = rows.get("annual_mix", 0) + _write(root, "annual_mix", rk, y, {"fuel": fuel, "gwh": gwh})
+            rows["annual_demand"] = rows.get("annual_demand", 0) + _write(
+                root, "annual_demand", rk, y,
+                {"demand_avg_mw": [rec.get("demand_avg_mw")], "peak_demand_mw": [rec.get("peak_demand_mw")]})
+    for rk, by_year in inline.get("monthly", {}).items():
+        for y, months in by_year.items():
+            keys = sorted(months, key=int)
+            recs = [months[m] for m in keys]
+            fuels = [f for f in recs[0] if f.endswith(FUEL_SUFFIX)] if recs else []
+            fuel, gwh = _mix_rows(recs, fuels)
+            rows["monthly_mix"] = rows.get("monthly_mix", 0) + _write(
+                root, "monthly_mix", rk, y, {"month": [int(m) for m in keys] * len(fuels), "fuel": fuel, "gwh": gwh})
+            rows["monthly_demand"] = rows.get("monthly_demand", 0) + _write(
+                root, "monthly_demand", rk, y,
+                {"month": [int(m) for m in keys], "demand_avg_mw": [r.get("demand_avg_mw") for r in recs]})
+    return rows
+
+
+def export_hourly_region(rk, d, root):
+    """hourly_gen / hourly / hourly_stats partitions for one RDATA entry."""
+    rows = {}
+    start = int(d.get("year", 2024))
+    hours = _hours(start, len(d["load"]))
+    bounds = []  # (year, first index, end index)
+    for i, h in enumerate(hours):
+        if not bounds or bounds[-1][0] != h.year:
+            bounds.append([h.year, i, i])
+        bounds[-1][2] = i + 1
+    for y, a, b in bounds:
+        n = b - a
+        fuel, mw = [], []
+        for f, series in d["gen"].items():
+            fuel += [f] * n
+            mw += series[a:b]
+        rows["hourly_gen"] = rows.get("hourly_gen", 0) + _write(
+            root, "hourly_gen", rk, y, {"hour": hours[a:b] * len(d["gen"]), "fuel": fuel, "mw": mw}, row_group_size=n)
+        rows["hourly"] = rows.get("hourly", 0) + _write(
+            root, "hourly", rk, y, {"hour": hours[a:b], "load_mw": d["load"][a:b], "rate_kg_per_mwh": d["rate"][a:b]})
+    stats = d.get("stats", {})
+    rows["hourly_stats"] = _write(root, "hourly_stats", rk, start,
+                                  {f: [stats.get(src)] for f, src in STATS_FIELDS.items()})
+    return rows
+
+
+def export(gs_data_line, gv_data_line, root):
+    """Write every dataset under root; returns {dataset: rows}."""
+    rows = export_historic(build_explorer.parse_data_line(gs_data_line)[1], root)
+    for rk, d in build_explorer.iter_data_line(gv_data_line):
+        for name, n in export_hourly_region(rk, d, root).items():
+            rows[name] = rows.get(name, 0) + n
+    return rows
+
+
+# ── Reading back ──────────────────────────────────────────────────────────────
+def dataset(root, name):
+    """pyarrow dataset with the region / year partition columns restored."""
+    return ds.dataset(os.path.join(root, name), format="parquet",
+                      partitioning=ds.HivePartitioning.discover(schema=PARTITIONING))
+
+
+def verify(gs_data_line, gv_data_line, root):
+    """Round trip: every value in the page's JSON must come back unchanged.
+    Returns a list of mismatch descriptions (empty when all match)."""
+    problems = []
+
+    def check(label, got, want):
+        if got == want:
+            return
+        if isinstance(got, list) and isinstance(want, list):
+            if len(got) != len(want):
+                problems.append(f"{label}: {len(got)} values != {len(want)}")
+                return
+            i = next(i for i, (a, b) in enumerate(zip(got, want)) if a != b)
+            problems.append(f"{label}[{i}]: {got[i]!r} != {want[i]!r}")
+        else:
+            problems.append(f"{label}: {got!r} != {want!r}")
+
+    inline = build_explorer.parse_data_line(gs_data_line)[1]
+    for section, mix, demand, demand_fields in (
+            ("annual", "annual_mix", "annual_demand", ["demand_avg_mw", "peak_demand_mw"]),
+            ("monthly", "monthly_mix", "monthly_demand", ["demand_avg_mw"])):
+        mix_rows, demand_rows = {}, {}
+        for r in dataset(root, mix).to_table().to_pylist():
+            mix_rows[(r["region"], str(r["year"]), str(r.get("month", "")), r["fuel"] + FUEL_SUFFIX)] = r["gwh"]
+        for r in dataset(root, demand).to_table().to_pylist():
+            for f in demand_fields:
+                demand_rows[(r["region"], str(r["year"]), str(r.get("month", "")), f)] = r[f]
+        for rk, by_year in inline.get(section, {}).items():
+            for y, node in by_year.items():
+                recs = {"": node} if section == "annual" else node
+                for m, rec in recs.items():
+                    for f, v in rec.items():
+                        got = (mix_rows if f.endswith(FUEL_SUFFIX) else demand_rows).get((rk, y, m, f))
+                        check(f"{section} {rk} {y}{' ' + m if m else ''} {f}", got, v)
+                        if len(problems) > 20:
+                            return problems
+
+    gen_ds, hourly_ds, stats_ds = dataset(root, "hourly_gen"), dataset(root, "hourly"), dataset(root, "hourly_stats")
+    for rk, d in build_explorer.iter_data_line(gv_data_line):
+        region = ds.field("region") == rk
+        t = hourly_ds.to_table(filter=region).sort_by("hour")
+        check(f"hourly {rk} load", t.column("load_mw").to_pylist(), [float(v) for v in d["load"]])
+        check(f"hourly {rk} rate", t.column("rate_kg_per_mwh").to_pylist(), [float(v) for v in d["rate"]])
+        check(f"hourly {rk} start", t.column("hour")[0].as_py(), datetime.datetime(int(d.get("year", 2024)), 1, 1))
+        for f, series in d["gen"].items():
+            g = gen_ds.to_table(filter=region & (ds.field("fuel") == f)).sort_by("hour")
+            check(f"hourly_gen {rk} {f}", g.column("mw").to_pylist(), [float(v) for v in series])
+        s = stats_ds.to_table(filter=region).to_pylist()
+        want = d.get("stats", {})
+        check(f"hourly_stats {rk}", {f: s[0][f] for f in STATS_FIELDS} if s else None,
+              {f: want.get(src) for f, src in STATS_FIELDS.items()})
+        if len(problems) > 20:
+            break
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Round-trip check of a Parquet export against the page JSON.")
+    parser.add_argument("--verify", metavar="DIR", required=True, help="export written by build_explorer.py --export-parquet")
+    parser.add_argument("--page", default=os.path.join(build_explorer.BASE, "index.html"),
+                        help="built page (or source page) with the INLINE_DATA / RDATA lines (default: index.html)")
+    args = parser.parse_args(argv)
+    gs_line = gv_line = ""
+    with open(args.page, "r", encoding="utf-8") as f:
+        for line in f:
+            s = line.strip()
+            if s.startswith("const INLINE_DATA"):
+                gs_line = s
+            elif s.startswith("const RDATA"):
+                gv_line = s
+    problems = verify(gs_line, gv_line, args.verify)
+    for p in problems:
+        print("  MISMATCH", p)
+    print(f"  Round trip: {'OK' if not problems else f'{len(problems)} mismatches'}")
+    raise SystemExit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
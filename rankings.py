@@ -0,0 +1,90 @@
+"""
+Cross-region ranking index for the comparison view
+
+The page's Compare mode ranks every region by one metric for one year. The
+build does the ranking once per (metric, year) and embeds the result as
+RANK_INDEX, so switching metric or year only reads a pre-sorted list:
+
+  {"regions": ["CAL", ...],                       # region key by position
+   "metrics": [{"key", "label", "unit", "digits", "order", "years": [...]}, ...],
+   "rank": {metric: {year: [[region position, ...],   # best first
+                            [value, ...]]}}}          # same order
+
+Metrics use the same definitions as the historic views (gv(), totalGen(),
+cleanPct() in the Grid Story page: negative generation counts as 0):
+
+  clean          clean share (nuclear, hydro, geo, wind, solar), % of generation
+  coal_change    coal share change since the first year, percentage points
+  peak           peak demand, GW
+  rate_p95       95th-percentile hourly emission rate (RDATA stats), kg/MWh;
+                 only for the year the hourly data starts in
+  renew_growth   wind + solar share change since the first year, points
+
+Ties are broken by region key so the index is stable between builds.
+"""
+FUELS = ["coal", "gas", "oil", "other", "nuclear", "hydro", "geo", "wind", "solar", "storage"]
+CLEAN = ["nuclear", "hydro", "geo", "wind", "solar"]
+WIND_SOLAR = ["wind", "solar"]
+
+# key, label, unit, digits, best first ("desc" = highest first)
+METRICS = [
+    ("clean", "Clean share", "%", 1, "desc"),
+    ("coal_change", "Coal share change since {first}", "pts", 1, "asc"),
+    ("peak", "Peak demand", "GW", 1, "desc"),
+    ("rate_p95", "Emission rate, 95th percentile hour", "kg/MWh", 0, "asc"),
+    ("renew_growth", "Wind + solar growth since {first}", "pts", 1, "desc"),
+]
+
+
+def share(rec, fuels):
+    """Share of generation (%) from fuels in one annual record."""
+    gen = {f: max(0.0, rec.get(f + "_gwh") or 0.0) for f in FUELS}
+    total = sum(gen.values())
+    return sum(gen[f] for f in fuels) / total * 100 if total > 0 else 0.0
+
+
+def metric_values(inline, rdata):
+    """{metric: {year: {region: value}}} from INLINE_DATA / RDATA dicts."""
+    out = {key: {} for key, *_ in METRICS}
+    for rk, by_year in inline.get("annual", {}).items():
+        years = sorted(by_year)
+        if not years:
+            continue
+        first = by_year[years[0]]
+        for y in years:
+            rec = by_year[y]
+            out["clean"].setdefault(y, {})[rk] = share(rec, CLEAN)
+            out["coal_change"].setdefault(y, {})[rk] = share(rec, ["coal"]) - share(first, ["coal"])
+            out["renew_growth"].setdefault(y, {})[rk] = share(rec, WIND_SOLAR) - share(first, WIND_SOLAR)
+            if rec.get("peak_demand_mw") is not None:
+                out["peak"].setdefault(y, {})[rk] = rec["peak_demand_mw"] / 1000
+    for rk, d in rdata.items():
+        p95 = d.get("stats", {}).get("rateP95")
+        if p95 is not None:
+            out["rate_p95"].setdefault(str(d.get("year", 2024)), {})[rk] = p95
+    return out
+
+
+def build_index(inline, rdata):
+    """RANK_INDEX for a page, or None when it carries fewer than two regions."""
+    regions = sorted(set(inline.get("annual", {})) | set(rdata))
+    if len(regions) < 2:
+        return None
+    pos = {rk: i for i, rk in enumerate(regions)}
+    values = metric_values(inline, rdata)
+    all_years = sorted({y for by_year in values.values() for y in by_year})
+    metrics, rank = [], {}
+    for key, label, unit, digits, order in METRICS:
+        by_year = values[key]
+        years = sorted(y for y in by_year if len(by_year[y]) > 1)
+        if not years:
+            continue
+        metrics.append({"key": key, "label": label.format(first=all_years[0]), "unit": unit,
+                        "digits": digits, "order": order, "years": [int(y) for y in years]})
+        rank[key] = {}
+        for y in years:
+            sign = -1 if order == "desc" else 1
+            ranked = sorted(by_year[y].items(), key=lambda kv: (sign * round(kv[1], digits), kv[0]))
+            rank[key][y] = [[pos[rk] for rk, _ in ranked],
+                            [round(v, digits) if digits else round(v) for _, v in ranked]]
+    return {"regions": regions, "metrics": metrics, "rank": rank}
@@ -0,0 +1,287 @@
+"""
+Mergeable quantile sketches for hourly emission rates
+
+RDATA[k].stats only carries whole-year rateP5 / rateP95, computed by an exact
+sort of one year of hourly rates. RateSketches keeps one small log-bucket
+histogram per (year, region, month, hour-of-day) cell instead, so the same
+percentiles for any month, season, hour of day, span of years or group of
+regions come from summing cells: no pass over the hourly data, and merging is
+an add of counts.
+
+Cells are stored sparsely (only non-empty buckets), so memory follows the
+hours added rather than cells x buckets. Measured on the 13-region test page:
+0.5 MB (a dense int32 tensor was 12.8 MB), 0.1-0.3 ms per P5/P95 rollup up to
+all regions and months. For 65 regions x 7 years: 18 MB, 0.2-0.8 ms for one
+region's slices and 18 ms for an all-region, all-year rollup, since a rollup
+costs time in proportion to the entries it sums.
+
+Sketch and error bound
+  Values are bucketed on a logarithmic grid with ratio
+  gamma = (1 + alpha) / (1 - alpha) (relative-accuracy / "DDSketch" layout);
+  bucket i covers (gamma^(i-1), gamma^i] and is represented by
+  2 * gamma^i / (gamma + 1). For any q, quantile(q) is within a factor
+  alpha of the exact lower quantile (np.quantile(..., method="lower")):
+
+      |estimate - exact| <= alpha * exact        for exact >= min_rate
+      |estimate - exact| <  min_rate             otherwise (zero bucket)
+
+  The bound is deterministic and survives any number of merges, because
+  merging only adds counts. Defaults: alpha = 0.5 %, min_rate = 1 kg/MWh,
+  max_rate = 5000 kg/MWh (values above are clamped into the top bucket).
+
+Hourly layout
+  RDATA[k] carries hourly arrays starting at 00:00 on 1 January of
+  RDATA[k].year ("rate" in kg CO2/MWh); multi-year arrays simply continue
+  past 31 December.
+
+Usage:
+  python rate_sketch.py --verify          # check the bound against NumPy
+  python build_explorer.py --sketches rate_sketches.npz
+"""
+import argparse, json, math, time
+
+import numpy as np
+
+SEASONS = {
+    "winter": (12, 1, 2),
+    "spring": (3, 4, 5),
+    "summer": (6, 7, 8),
+    "fall": (9, 10, 11),
+}
+
+
+def hour_calendar(year, n_hours):
+    """(year, month, hour-of-day) arrays for n_hours starting 1 Jan `year`."""
+    start = np.datetime64(f"{year}-01-01T00", "h")
+    stamps = start + np.arange(n_hours, dtype="timedelta64[h]")
+    years = stamps.astype("datetime64[Y]").astype(int) + 1970
+    months = stamps.astype("datetime64[M]").astype(int) % 12 + 1
+    hours = (stamps - stamps.astype("datetime64[D]")).astype(int)
+    return years, months, hours
+
+
+class RateSketches:
+    """Sparse (year, region, month, hour-of-day) cells of bucket counts.
+
+    Only non-empty buckets are stored. Cell c (the flat index into shape)
+    owns bins[offsets[c]:offsets[c + 1]] (bucket numbers, ascending) and the
+    matching counts. A cell holds at most 31 hours, so there are never more
+    entries than hours added.
+    """
+
+    def __init__(self, regions, years, alpha=0.005, min_rate=1.0, max_rate=5000.0):
+        self.regions = list(regions)
+        self.years = [int(y) for y in years]
+        self.alpha, self.min_rate, self.max_rate = alpha, min_rate, max_rate
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        # Bucket 0 holds everything below min_rate; 1.. the log grid
+        self._offset = math.ceil(math.log(min_rate) / self._log_gamma) - 1
+        self.n_buckets = self._bucket_of(max_rate) + 1
+        self.shape = (len(self.years), len(self.regions), 12, 24)
+        self.offsets = np.zeros(math.prod(self.shape) + 1, dtype=np.int64)
+        self.bins = np.zeros(0, dtype=np.int16)
+        self.counts = np.zeros(0, dtype=np.int32)
+        idx = np.arange(self.n_buckets) + self._offset
+        self._values = 2 * self.gamma ** idx / (self.gamma + 1)
+        self._values[0] = 0.0
+
+    def _bucket_of(self, x):
+        return math.ceil(math.log(x) / self._log_gamma) - self._offset
+
+    def buckets(self, rates):
+        rates = np.clip(np.asarray(rates, dtype=np.float64), 0, self.max_rate)
+        out = np.zeros(rates.shape, dtype=np.int64)
+        pos = rates >= self.min_rate
+        out[pos] = np.ceil(np.log(rates[pos]) / self._log_gamma).astype(np.int64) - self._offset
+        return out
+
+    # ── building ──
+    def add(self, region, start_year, rates):
+        """Add an hourly rate series for one region starting 1 Jan start_year."""
+        cells, bins = self._entries(region, start_year, rates)
+        self._accumulate([(cells, bins, np.ones(len(cells), dtype=np.int32))])
+
+    def _entries(self, region, start_year, rates):
+        """(flat cell, bucket) per hour of a region's series."""
+        rates = np.asarray(rates, dtype=np.float64)
+        years, months, hours = hour_calendar(start_year, len(rates))
+        yi = np.searchsorted(self.years, years)
+        if (yi >= len(self.years)).any() or (np.asarray(self.years)[np.minimum(yi, len(self.years) - 1)] != years).any():
+            raise ValueError(f"{region}: hourly data spans years outside {self.years}")
+        cells = np.ravel_multi_index((yi, self.regions.index(region), months - 1, hours), self.shape)
+        return cells, self.buckets(rates)
+
+    def _cells(self):
+        """Flat cell index of every stored entry."""
+        return np.repeat(np.arange(len(self.offsets) - 1), np.diff(self.offsets))
+
+    def _accumulate(self, batches):
+        """Fold (cells, bins, counts) batches into the stored entries."""
+        batches = [(self._cells(), self.bins, self.counts)] + list(batches)
+        keys = np.concatenate([np.asarray(c, dtype=np.int64) * self.n_buckets + b for c, b, _ in batches])
+        keys, inverse = np.unique(keys, return_inverse=True)
+        self.counts = np.bincount(inverse, weights=np.concatenate([n for _, _, n in batches]),
+                                  minlength=len(keys)).astype(np.int32)
+        self.bins = (keys % self.n_buckets).astype(np.int16)
+        per_cell = np.bincount(keys // self.n_buckets, minlength=len(self.offsets) - 1)
+        self.offsets = np.concatenate([[0], np.cumsum(per_cell)])
+
+    @classmethod
+    def from_rdata(cls, rdata, **kw):
+        spans = {}
+        for k, d in rdata.items():
+            y0 = int(d.get("year", 2024))
+            ys = hour_calendar(y0, len(d["rate"]))[0]
+            spans[k] = (y0, int(ys[0]), int(ys[-1]))
+        years = range(min(s[1] for s in spans.values()), max(s[2] for s in spans.values()) + 1)
+        sk = cls(list(rdata), years, **kw)
+        batches = []
+        for k, d in rdata.items():
+            cells, bins = sk._entries(k, spans[k][0], d["rate"])
+            batches.append((cells, bins, np.ones(len(cells), dtype=np.int32)))
+        sk._accumulate(batches)  # one sort for every region
+        return sk
+
+    def merge(self, other):
+        """Add another sketch set with the same layout (e.g. a new month or a
+        batch of balancing authorities built elsewhere)."""
+        if (other.regions, other.years, other.alpha, other.min_rate, other.max_rate) != \
+                (self.regions, self.years, self.alpha, self.min_rate, self.max_rate):
+            raise ValueError("sketch layouts differ")
+        self._accumulate([(other._cells(), other.bins, other.counts)])
+        return self
+
+    # ── queries ──
+    def rollup(self, regions=None, years=None, months=None, hours=None, season=None):
+        """Merged bucket counts for a slice; None means "all"."""
+        if season is not None:
+            months = SEASONS[season]
+        sel = [
+            range(len(self.years)) if years is None else [self.years.index(int(y)) for y in years],
+            range(len(self.regions)) if regions is None else [self.regions.index(r) for r in regions],
+            range(12) if months is None else [m - 1 for m in months],
+            range(24) if hours is None else list(hours),
+        ]
+        cells = np.ravel_multi_index(np.ix_(*sel), self.shape).ravel()
+        if len(cells) == len(self.offsets) - 1:
+            bins, counts = self.bins, self.counts
+        else:
+            # gather only the selected cells' runs of entries
+            starts, lens = self.offsets[cells], np.diff(self.offsets)[cells]
+            idx = np.repeat(starts - np.cumsum(lens) + lens, lens) + np.arange(lens.sum())
+            bins, counts = self.bins[idx], self.counts[idx]
+        return np.bincount(bins, weights=counts, minlength=self.n_buckets).astype(np.int64)
+
+    def quantiles(self, qs, **selection):
+        """Estimated quantiles (0..1) of the rates in a slice."""
+        counts = self.rollup(**selection)
+        n = int(counts.sum())
+        if n == 0:
+            return [float("nan") for _ in qs]
+        cum = np.cumsum(counts)
+        # rank of the "lower" quantile: floor(q * (n - 1)), 0-based
+        ranks = np.floor(np.asarray(qs, dtype=np.float64) * (n - 1)).astype(np.int64)
+        return [float(v) for v in self._values[np.searchsorted(cum, ranks, side="right")]]
+
+    def quantile(self, q, **selection):
+        return self.quantiles([q], **selection)[0]
+
+    # ── persistence ──
+    def save(self, path):
+        meta = {"regions": self.regions, "years": self.years, "alpha": self.alpha,
+                "min_rate": self.min_rate, "max_rate": self.max_rate}
+        with open(path, "wb") as f:  # a file object keeps np from appending ".npz"
+            np.savez_compressed(f, offsets=self.offsets, bins=self.bins, counts=self.counts,
+                                meta=np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as z:
+            meta = json.loads(z["meta"].tobytes().decode())
+            sk = cls(meta["regions"], meta["years"], meta["alpha"], meta["min_rate"], meta["max_rate"])
+            sk.offsets, sk.bins, sk.counts = z["offsets"], z["bins"], z["counts"]
+        return sk
+
+
+# ── Verification against exact NumPy percentiles ──────────────────────────────
+def verify(rdata, sketches=None, qs=(0.05, 0.25, 0.5, 0.75, 0.95)):
+    """Check every per-region month / season / hour-of-day / whole-span
+    rollup, plus all-region merges, against np.quantile(method="lower").
+    Returns (number of checks, worst relative error, failures)."""
+    sk = sketches or RateSketches.from_rdata(rdata)
+    cal = {}
+    for k, d in rdata.items():
+        rates = np.asarray(d["rate"], dtype=np.float64)
+        cal[k] = (rates,) + hour_calendar(int(d.get("year", 2024)), len(rates))
+
+    def exact(regions, mask_fn):
+        vals = np.concatenate([c[0][mask_fn(*c[1:])] for r, c in cal.items() if r in regions])
+        return vals
+
+    slices = []
+    for k in rdata:
+        slices.append(([k], {}, lambda y, m, h: np.ones_like(m, dtype=bool)))
+        for mo in range(1, 13):
+            slices.append(([k], {"months": [mo]}, lambda y, m, h, mo=mo: m == mo))
+        for name, ms in SEASONS.items():
+            slices.append(([k], {"season": name}, lambda y, m, h, ms=ms: np.isin(m, ms)))
+        for hr in range(24):
+            slices.append(([k], {"hours": [hr]}, lambda y, m, h, hr=hr: h == hr))
+    regions = list(rdata)
+    for name, ms in SEASONS.items():
+        slices.append((regions, {"season": name}, lambda y, m, h, ms=ms: np.isin(m, ms)))
+
+    worst, failures = 0.0, []
+    for regs, sel, mask_fn in slices:
+        vals = exact(regs, mask_fn)
+        if not len(vals):
+            continue
+        est = sk.quantiles(qs, regions=regs, **sel)
+        ref = np.quantile(vals, qs, method="lower")
+        for q, e, r in zip(qs, est, ref):
+            if r >= sk.min_rate:
+                err = abs(e - r) / r
+                ok = err <= sk.alpha + 1e-9
+                worst = max(worst, err)
+            else:
+                ok = abs(e - r) < sk.min_rate
+            if not ok:
+                failures.append((regs if len(regs) < 3 else "all", sel, q, e, float(r)))
+    return len(slices) * len(qs), worst, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build / verify emission-rate quantile sketches.")
+    parser.add_argument("--source", help="page containing `const RDATA = {...};` (default: the hourly source page)")
+    parser.add_argument("--verify", action="store_true", help="check the error bound against np.quantile")
+    parser.add_argument("--out", help="write the sketches (.npz)")
+    args = parser.parse_args(argv)
+
+    import build_explorer
+    path = args.source or build_explorer.find_sources()[1]
+    with open(path, "r", encoding="utf-8") as f:
+        line = next((l.strip() for l in f if l.strip().startswith("const RDATA")), "")
+    _, rdata = build_explorer.parse_data_line(line)
+
+    t0 = time.perf_counter()
+    sk = RateSketches.from_rdata(rdata)
+    print(f"  Built {math.prod(sk.shape):,} sketch cells ({len(sk.counts):,} non-empty buckets of {sk.n_buckets}, "
+          f"{(sk.offsets.nbytes + sk.bins.nbytes + sk.counts.nbytes) / 1e6:.2f} MB) in {time.perf_counter() - t0:.2f}s")
+    t0 = time.perf_counter()
+    for _ in range(100):
+        sk.quantiles([0.05, 0.95], season="summer", hours=range(16, 21))
+    print(f"  All-region summer 16-20h P5/P95 rollup: {(time.perf_counter() - t0) * 10:.3f} ms")
+    if args.out:
+        sk.save(args.out)
+        print(f"  Wrote {args.out}")
+    if args.verify:
+        n, worst, failures = verify(rdata, sk)
+        print(f"  {n} quantiles checked, worst relative error {worst:.4%} (bound {sk.alpha:.2%})")
+        for f in failures[:20]:
+            print("    FAIL", f)
+        raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Emission-factor scenarios: the NumPy twin of the page's what-if engine
+
+The hourly mode's "What if: emission factors" control recomputes every
+hourly emission rate of the selected region from its per-fuel generation
+(RDATA[k].gen) and a factor vector in kg CO2/MWh:
+
+  rate[h]  = round(sum_f gen[f, h] * factor[f] / load[h])
+  fossil[h] = sum of gen[f, h] over SCENARIO["fossil"] fuels with a
+              non-zero factor, as % of load[h]
+
+and from those the stats the acts show: rateP5 / rateP95 (the 5th / 95th
+value of the sorted rates), avgFossil (mean fossil %, one decimal) and
+highFossilHours (hours above SCENARIO["highFossilPct"]). The factors the
+page is built with are build_explorer.SCENARIO["factors"].
+
+compute() is a matrix-vector product over the (fuel, hour) generation
+matrix, accumulated one fuel row at a time in SCENARIO["fuels"] order, which
+is also what SCENARIO_ENGINE_JS does, so the two agree to the last bit
+(`factors @ G` would leave the summation order to BLAS). Rounding is
+floor(x + 0.5) on both sides.
+
+--parity fails on any NumPy / JS mismatch, and also when the built
+factors' recount of a stat differs from the stat baked into RDATA: the page
+would show that jump as soon as a slider moves.
+
+Usage:
+  python scenario.py --parity              # NumPy vs the page's JS engine (node)
+  python scenario.py --parity --page dist/index.html --trials 50
+"""
+import argparse, json, os, shutil, subprocess, tempfile, time
+
+import numpy as np
+
+import build_explorer
+
+SCENARIO = build_explorer.SCENARIO
+
+
+def matrix(d):
+    """(fuel, hour) float64 generation matrix of one RDATA entry, rows in
+    SCENARIO["fuels"] order (zeros for fuels the region does not report)."""
+    n = len(d["load"])
+    G = np.zeros((len(SCENARIO["fuels"]), n))
+    for i, f in enumerate(SCENARIO["fuels"]):
+        if f in d["gen"]:
+            G[i] = d["gen"][f]
+    return G
+
+
+def compute(G, load, factors):
+    """Hourly rates (int32) and recomputed stats for one factor vector."""
+    n = G.shape[1]
+    load = np.asarray(load, dtype=float)
+    em, fossil = np.zeros(n), np.zeros(n)
+    for i, f in enumerate(SCENARIO["fuels"]):
+        ef = factors.get(f, 0)
+        if not ef:
+            continue
+        em += G[i] * ef
+        if f in SCENARIO["fossil"]:
+            fossil += G[i]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = np.where(load != 0, np.floor(em / load + 0.5), 0).astype(np.int32)
+        share = np.where(load != 0, fossil / load * 100, 0.0)
+    srt = np.sort(rate)
+    stats = {
+        "rateP5": int(srt[int(0.05 * n)]) if n else 0,
+        "rateP95": int(srt[int(0.95 * n)]) if n else 0,
+        # cumsum adds in hour order, as the JS loop does (np.sum is pairwise)
+        "avgFossil": float(np.floor(np.cumsum(share)[-1] / n * 10 + 0.5) / 10) if n else 0,
+        "highFossilHours": int((share > SCENARIO["highFossilPct"]).sum()),
+    }
+    return rate, stats
+
+
+def random_factors(rng):
+    """A factor vector inside the slider ranges, with the occasional fuel at 0."""
+    out = {}
+    for f, (lo, hi) in SCENARIO["ranges"].items():
+        out[f] = 0 if rng.random() < 0.1 else int(rng.integers(lo // 5, hi // 5 + 1)) * 5
+    return out
+
+
+# ── Parity check against the page's JS engine ─────────────────────────────────
+NODE_RUNNER = """
+const fs = require('fs');
+const job = JSON.parse(fs.readFileSync(process.argv[2], 'utf8'));
+globalThis.RDATA = job.rdata;
+globalThis.SCENARIO = job.scenario;
+eval(job.engine + ';globalThis.scnCompute = scnCompute;');
+const out = [];
+for (const [k, factors] of job.runs) {
+  const t0 = process.hrtime.bigint();
+  const r = scnCompute(k, factors);
+  const ms = Number(process.hrtime.bigint() - t0) / 1e6;
+  out.push({ rate: Array.from(r.rate), stats: r.stats, ms });
+}
+process.stdout.write(JSON.stringify(out));
+"""
+
+
+def parity(rdata, trials=20, seed=0):
+    """Run the same (region, factors) jobs through NumPy and node.
+
+    Returns (problems, js_ms): mismatch descriptions and the per-call time
+    of the JS engine (after its first call per region builds the matrix)."""
+    node = shutil.which("node")
+    if not node:
+        raise SystemExit("node is needed for the parity check")
+    rng = np.random.default_rng(seed)
+    keys = sorted(rdata)
+    runs = [[k, dict(SCENARIO["factors"])] for k in keys]
+    runs += [[keys[int(rng.integers(len(keys)))], random_factors(rng)] for _ in range(trials)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        job = os.path.join(tmp, "job.json")
+        with open(job, "w", encoding="utf-8") as f:
+            json.dump({"rdata": rdata, "scenario": SCENARIO, "engine": build_explorer.SCENARIO_ENGINE_JS,
+                       "runs": runs}, f)
+        script = os.path.join(tmp, "run.js")
+        with open(script, "w", encoding="utf-8") as f:
+            f.write(NODE_RUNNER)
+        proc = subprocess.run([node, "--max-old-space-size=4096", script, job],
+                              capture_output=True, text=True, check=True)
+    js = json.loads(proc.stdout)
+
+    problems, mats = [], {}
+    for (k, factors), got in zip(runs, js):
+        G = mats.get(k)
+        if G is None:
+            G = mats[k] = matrix(rdata[k])
+        rate, stats = compute(G, rdata[k]["load"], factors)
+        bad = np.flatnonzero(rate != np.asarray(got["rate"]))
+        if bad.size:
+            i = bad[0]
+            problems.append(f"{k} {factors}: rate[{i}] {got['rate'][i]} != {rate[i]} ({bad.size} hours)")
+        for s, v in stats.items():
+            if got["stats"][s] != v:
+                problems.append(f"{k} {factors}: {s} {got['stats'][s]} != {v}")
+    seen, js_ms = set(), []
+    for (k, _), got in zip(runs, js):
+        if k in seen:
+            js_ms.append(got["ms"])
+        seen.add(k)
+    return problems, js_ms
+
+
+def baked_check(rdata):
+    """How far the built factors are from the rates / stats baked into RDATA:
+    {region: (max |rate diff|, {stat: (baked, recomputed)} for differing stats)}."""
+    out = {}
+    for k, d in rdata.items():
+        rate, stats = compute(matrix(d), d["load"], SCENARIO["factors"])
+        diff = int(np.abs(rate - np.asarray(d["rate"])).max()) if len(rate) else 0
+        baked = d.get("stats", {})
+        out[k] = (diff, {s: (baked.get(s), v) for s, v in stats.items() if baked.get(s) != v})
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the NumPy scenario engine against the page's JS engine.")
+    parser.add_argument("--parity", action="store_true", required=True)
+    parser.add_argument("--page", default=os.path.join(build_explorer.BASE, "index.html"),
+                        help="built page (or hourly source page) with the RDATA line (default: index.html)")
+    parser.add_argument("--trials", type=int, default=20, help="random factor vectors to compare (default: 20)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rdata = {}
+    with open(args.page, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip().startswith("const RDATA"):
+                rdata = build_explorer.parse_data_line(line.strip())[1]
+    if not rdata:
+        raise SystemExit(f"no RDATA line in {args.page}")
+
+    print("  Built factors against the rates baked into RDATA:")
+    stale = []
+    for k, (diff, stats) in baked_check(rdata).items():
+        extra = ", ".join(f"{s} {a} -> {b}" for s, (a, b) in stats.items())
+        print(f"    {k:<5} max |rate diff| {diff} kg/MWh{'; ' + extra if extra else ''}")
+        if stats:
+            stale.append(k)
+    if stale:
+        # the page shows the recomputed stats as soon as a factor moves
+        print(f"  Baked stats differ from the engine's recount for {', '.join(stale)}")
+
+    t0 = time.perf_counter()
+    problems, js_ms = parity(rdata, args.trials, args.seed)
+    for p in problems[:20]:
+        print("  MISMATCH", p)
+    print(f"  NumPy vs JS: {len(rdata) + args.trials} runs, "
+          f"{'OK' if not problems else f'{len(problems)} mismatches'} ({time.perf_counter() - t0:.1f} s)")
+    if js_ms:
+        print(f"  JS recompute per factor change: median {np.median(js_ms):.2f} ms, max {max(js_ms):.2f} ms")
+    raise SystemExit(1 if problems or stale else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Tile-map geometry simplification for build_explorer.py
+
+The region outlines in EIA Grid Story's `const T=` object are full-resolution
+paths (absolute M/L/Z at 0.1 precision) but are only ever drawn inside a
+~127 x 70 px tile (48 px tall on mobile). simplify_tiles() rewrites each
+path for that size:
+
+  1. Douglas-Peucker per ring, with the tolerance expressed in rendered
+     pixels and converted to path units from the tile's viewBox;
+  2. quantization onto an integer grid whose long side is GRID units, so the
+     viewBox becomes "0 0 W H" and every coordinate an integer;
+  3. relative commands (m/l/z with implicit repeats and no redundant
+     separators).
+
+Each result is rasterized next to the original at 2x device pixels and kept
+only if the silhouettes overlap with IoU >= MIN_IOU (0.95: at ~140 device
+px a one-pixel boundary shift alone costs a few percent); otherwise the original
+path is kept and the tile is reported.
+"""
+import math, re
+
+# Largest box a tile's SVG is drawn into (CSS px): the desktop grid column
+# minus tile padding, at the 70px desktop height. Mobile tiles are smaller,
+# so a tolerance that holds here holds there too.
+TILE_BOX_PX = (127, 70)
+RASTER_DPR = 2
+# Integer grid for the long side of every tile: >= 1 unit per device pixel
+# at RASTER_DPR for the largest tile.
+GRID = 256
+MIN_IOU = 0.95
+
+_TOKEN_RE = re.compile(r"[MLHVZmlhvz]|-?\d*\.?\d+(?:[eE][-+]?\d+)?")
+
+
+def parse_path(d):
+    """Rings of absolute (x, y) points from an M/L/H/V/Z path (either case)."""
+    rings, ring = [], []
+    x = y = sx = sy = 0.0
+    cmd = None
+    tokens = _TOKEN_RE.findall(d)
+    i = 0
+    while i < len(tokens):
+        tok = tokens[i]
+        if tok.isalpha():
+            cmd = tok
+            i += 1
+            if cmd in "Zz":
+                if ring:
+                    rings.append(ring)
+                ring = []
+                x, y = sx, sy
+            continue
+        if cmd in "MmLl":
+            nx, ny = float(tokens[i]), float(tokens[i + 1])
+            i += 2
+            if cmd in "ml":
+                nx, ny = x + nx, y + ny
+            if cmd in "Mm":
+                if ring:
+                    rings.append(ring)
+                ring = []
+                sx, sy = nx, ny
+                # Further pairs after a moveto are implicit linetos
+                cmd = "L" if cmd == "M" else "l"
+            x, y = nx, ny
+            ring.append((x, y))
+        elif cmd in "Hh":
+            x = float(tok) + (x if cmd == "h" else 0)
+            i += 1
+            ring.append((x, y))
+        elif cmd in "Vv":
+            y = float(tok) + (y if cmd == "v" else 0)
+            i += 1
+            ring.append((x, y))
+        else:
+            raise ValueError(f"unsupported path command {cmd!r}")
+    if ring:
+        rings.append(ring)
+    return rings
+
+
+def _seg_dist(p, a, b):
+    (px, py), (ax, ay), (bx, by) = p, a, b
+    dx, dy = bx - ax, by - ay
+    if dx == 0 and dy == 0:
+        return math.hypot(px - ax, py - ay)
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy)))
+    return math.hypot(px - ax - t * dx, py - ay - t * dy)
+
+
+def douglas_peucker(points, tol):
+    """Simplify an open polyline, keeping both end points."""
+    if len(points) < 3:
+        return list(points)
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        a, b = stack.pop()
+        best, idx = 0.0, None
+        for i in range(a + 1, b):
+            dist = _seg_dist(points[i], points[a], points[b])
+            if dist > best:
+                best, idx = dist, i
+        if idx is not None and best > tol:
+            keep[idx] = True
+            stack.append((a, idx))
+            stack.append((idx, b))
+    return [p for p, k in zip(points, keep) if k]
+
+
+def simplify_ring(ring, tol):
+    """Closed-ring Douglas-Peucker: split at the point farthest from the
+    first one so neither half degenerates."""
+    if ring[0] == ring[-1]:
+        ring = ring[:-1]
+    if len(ring) < 4:
+        return ring
+    far = max(range(len(ring)), key=lambda i: math.hypot(ring[i][0] - ring[0][0], ring[i][1] - ring[0][1]))
+    first = douglas_peucker(ring[:far + 1], tol)
+    second = douglas_peucker(ring[far:] + [ring[0]], tol)
+    return first[:-1] + second[:-1]
+
+
+def _render_scale(w, h):
+    """CSS px per path unit for a w x h viewBox drawn with xMidYMid meet."""
+    return min(TILE_BOX_PX[0] / w, TILE_BOX_PX[1] / h)
+
+
+def _fmt_rel(pairs):
+    out = ""
+    for n in (v for p in pairs for v in p):
+        s = str(n)
+        out += s if (not out or s.startswith("-") or out[-1].isalpha()) else " " + s
+    return out
+
+
+def relative_path(rings):
+    """Integer rings → compact relative path (m/l/z)."""
+    d = ""
+    cx = cy = 0
+    for ring in rings:
+        x0, y0 = ring[0]
+        d += "m" + _fmt_rel([(x0 - cx, y0 - cy)])
+        steps = [(x - px, y - py) for (px, py), (x, y) in zip(ring, ring[1:])]
+        if steps:
+            d += "l" + _fmt_rel(steps)
+        d += "z"
+        cx, cy = x0, y0
+    return d
+
+
+def simplify_tile(d, vb, tol_px=0.5):
+    """One tile: returns (d, vb) on the integer grid."""
+    vx, vy, vw, vh = (float(v) for v in vb.split())
+    tol = tol_px / _render_scale(vw, vh)
+    q = GRID / max(vw, vh)
+    qw, qh = max(1, round(vw * q)), max(1, round(vh * q))
+    out = []
+    for ring in parse_path(d):
+        pts = simplify_ring(ring, tol)
+        qpts = []
+        for x, y in pts:
+            p = (round((x - vx) * q), round((y - vy) * q))
+            if not qpts or p != qpts[-1]:
+                qpts.append(p)
+        if len(qpts) > 1 and qpts[0] == qpts[-1]:
+            qpts.pop()
+        if len(qpts) >= 3:
+            out.append(qpts)
+    return relative_path(out), f"0 0 {qw} {qh}"
+
+
+# ── Visual check ──────────────────────────────────────────────────────────────
+def rasterize(rings, vb, scale):
+    """Even-odd scanline fill of rings (viewBox units) at `scale` px/unit,
+    sampled at pixel centres. Returns (width, height, set of filled pixels)."""
+    vx, vy, vw, vh = vb
+    w, h = max(1, math.ceil(vw * scale)), max(1, math.ceil(vh * scale))
+    edges = []
+    for ring in rings:
+        for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+            if y1 != y2:
+                edges.append(((x1 - vx) * scale, (y1 - vy) * scale, (x2 - vx) * scale, (y2 - vy) * scale))
+    filled = set()
+    for row in range(h):
+        yc = row + 0.5
+        xs = sorted(x1 + (yc - y1) * (x2 - x1) / (y2 - y1)
+                    for x1, y1, x2, y2 in edges if (y1 <= yc < y2) or (y2 <= yc < y1))
+        for a, b in zip(xs[0::2], xs[1::2]):
+            for col in range(max(0, math.ceil(a - 0.5)), min(w, math.floor(b - 0.5) + 1)):
+                filled.add((col, row))
+    return w, h, filled
+
+
+def silhouette_iou(d_a, vb_a, d_b, vb_b):
+    """IoU of two tiles as rendered (meet-scaled into the same tile box at
+    RASTER_DPR)."""
+    def raster(d, vb):
+        box = tuple(float(v) for v in vb.split())
+        return rasterize(parse_path(d), box, _render_scale(box[2], box[3]) * RASTER_DPR)
+    _, _, a = raster(d_a, vb_a)
+    _, _, b = raster(d_b, vb_b)
+    union = len(a | b)
+    return len(a & b) / union if union else 1.0
+
+
+def simplify_tiles(tiles, tol_px=0.5, min_iou=MIN_IOU):
+    """Simplify every tile; returns (new tiles, per-tile report rows)."""
+    out, report = {}, []
+    for k, t in tiles.items():
+        d, vb = simplify_tile(t["d"], t["vb"], tol_px)
+        iou = silhouette_iou(t["d"], t["vb"], d, vb)
+        ok = iou >= min_iou
+        out[k] = {"d": d, "vb": vb} if ok else t
+        report.append({
+            "region": k, "ok": ok, "iou": iou,
+            "points_before": sum(len(r) for r in parse_path(t["d"])),
+            "points_after": sum(len(r) for r in parse_path(d)),
+            "bytes_before": len(t["d"]) + len(t["vb"]),
+            "bytes_after": len(out[k]["d"]) + len(out[k]["vb"]),
+        })
+    return out, report
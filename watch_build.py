@@ -0,0 +1,282 @@
+"""
+Watch mode for build_explorer.py: incremental rebuilds and live reload
+
+`python build_explorer.py --watch [PORT]` builds index.html, serves the repo
+at http://localhost:PORT/ (default 8000) and polls the two source pages.
+On every save:
+
+  - only the changed source is re-read, and each stage is memoized on the
+    slice of the sources it reads: the INLINE_DATA / RDATA lines feed only
+    the config script and the pre-rendered narrative (narrative.py), the
+    rest of each page (the "code" slice) feeds the
+    vendor / tile / viz stages. Editing a viz re-runs rename or skip and the
+    app script but reuses the 6 MB config script, and the reverse for a data
+    refresh;
+  - the new page is pushed to open tabs over a server-sent event stream
+    (/__reload); each tab stores selectedRegion, currentMode and the active
+    story step in sessionStorage, reloads and restores them;
+  - index.html on disk is written after the event goes out, so the browser
+    fetch and the file write overlap. It is byte-for-byte the page a normal
+    build writes: the reload client is only added to the served copy.
+
+The terminal shows which stages ran and the rebuild time for each change.
+"""
+import functools, http.server, os, threading, time, traceback
+from urllib.parse import parse_qs, urlparse
+
+import build_explorer
+
+POLL_INTERVAL = 0.05
+
+# Served with the page only; `__GEN__` is the build generation the page came
+# from, so a tab that connects after a rebuild reloads straight away.
+LIVE_RELOAD_JS = """<script>
+// ═══════════════════════════════════════════════════════════════════════════
+// LIVE RELOAD (--watch)
+// ═══════════════════════════════════════════════════════════════════════════
+(function() {
+  const KEY = 'gx-watch-view';
+  function activeStep() {
+    if (currentMode === 'historic') return gsCurrentStep;
+    const p = document.querySelector('#hourlyContainer .viz-panel.active');
+    return p ? parseInt((p.id || '').replace('hvPanel', '')) || 0 : 0;
+  }
+  function restore() {
+    const v = JSON.parse(sessionStorage.getItem(KEY) || 'null');
+    sessionStorage.removeItem(KEY);
+    if (!v) return;
+    if (v.mode !== currentMode) setMode(v.mode);
+    if (!v.region || !REGIONS[v.region]) { window.scrollTo(0, v.y); return; }
+    selectRegion(v.region);
+    requestAnimationFrame(() => {
+      const sel = (v.mode === 'hourly' ? '.hv-step' : '.gs-step') + '[data-step="' + v.step + '"]';
+      const step = v.step && document.querySelector(sel);
+      if (step) step.scrollIntoView({block: 'center', behavior: 'instant'});
+      else window.scrollTo(0, v.y);
+    });
+  }
+  if ('scrollRestoration' in history) history.scrollRestoration = 'manual';
+  document.addEventListener('DOMContentLoaded', restore);
+  if (!window.EventSource) return;
+  const events = new EventSource('/__reload?since=__GEN__');
+  events.addEventListener('reload', () => {
+    events.close();
+    sessionStorage.setItem(KEY, JSON.stringify({
+      region: selectedRegion, mode: currentMode, step: activeStep(), y: window.scrollY}));
+    location.reload();
+  });
+  events.addEventListener('failed', e => console.warn('[watch] rebuild failed:\\n' + e.data));
+})();
+</script>
+"""
+
+
+def _split_data(lines, prefix):
+    """(data line, the other lines) for one source page; the data line is
+    the stripped `const NAME = {...};` line, as extract_data_lines() finds it."""
+    for i, line in enumerate(lines):
+        if line.strip().startswith(prefix):
+            return line.strip(), lines[:i] + lines[i + 1:]
+    return "", lines
+
+
+class WatchBuild:
+    """One build whose stage outputs are kept between rebuilds, each keyed on
+    the inputs it was computed from."""
+
+    def __init__(self, grid_story_path, grid_viz_path, out_path, sankey="deferred", perf=False,
+                 simplify_tiles=None):
+        self.paths = {"gs": grid_story_path, "gv": grid_viz_path}
+        self.out_path = out_path
+        self.sankey, self.perf, self.simplify_tiles = sankey, perf, simplify_tiles
+        self.stamps, self.lines = {}, {}
+        self.html = ""
+        self._memo = {}
+        self.ran = []
+
+    def changed(self):
+        """Sources whose mtime or size differs from the last read."""
+        out = []
+        for name, path in self.paths.items():
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:  # mid-save by an editor that replaces the file
+                continue
+            if self.stamps.get(name) != (st.st_mtime_ns, st.st_size):
+                out.append(name)
+        return out
+
+    def _stage(self, name, fn, *inputs):
+        hit = self._memo.get(name)
+        if hit is not None and all(a is b or a == b for a, b in zip(hit[0], inputs)):
+            return hit[1]
+        out = fn(*inputs)
+        self._memo[name] = (inputs, out)
+        self.ran.append(name)
+        return out
+
+    def _tiles(self, gs_code):
+        parts = {"tiles": build_explorer.parse_tile_paths(build_explorer.extract_tile_paths(gs_code))}
+        if self.simplify_tiles:
+            build_explorer.simplify_tile_paths(parts, self.simplify_tiles)
+        return parts["tiles"]
+
+    def rebuild(self):
+        """Re-read the changed sources and re-run the stages whose inputs
+        changed. Returns the stages that ran ([] when nothing changed)."""
+        self.ran = []
+        for name in self.changed():
+            path = self.paths[name]
+            st = os.stat(path)
+            with open(path, "r", encoding="utf-8") as f:
+                self.lines[name] = f.readlines()
+            self.stamps[name] = (st.st_mtime_ns, st.st_size)
+            self.ran.append("read " + os.path.basename(path))
+        if not self.ran:
+            return []
+
+        gs_data_line, gs_code = _split_data(self.lines["gs"], "const INLINE_DATA")
+        gv_data_line, gv_code = _split_data(self.lines["gv"], "const RDATA")
+        gs_text, gv_text = "".join(gs_code), "".join(gv_code)
+        highcharts_js, sankey_js = self._stage("vendor", build_explorer.extract_vendor, gv_text)
+        tiles = self._stage("tiles", self._tiles, gs_text)
+        gs_viz_code = self._stage("historic", build_explorer.rename_historic, gs_code)
+        gv_viz_code = self._stage("hourly", build_explorer.skip_hourly, gv_code)
+        config = self._stage("config", lambda a, b, t: build_explorer.config_js(
+            a, b, build_explorer.TILE_ORDER, t, perf=self.perf), gs_data_line, gv_data_line, tiles)
+        app = self._stage("app", lambda a, b: build_explorer.app_js(
+            a, b, sankey=self.sankey, perf=self.perf), gs_viz_code, gv_viz_code)
+        narrative = self._stage("narrative", build_explorer.narrative_block, gs_data_line, gv_data_line)
+        parts = {"highcharts_js": highcharts_js, "sankey_js": sankey_js}
+        self.html = self._stage("page", lambda c, a, n, h, s: build_explorer.render_page(
+            parts, c, a, sankey=self.sankey, perf=self.perf, narrative_html=n),
+            config, app, narrative, highcharts_js, sankey_js)
+        return self.ran
+
+    def write(self):
+        return build_explorer.write_output(self.html, self.out_path)
+
+
+# ── Serving ───────────────────────────────────────────────────────────────────
+class LiveReload:
+    """The page as served (with the reload client) and the build generation
+    that open event streams wait on."""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.generation = 0
+        self.page = b""
+        self.failure = None
+        self.clients = 0
+
+    def publish(self, html):
+        with self.cond:
+            self.generation += 1
+            self.failure = None
+            head, sep, tail = html.rpartition("</body>")
+            script = LIVE_RELOAD_JS.replace("__GEN__", str(self.generation))
+            self.page = (head + script + sep + tail).encode("utf-8") if sep else html.encode("utf-8")
+            self.cond.notify_all()
+            return self.clients
+
+    def fail(self, message):
+        with self.cond:
+            self.failure = (self.generation, message)
+            self.cond.notify_all()
+
+
+class _Handler(http.server.SimpleHTTPRequestHandler):
+    """The watched page from memory, /__reload events, and static files."""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/__reload":
+            self._events(int(parse_qs(url.query).get("since", ["0"])[0] or 0))
+        elif url.path in ("/", "/index.html"):
+            body = self.server.live.page
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            super().do_GET()
+
+    def _events(self, since):
+        live = self.server.live
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        gen, failure_sent = since, None
+        with live.cond:
+            live.clients += 1
+        try:
+            while True:
+                with live.cond:
+                    live.cond.wait_for(lambda: live.generation != gen or live.failure != failure_sent, timeout=15)
+                    current, failure = live.generation, live.failure
+                if current != gen:
+                    self.wfile.write(b"event: reload\ndata: %d\n\n" % current)
+                    gen = current
+                elif failure != failure_sent:
+                    data = "".join("data: " + line + "\n" for line in failure[1].splitlines())
+                    self.wfile.write(("event: failed\n" + data + "\n").encode("utf-8"))
+                    failure_sent = failure
+                else:
+                    self.wfile.write(b": ping\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with live.cond:
+                live.clients -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+def watch(grid_story_path, grid_viz_path, out_path, port=8000, sankey="deferred", perf=False,
+          simplify_tiles=None, interval=POLL_INTERVAL):
+    """Build, serve and rebuild on every change until interrupted."""
+    build = WatchBuild(grid_story_path, grid_viz_path, out_path, sankey=sankey, perf=perf,
+                       simplify_tiles=simplify_tiles)
+    t0 = time.perf_counter()
+    build.rebuild()
+    live = LiveReload()
+    live.publish(build.html)
+    size = build.write()
+    print(f"  Built {out_path} ({size / 1024:.0f} KB) in {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    handler = functools.partial(_Handler, directory=os.path.dirname(os.path.abspath(out_path)))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    server.live = live
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"  Serving http://localhost:{port}/ ; watching {grid_story_path} and {grid_viz_path} (Ctrl+C to stop)")
+
+    try:
+        while True:
+            time.sleep(interval)
+            try:
+                if not build.changed():
+                    continue
+                t0 = time.perf_counter()
+                ran = build.rebuild()
+                if "page" not in ran:
+                    print(f"  {', '.join(ran)}: page unchanged")
+                    continue
+                clients = live.publish(build.html)
+                t_ready = time.perf_counter() - t0
+                build.write()
+                print(f"  Rebuilt in {t_ready * 1000:.0f} ms ({', '.join(ran)}); "
+                      f"written in {(time.perf_counter() - t0) * 1000:.0f} ms; {clients} tab(s) reloading")
+            except Exception:
+                message = traceback.format_exc()
+                print("  Rebuild failed; still serving the last good page\n" + message)
+                live.fail(message)
+    except KeyboardInterrupt:
+        print("\n  Stopped watching")
+    finally:
+        server.shutdown()